@@ -0,0 +1,67 @@
+import threading
+from HashTable import HashTable
+
+
+# hash table that can be read from a pool of threads while a simulation thread writes to it.
+# buckets are immutable tuples: a writer builds a new tuple and swaps it into the
+# table in one assignment, so a reader always scans either the old bucket or the
+# new one, never a half-edited one. readers never take a lock. writers only lock
+# the stripe their bucket falls in, so writes to different stripes don't block each other
+class ConcurrentHashTable(HashTable):
+
+    def __init__(self, size=40, direct=False, stripes=8):
+        # always hashed: direct slots would need a lock-free way to grow and to fall back to buckets
+        super().__init__(size, direct=False)
+
+        # tuple buckets so readers can scan them without locking
+        self.table = [() for _ in range(size)]
+
+        # one lock per range of buckets
+        self.stripes = max(1, min(stripes, size))
+        self._locks = [threading.Lock() for _ in range(self.stripes)]
+
+    def _lock_for(self, index):
+        """Lock covering the stripe a bucket index belongs to."""
+        return self._locks[index * self.stripes // self.size]
+
+    def insert(self, key, value):
+        """Add or replace a key-value pair (copy-on-write on its bucket)."""
+        index = self._hash(key)
+        with self._lock_for(index):
+            bucket = self.table[index]
+            for i, (k, v) in enumerate(bucket):
+                if k == key:
+                    self.table[index] = bucket[:i] + ((key, value),) + bucket[i + 1:]
+                    return
+            self.table[index] = bucket + ((key, value),)
+
+    def get(self, key):
+        """Retrieve the value associated with the given key (lock-free)."""
+        # grab the bucket reference once, later swaps don't affect this scan
+        bucket = self.table[self._hash(key)]
+        for k, v in bucket:
+            if k == key:
+                return v
+        return None
+
+    def remove(self, key):
+        """Remove the key-value pair associated with the given key."""
+        index = self._hash(key)
+        with self._lock_for(index):
+            bucket = self.table[index]
+            for i, (k, v) in enumerate(bucket):
+                if k == key:
+                    self.table[index] = bucket[:i] + bucket[i + 1:]
+                    return True
+        return False
+
+    def keys(self):
+        """Return a list of keys present in the table (each bucket read as of when it's reached)."""
+        result = []
+        for bucket in self.table:
+            for k, _ in bucket:
+                result.append(k)
+        return result
+
+    def __str__(self):
+        return str({k: v for bucket in self.table for k, v in bucket})
@@ -0,0 +1,93 @@
+from bisect import bisect_right
+from datetime import datetime, timedelta
+
+import numpy as np
+
+
+# how long legs take and what they cost. a truck's speed can be scaled by
+# time-of-day buckets (rush hour etc), every stop can take some service time,
+# and cost is a weighted mix of miles and hours. travel times are precomputed
+# into one matrix per (truck speed, bucket) the first time they're needed, so a
+# leg's time is an array lookup just like its distance
+class CostModel:
+    def __init__(self, distance_table, profile=None, service_minutes=0.0, cost_per_mile=1.0, cost_per_hour=0.0):
+        """
+        Initialize a CostModel with:
+        - distance_table: the loaded DistanceTable (location IDs are its indexes)
+        - profile: [("HH:MM", speed factor), ...] buckets, each running until the next one starts
+          (e.g. [("00:00", 1.0), ("07:30", 0.7), ("09:00", 1.0)]), None means constant speed
+        - service_minutes: time spent at every stop handing packages off
+        - cost_per_mile / cost_per_hour: weights for cost()
+        """
+        self.distance_table = distance_table
+        self.service_minutes = service_minutes
+        self.cost_per_mile = cost_per_mile
+        self.cost_per_hour = cost_per_hour
+
+        profile = sorted(profile or [("00:00", 1.0)])
+        self._bucket_starts = [_seconds(datetime.strptime(start, "%H:%M")) for start, _ in profile]
+        self._factors = [factor for _, factor in profile]
+
+        # full symmetric miles matrix, unresolved rows never get looked up (IDs are None)
+        self._miles = np.asarray(distance_table.as_array(), dtype=float)
+
+        # (speed, bucket) -> seconds matrix
+        self._seconds = {}
+
+    def bucket(self, when):
+        """Index of the profile bucket `when` falls in."""
+        return max(0, bisect_right(self._bucket_starts, _seconds(when)) - 1)
+
+    def speed_at(self, speed, when):
+        return speed * self._factors[self.bucket(when)]
+
+    def buckets_between(self, start, end):
+        """(seconds after start, speed factor) for every bucket from start up to end, the first at 0."""
+        first = self.bucket(start)
+        span = (end - start).total_seconds()
+        result = [(0.0, self._factors[first])]
+        for b in range(first + 1, len(self._bucket_starts)):
+            offset = self._bucket_starts[b] - _seconds(start)
+            if offset > span:
+                break
+            result.append((float(offset), self._factors[b]))
+        return result
+
+    def seconds_matrix(self, speed, when):
+        """Travel seconds between every pair of location IDs for a truck leaving at `when`."""
+        key = (speed, self.bucket(when))
+        matrix = self._seconds.get(key)
+        if matrix is None:
+            matrix = self._miles * (3600.0 / (speed * self._factors[key[1]]))
+            self._seconds[key] = matrix
+        return matrix
+
+    def travel_time(self, from_id, to_id, when, speed, miles=None):
+        """
+        How long a leg takes leaving at `when`. The whole leg uses the speed of
+        the bucket it starts in. Unresolved locations fall back to `miles` (or 2.0).
+        """
+        if from_id is None or to_id is None:
+            miles = 2.0 if miles is None else miles
+            return timedelta(hours=miles / self.speed_at(speed, when))
+        return timedelta(seconds=float(self.seconds_matrix(speed, when)[from_id, to_id]))
+
+    def service_time(self):
+        return timedelta(minutes=self.service_minutes)
+
+    def parameters(self):
+        """Everything that changes a leg's time or cost, for cache keys."""
+        return {
+            "buckets": list(zip(self._bucket_starts, self._factors)),
+            "service_minutes": self.service_minutes,
+            "cost_per_mile": self.cost_per_mile,
+            "cost_per_hour": self.cost_per_hour,
+        }
+
+    def cost(self, miles, hours):
+        """Weighted cost of driving `miles` over `hours` on the clock (what local-cost routing minimizes)."""
+        return self.cost_per_mile * miles + self.cost_per_hour * hours
+
+
+def _seconds(when):
+    return when.hour * 3600 + when.minute * 60 + when.second
@@ -0,0 +1,34 @@
+# the WGU hub every truck loaded at before there was more than one depot
+WGU_HUB_ADDRESS = "Western Governors University 4001 South 700 East Salt Lake City UT 84107"
+
+
+# a depot is a place trucks load up at and come back to. packages get handed
+# to the nearest depot that can take them and each depot routes its own
+# trucks, so a region's volume never turns into one big global problem
+class Depot:
+    def __init__(self, depot_id, address, name=None):
+        """
+        Initialize a Depot with:
+        - depot_id: unique identifier for the depot
+        - address: where trucks load and return (must be in the distance table)
+        - name: label for printing (defaults to the address)
+        - trucks: Truck objects based here
+        """
+        self.depot_id = depot_id
+        self.address = address
+        self.name = name or address
+        self.trucks = []
+
+    def add_truck(self, truck):
+        """Base a truck at this depot (it starts and reloads here)."""
+        truck.depot_id = self.depot_id
+        truck.hub_location = self.address
+        truck.current_location = self.address
+        truck.current_location_id = None
+        self.trucks.append(truck)
+
+    def truck_ids(self):
+        return {truck.truck_id for truck in self.trucks}
+
+    def __str__(self):
+        return f"Depot {self.depot_id} ({self.name}): trucks {sorted(self.truck_ids())}"
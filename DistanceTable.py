@@ -1,3 +1,13 @@
+import hashlib
+
+import numpy as np
+
+from constraints import delivery_address
+
+# mean earth radius, for haversine distances in miles
+EARTH_RADIUS_MILES = 3958.8
+
+
 class DistanceTable:
 
     # allow empty construction so main.py can do DistanceTable()
@@ -6,8 +16,28 @@ class DistanceTable:
         # list of address strings
         self.addresses = addresses or []
 
-        # 2D matrix of distances (list of lists)
-        self.distance_matrix = distance_matrix or []
+        # 2D matrix of distances (lower triangular list of lists from the CSV,
+        # or a full numpy array when built from coordinates)
+        self.distance_matrix = distance_matrix if distance_matrix is not None else []
+
+        # address string -> matrix index, filled in by find_index
+        self._index_cache = {}
+
+        # normalized address -> first matching index, so exact matches skip the scans
+        self._norm_index = None
+
+        # full symmetric numpy copy of the matrix (see as_array)
+        self._array = None
+
+        # shortest-path miles between every pair (see shortest_paths)
+        self._closure = None
+
+        # hash of the addresses + miles (see fingerprint)
+        self._fingerprint = None
+
+        # per-address neighbor lists sorted by distance (see build_neighbor_lists)
+        self.neighbors = None
+        self.neighbor_k = None
     
     # simple load helper used by main.py
     def load(self, addresses, distance_matrix):
@@ -15,116 +45,273 @@ class DistanceTable:
         # store addresses and matrix with correct attribute names
         self.addresses = addresses
         self.distance_matrix = distance_matrix
-    
-    # instance method to get distance between two addresses (robust-ish)
-    def get_distance(self, address1, address2):
 
-        # small normalizer for address strings
-        def norm(s):
-            if s is None:
-                return ""
+        # anything cached against the old data is stale now
+        self._index_cache = {}
+        self._norm_index = None
+        self._array = None
+        self._closure = None
+        self._fingerprint = None
+        self.neighbors = None
 
-            # more aggressive normalization to handle format differences
-            s = str(s).lower().strip().replace('"', "").replace("\n", " ")
+    @classmethod
+    def from_coordinates(cls, addresses, lats, lons, circuity=1.0):
+        """
+        Table for a service area that has no hand-built distance CSV: straight
+        line (haversine) miles between every pair of coordinates, times a road
+        circuity factor (roads aren't straight, ~1.2-1.4 is typical for a city grid).
+        """
+        table = cls(list(addresses), haversine_matrix(lats, lons, circuity))
 
-            # remove extra whitespace
-            s = ' '.join(s.split())
+        # great-circle miles already obey the triangle inequality, nothing to close
+        table._closure = table.distance_matrix
+        return table
+    
+    # instance method to get distance between two addresses (robust-ish)
+    def get_distance(self, address1, address2):
 
-            return s
+        i = self.find_index(address1)
+        j = self.find_index(address2)
         
-        def extract_street_address(addr):
-            """extract just the street address part from full address"""
-
-            normalized = norm(addr)
-
-            # look for street address patterns like "4580 s 2300 e"
-
-            parts = normalized.split()
-            street_parts = []
-            for part in parts:
-
-                # keep parts that look like addresses (numbers, directions, street types)
-                if any(char.isdigit() for char in part) or part in ['s', 'n', 'e', 'w', 'south', 'north', 'east', 'west', 'st', 'ave', 'blvd', 'rd', 'station', 'loop']:
-                    street_parts.append(part)
-
-            return ' '.join(street_parts)
+        # if either index still not found, return reasonable default instead of crashing
+        if i is None or j is None:
+            print(f"Distance: 2.0 (default - no match found)")
+            return 2.0
         
-        a1 = norm(address1)
-        a2 = norm(address2)
-        a1_street = extract_street_address(address1)
-        a2_street = extract_street_address(address2)
+        # Handle same location
+        if i == j:
+            print(f"Distance: 0.0 (same location)")
+            return 0.0
         
-        # try exact matches first
-        i = j = None
-
-        for idx, a in enumerate(self.addresses):
-            if norm(a) == a1:
-                i = idx
-                break
-        for idx, a in enumerate(self.addresses):
-            if norm(a) == a2:
-                j = idx
-                break
+        distance = self.distance_by_index(i, j)
+        if distance is not None:
+            print(f"Distance: {distance}")
+            return distance
         
-        # fallback: try street address matching
-        if i is None and a1_street:
-            for idx, a in enumerate(self.addresses):
+        # Fallback
+        print(f"Distance: 2.0 (default - matrix error)")
+        return 2.0
 
-                addr_street = extract_street_address(a)
-                if addr_street and a1_street in addr_street:
-                    i = idx
+    # resolve an address string to its row/column in the matrix
+    def find_index(self, address):
+        """
+        Return the matrix index for an address, or None if nothing matches.
+        Results are cached so the string normalization only runs once per address.
+        """
+        if address in self._index_cache:
+            return self._index_cache[address]
 
-                    break
-        
-        if j is None and a2_street:
-            for idx, a in enumerate(self.addresses):
+        a = _norm(address)
+        a_street = _extract_street_address(address)
 
-                addr_street = extract_street_address(a)
+        # try exact matches first (one dict lookup, built the first time through)
+        if self._norm_index is None:
+            self._norm_index = {}
+            for idx, candidate in enumerate(self.addresses):
+                self._norm_index.setdefault(_norm(candidate), idx)
+        i = self._norm_index.get(a)
 
-                if addr_street and a2_street in addr_street:
-                    j = idx
+        # fallback: try street address matching
+        if i is None and a_street:
+            for idx, candidate in enumerate(self.addresses):
+                addr_street = _extract_street_address(candidate)
+                if addr_street and a_street in addr_street:
+                    i = idx
                     break
-        
+
         # final fallback: substring matching
         if i is None:
-            for idx, a in enumerate(self.addresses):
-                na = norm(a)
-                if a1 and (a1 in na or na in a1):
+            for idx, candidate in enumerate(self.addresses):
+                na = _norm(candidate)
+                if a and (a in na or na in a):
                     i = idx
                     break
-        
-        if j is None:
-            for idx, a in enumerate(self.addresses):
-                na = norm(a)
-                if a2 and (a2 in na or na in a2):
-                    j = idx
-                    break
-        
-        # if either index still not found, return reasonable default instead of crashing
-        if i is None or j is None:
-            print(f"Distance: 2.0 (default - no match found)")
-            return 2.0
-        
-        # Handle same location
+
+        self._index_cache[address] = i
+        return i
+
+    # raw matrix lookup once both addresses are already resolved
+    def distance_by_index(self, i, j):
+        """Return the distance between two matrix indexes, or None if the cell is missing."""
         if i == j:
-            print(f"Distance: 0.0 (same location)")
             return 0.0
-        
+
         # For lower triangular matrix: larger index is row, smaller is column
         row = max(i, j)
         col = min(i, j)
-        
+
         try:
             if row < len(self.distance_matrix) and col < len(self.distance_matrix[row]):
-                distance = float(self.distance_matrix[row][col])
-                print(f"Distance: {distance}")
-                return distance
+                return float(self.distance_matrix[row][col])
         except (IndexError, ValueError):
             pass
-        
-        # Fallback
-        print(f"Distance: 2.0 (default - matrix error)")
-        return 2.0
+
+        return None
+
+    # distance between two location IDs (matrix indexes), what routing uses once addresses are interned
+    def miles(self, i, j):
+        """Distance between two location IDs, with get_distance's 2.0 default if either never resolved."""
+        if i is None or j is None:
+            return 2.0
+        distance = self.distance_by_index(i, j)
+        return distance if distance is not None else 2.0
+
+    def as_array(self):
+        """
+        The whole matrix as a symmetric numpy array (location ID x location ID),
+        made once. A full array from from_coordinates is used as is.
+        """
+        if self._array is None:
+            n = len(self.addresses)
+            if isinstance(self.distance_matrix, np.ndarray) and self.distance_matrix.shape == (n, n):
+                self._array = self.distance_matrix
+            else:
+                # lower triangle from the CSV rows, mirrored (blank cells past a short row stay 2.0 like miles())
+                lower = np.full((n, n), 2.0)
+                for i, row in enumerate(self.distance_matrix[:n]):
+                    k = min(len(row), i + 1)
+                    lower[i, :k] = [float(d) for d in row[:k]]
+                lower = np.tril(lower, -1)
+                self._array = lower + lower.T
+        return self._array
+
+    def fingerprint(self):
+        """Short hash of the service area (every address and the miles between them), made once."""
+        if self._fingerprint is None:
+            digest = hashlib.sha1("\n".join(self.addresses).encode("utf-8"))
+            digest.update(np.ascontiguousarray(self.as_array(), dtype=float).tobytes())
+            self._fingerprint = digest.hexdigest()[:16]
+        return self._fingerprint
+
+    def shortest_paths(self):
+        """
+        Fewest miles between every pair going through any other locations, made once.
+        The hand-built table isn't a metric (going via a third stop is sometimes
+        shorter than the direct cell), so this is what a lower bound on the miles
+        between two stops has to use.
+        """
+        if self._closure is None:
+            self._closure = shortest_path_closure(self.as_array())
+        return self._closure
+
+    # precompute every address's neighbors sorted by distance
+    def build_neighbor_lists(self, k=None):
+        """
+        For each address index store the other indexes ordered nearest first
+        (the address itself comes first at 0.0). If k is given only the k
+        nearest are kept, otherwise it's a full argsort of the row.
+        """
+        matrix = self.as_array()
+        self.neighbor_k = k
+
+        # stable sort so ties keep index order (the address itself wins its own 0.0)
+        ordered = np.argsort(matrix, axis=1, kind="stable")
+        if k is not None:
+            ordered = ordered[:, :k]
+        self.neighbors = ordered.tolist()
+
+        return self.neighbors
+
+    def nearest_neighbors(self, index):
+        """Neighbor list for one address index (built on first use)."""
+        if self.neighbors is None:
+            self.build_neighbor_lists()
+        return self.neighbors[index]
+
+
+def shortest_path_closure(matrix):
+    """Floyd-Warshall over a square miles matrix (a new array, one numpy pass per intermediate stop)."""
+    closure = np.array(matrix, dtype=float)
+    for k in range(len(closure)):
+        np.minimum(closure, closure[:, k, None] + closure[None, k, :], out=closure)
+    return closure
+
+
+def haversine_matrix(lats, lons, circuity=1.0, dtype=np.float32, block_rows=2048):
+    """
+    Great-circle miles between every pair of points, scaled by circuity.
+    Vectorized over the whole matrix, a block of rows at a time so the float64
+    temporaries stay small. float32 by default: 10k points is 400 MB instead of 800.
+    """
+    lat = np.radians(np.asarray(lats, dtype=np.float64))
+    lon = np.radians(np.asarray(lons, dtype=np.float64))
+
+    # points as unit vectors: the haversine term is then a quarter of the squared
+    # chord, |a - b|^2 / 4 = (1 - a.b) / 2, so each block is one matrix product
+    # instead of sin / cos over every pair
+    points = np.column_stack((np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)))
+    scale = 2 * EARTH_RADIUS_MILES * circuity
+
+    miles = np.empty((len(lat), len(lat)), dtype=dtype)
+    for start in range(0, len(lat), block_rows):
+        h = (1.0 - points[start:start + block_rows] @ points.T) / 2
+        miles[start:start + block_rows] = scale * np.arcsin(np.sqrt(np.clip(h, 0.0, 1.0)))
+    np.fill_diagonal(miles, 0.0)
+    return miles
+
+
+# small normalizer for address strings
+def _norm(s):
+    if s is None:
+        return ""
+
+    # more aggressive normalization to handle format differences
+    s = str(s).lower().strip().replace('"', "").replace("\n", " ")
+
+    # commas come and go between the csv files (the hub row has "700 East, Salt Lake City, UT")
+    s = s.replace(",", " ")
+
+    # remove extra whitespace
+    s = ' '.join(s.split())
+
+    return s
+
+
+def _extract_street_address(addr):
+    """extract just the street address part from full address"""
+
+    normalized = _norm(addr)
+
+    # look for street address patterns like "4580 s 2300 e"
+
+    parts = normalized.split()
+    street_parts = []
+    for part in parts:
+
+        # keep parts that look like addresses (numbers, directions, street types)
+        if any(char.isdigit() for char in part) or part in ['s', 'n', 'e', 'w', 'south', 'north', 'east', 'west', 'st', 'ave', 'blvd', 'rd', 'station', 'loop']:
+            street_parts.append(part)
+
+    return ' '.join(street_parts)
+
+
+# ---------------------------------------------------
+#  Location IDs
+# ---------------------------------------------------
+#
+# Addresses get resolved to their matrix index (the location ID) once and the ID
+# rides along on the Package / Truck, so routing compares and looks up plain
+# ints. None means the address never matched a row (distances use the 2.0 default).
+
+def intern_locations(hashtable, distance_table):
+    """Set Package.location_id for every package in the table (its corrected address if it has one)."""
+    for package_id in hashtable.keys():
+        package = hashtable.get(package_id)
+        package.location_id = distance_table.find_index(delivery_address(package))
+
+
+def package_location(package, distance_table):
+    """A package's location ID, resolved on first use if it wasn't interned at load."""
+    if package.location_id is None:
+        package.location_id = distance_table.find_index(delivery_address(package))
+    return package.location_id
+
+
+def truck_location(truck, distance_table):
+    """Location ID of wherever the truck is right now."""
+    if truck.current_location_id is None:
+        truck.current_location_id = distance_table.find_index(truck.current_location)
+    return truck.current_location_id
 
 
 # top-level helper function expected by routing.py: get_distance(addr1, addr2, distance_table)
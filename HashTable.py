@@ -1,29 +1,75 @@
+# marks an empty slot in direct-address mode (None is a legit value to store).
+# pickles by name, so a table sent to a worker process still recognizes its empty slots
+class _Empty:
+    def __reduce__(self):
+        return "_EMPTY"
+
+    def __repr__(self):
+        return "<empty>"
+
+
+_EMPTY = _Empty()
+
+
 # This class will implement a simple hash table with basic operations
+#
+# package IDs are dense integers starting at 1, so while every key is a small
+# non-negative int the table skips hashing and keeps values in a plain list
+# indexed by the key (slots[key]). the first key that doesn't fit (not an int,
+# negative, or way past the keys we have) moves everything into the hashed
+# buckets and the table stays hashed from then on
 class HashTable:
     
     # Set size to 40 because that's how many packages we have in the project
     # thoughts on making this size dynamic later?
-    def __init__(self, size = 40):
+    def __init__(self, size = 40, direct = True):
 
         # Initialize the hash table with a specified size
         self.size = size
 
         # list of empty lists
-        self.table = [[] for _ in range(40)]  
+        self.table = [[] for _ in range(size)]
+
+        # direct-address slots (None once we've fallen back to hashing)
+        self.slots = [] if direct else None
+        self._count = 0
        
     # hash function to get keys for indices in the table
     def _hash(self, key):
         """Private method to compute the hash value for a given key."""
 
         # modulo to map a key (like package_id) to a bucket index
-        return key % self.size
+        # (hash() of a small int is the int itself, so package IDs land where they always did)
+        return hash(key) % self.size
+
+    def _fits_direct(self, key):
+        """True if key can live in the slot list without making it mostly empty."""
+        if type(key) is not int or key < 0:
+            return False
+        return key < len(self.slots) or key < 2 * max(self.size, self._count + 1)
 
+    def _to_hashed(self):
+        """Sparse key showed up: move every slot into the buckets."""
+        slots, self.slots = self.slots, None
+        for key, value in enumerate(slots):
+            if value is not _EMPTY:
+                self.table[self._hash(key)].append((key, value))
 
     # insert method to add a key-value pair to the hash table
     def insert(self, key, value):
        
         # - check if the key already exists in the bucket
         """Add a key-value pair to the hashmap."""
+        if self.slots is not None:
+            if self._fits_direct(key):
+                if key >= len(self.slots):
+                    self.slots.extend([_EMPTY] * (key + 1 - len(self.slots)))
+                if self.slots[key] is _EMPTY:
+                    self._count += 1
+                self.slots[key] = value
+                return
+            self._to_hashed()
+
         if key in self.table:
 
             # if it exists, update the value
@@ -56,6 +102,14 @@ class HashTable:
         
         # - if key in self.data:
 
+        # direct mode: the key is the index
+        slots = self.slots
+        if slots is not None:
+            if type(key) is int and 0 <= key < len(slots):
+                value = slots[key]
+                return None if value is _EMPTY else value
+            return None
+
         # use _hash to find the bucket index
         index = self._hash(key)
 
@@ -80,6 +134,13 @@ class HashTable:
         """Remove the key-value pair associated with the given key."""
         # - if key in self.data:
 
+        if self.slots is not None:
+            if type(key) is int and 0 <= key < len(self.slots) and self.slots[key] is not _EMPTY:
+                self.slots[key] = _EMPTY
+                self._count -= 1
+                return True
+            return False
+
         # use _hash to find the bucket index
         index = self._hash(key)
 
@@ -94,12 +155,15 @@ class HashTable:
                 del bucket[i]
                 return True
        
-            # else, not found
-            return False
+        # else, not found
+        return False
 
 
     def keys(self):
         """Return a list of keys present in the table."""
+        if self.slots is not None:
+            return [k for k, v in enumerate(self.slots) if v is not _EMPTY]
+
         result = []
         for bucket in self.table:
             for k, _ in bucket:
@@ -112,6 +176,6 @@ class HashTable:
     def __str__(self):
          """Return a string representation of the HashMap."""
         
-         return str(self.data)
+         return str({k: self.get(k) for k in self.keys()})
 
 
@@ -0,0 +1,161 @@
+import csv
+import json
+from array import array
+from datetime import datetime, timedelta
+
+
+# append-only record of every leg a truck drives. everything is stored in flat
+# typed arrays (locations interned to small ints, times as seconds into the day)
+# so a long simulation doesn't pile up dicts or formatted strings in memory
+class LegLog:
+    def __init__(self):
+        """
+        Initialize an empty LegLog with:
+        - locations: interned address strings, legs refer to them by position
+        - one typed array per column (from, to, distance, depart, arrive)
+        - package_start + packages: each leg's delivered IDs live in one flat array
+        """
+        self.locations = []
+        self._location_ids = {}
+
+        # midnight of the simulation day, set by the first leg
+        self.day = None
+
+        self.from_ids = array('I')
+        self.to_ids = array('I')
+        self.distances = array('d')
+        self.departs = array('i')
+        self.arrives = array('i')
+
+        # leg i delivered packages[package_start[i]:package_start[i + 1]]
+        self.package_start = array('I')
+        self.packages = array('I')
+
+    def _intern(self, location):
+        location_id = self._location_ids.get(location)
+        if location_id is None:
+            location_id = len(self.locations)
+            self.locations.append(location)
+            self._location_ids[location] = location_id
+        return location_id
+
+    def _seconds(self, when):
+        if self.day is None:
+            self.day = datetime.combine(when.date(), datetime.min.time())
+        return int((when - self.day).total_seconds())
+
+    def append(self, from_location, to_location, distance, depart, arrive):
+        """Record a leg. Returns its index."""
+        self.from_ids.append(self._intern(from_location))
+        self.to_ids.append(self._intern(to_location))
+        self.distances.append(distance)
+        self.departs.append(self._seconds(depart))
+        self.arrives.append(self._seconds(arrive))
+        self.package_start.append(len(self.packages))
+        return len(self.from_ids) - 1
+
+    def add_delivery(self, package_id):
+        """Attach a delivered package to the most recent leg."""
+        self.packages.append(package_id)
+
+    def __len__(self):
+        return len(self.from_ids)
+
+    def leg_packages(self, i):
+        """Package IDs delivered at the end of leg i."""
+        end = self.package_start[i + 1] if i + 1 < len(self.package_start) else len(self.packages)
+        return list(self.packages[self.package_start[i]:end])
+
+    def total_distance(self):
+        return sum(self.distances)
+
+    def columns(self):
+        """The whole log as plain lists (JSON-ready), see from_columns."""
+        return {
+            "day": self.day.strftime("%Y-%m-%d") if self.day is not None else None,
+            "locations": list(self.locations),
+            "from_ids": self.from_ids.tolist(),
+            "to_ids": self.to_ids.tolist(),
+            "distances": self.distances.tolist(),
+            "departs": self.departs.tolist(),
+            "arrives": self.arrives.tolist(),
+            "package_start": self.package_start.tolist(),
+            "packages": self.packages.tolist(),
+        }
+
+    @classmethod
+    def from_columns(cls, columns):
+        log = cls()
+        log.day = datetime.strptime(columns["day"], "%Y-%m-%d") if columns["day"] else None
+        for location in columns["locations"]:
+            log._intern(location)
+        log.from_ids.extend(columns["from_ids"])
+        log.to_ids.extend(columns["to_ids"])
+        log.distances.extend(columns["distances"])
+        log.departs.extend(columns["departs"])
+        log.arrives.extend(columns["arrives"])
+        log.package_start.extend(columns["package_start"])
+        log.packages.extend(columns["packages"])
+        return log
+
+    def legs(self):
+        """Yield legs one at a time as (from, to, distance, depart, arrive, package_ids)."""
+        for i in range(len(self)):
+            yield (self.locations[self.from_ids[i]],
+                   self.locations[self.to_ids[i]],
+                   self.distances[i],
+                   self.day + timedelta(seconds=self.departs[i]),
+                   self.day + timedelta(seconds=self.arrives[i]),
+                   self.leg_packages(i))
+
+
+# ---------------------------------------------------
+#  Streaming Export
+# ---------------------------------------------------
+#
+# both exporters walk the logs lazily and only hold `buffer_lines` formatted
+# lines before flushing them to the file
+
+LEG_COLUMNS = ["truck_id", "leg", "from", "to", "distance", "depart", "arrive", "packages"]
+
+
+def _fleet_rows(trucks):
+    for truck in trucks:
+        for i, (start, end, distance, depart, arrive, package_ids) in enumerate(truck.leg_log.legs()):
+            yield truck.truck_id, i, start, end, distance, depart, arrive, package_ids
+
+
+def export_jsonl(trucks, path, buffer_lines=1000):
+    """Write every truck's legs to a JSON Lines file. Returns the number of legs written."""
+    count = 0
+    buffer = []
+    with open(path, "w") as f:
+        for row in _fleet_rows(trucks):
+            record = dict(zip(LEG_COLUMNS, row))
+            record["depart"] = record["depart"].strftime("%H:%M:%S")
+            record["arrive"] = record["arrive"].strftime("%H:%M:%S")
+            buffer.append(json.dumps(record) + "\n")
+            count += 1
+            if len(buffer) >= buffer_lines:
+                f.write("".join(buffer))
+                buffer.clear()
+        f.write("".join(buffer))
+    return count
+
+
+def export_csv(trucks, path, buffer_lines=1000):
+    """Write every truck's legs to a CSV file. Returns the number of legs written."""
+    count = 0
+    buffer = []
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(LEG_COLUMNS)
+        for truck_id, i, start, end, distance, depart, arrive, package_ids in _fleet_rows(trucks):
+            buffer.append([truck_id, i, start, end, distance, depart.strftime("%H:%M:%S"),
+                           arrive.strftime("%H:%M:%S"), " ".join(str(pid) for pid in package_ids)])
+            count += 1
+            if len(buffer) >= buffer_lines:
+                writer.writerows(buffer)
+                buffer.clear()
+        writer.writerows(buffer)
+    return count
@@ -10,27 +10,56 @@ class PackageStatus(Enum):
         DELAYED = "DELAYED"
 
 
+# attributes the package store keeps secondary indexes on (see PackageStore.py).
+# setting one tells the store the package moved, so mark_en_route / mark_delivered /
+# Truck.load_package / an address fix keep the indexes right without knowing they exist
+class _Indexed:
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, package, owner=None):
+        if package is None:
+            return self
+        return package.__dict__.get(self.name)
+
+    def __set__(self, package, value):
+        old = package.__dict__.get(self.name)
+        package.__dict__[self.name] = value
+        store = package.__dict__.get("_store")
+        if store is not None and old != value:
+            store.reindex(package, self.name, old, value)
+
+
 # this is the package class for the project
 class Package:
 
+    status = _Indexed()
+    truck_id = _Indexed()
+    city = _Indexed()
+    zip_code = _Indexed()
+    deadline = _Indexed()
+    delayed_until = _Indexed()
+
     # intit method for the parameters of the package class
-    def __init__(self, package_id, address, weight, city, zip_code, deadline, status=PackageStatus.AT_HUB, notes=None):
+    def __init__(self, package_id, address, weight, city, zip_code, deadline, status=PackageStatus.AT_HUB, notes=None,
+                 volume=0.0):
         self.id = package_id
         self.package_id = package_id
         self.address = address
-        self.weight = weight
+
+        # kilos and cubic feet, numbers so trucks can add them up (blank in the file means 0)
+        self.weight = float(weight) if weight not in (None, "") else 0.0
+        self.volume = float(volume) if volume not in (None, "") else 0.0
         self.city = city
         self.zip_code = zip_code
         self.deadline = deadline
-        
 
-        # handling delayed packages hard coded
-
-        if package_id in [6, 25, 28, 32]:
-            self.status = PackageStatus.DELAYED
+        # row in the distance table for the address (set once the addresses are interned)
+        self.location_id = None
+        
 
-        else:
-            self.status = PackageStatus.AT_HUB
+        # delayed packages get switched to DELAYED by their notes (see constraints.py)
+        self.status = status
 
 
         self.notes = notes
@@ -60,10 +89,12 @@ class Package:
         Automatically updates status and delivery_time.
         """
         
-        self.status = PackageStatus.DELIVERED
-        
         # format time as HH:MM AM/PM
+        # the time goes in before the status flips, so a reader on another thread that
+        # sees DELIVERED always sees its time too (see delivery_state)
         self.delivery_time = current_time.strftime("%I:%M %p")
+
+        self.status = PackageStatus.DELIVERED
         
         
     def mark_en_route(self, current_time: datetime):
@@ -72,14 +103,29 @@ class Package:
         Automatically updates status and delivery_time.
         """
         
-        self.status = PackageStatus.EN_ROUTE
-        
-        # format time as HH:MM AM/PM
+        # format time as HH:MM AM/PM (before the status, like mark_delivered)
         self.load_time = current_time.strftime("%I:%M %p")
+
+        self.status = PackageStatus.EN_ROUTE
+
+    def delivery_state(self):
+        """
+        (status, delivery_time) as one consistent pair, even while another thread is
+        in the middle of mark_delivered: a time without DELIVERED isn't published yet.
+        """
+        status = self.status
+        delivery_time = self.delivery_time
+        return status, delivery_time if status == PackageStatus.DELIVERED else None
         
+    def __getstate__(self):
+        # the store doesn't travel with the package (e.g. to a worker process)
+        state = self.__dict__.copy()
+        state.pop("_store", None)
+        return state
+
         # string representation of the package object for easy debugging and display
     def __str__(self):
-        return f"Package ID: {self.id}, Address: {self.address}, Weight: {self.weight}kg, City: {self.city}, Zip: {self.zip_code}, Deadline: {self.deadline}, Status: {self.status.value}, Delivery Time: {self.delivery_time}"
+        return f"Package ID: {self.id}, Address: {self.address}, Weight: {self.weight:g}kg, City: {self.city}, Zip: {self.zip_code}, Deadline: {self.deadline}, Status: {self.status.value}, Delivery Time: {self.delivery_time}"
 
             
 
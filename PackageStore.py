@@ -0,0 +1,148 @@
+import threading
+from bisect import bisect_right, insort
+from HashTable import HashTable
+from ConcurrentHashTable import ConcurrentHashTable
+
+
+# the package hash table plus secondary indexes, so "what's on truck 2",
+# "what's still delayed", "everything going to 84115" or "everything due by 10:30"
+# cost O(result) instead of a scan over every package. packages tell the store
+# when an indexed attribute changes (see Package._Indexed), so loading,
+# marking en route / delivered and address fixes keep the indexes current
+class PackageStore(HashTable):
+
+    # package attribute -> index it lives in
+    INDEXED = ("status", "truck_id", "city", "zip_code", "deadline", "delayed_until")
+
+    def __init__(self, size = 40, direct = True):
+        super().__init__(size, direct)
+
+        # attribute -> value -> set of package IDs
+        self.indexes = {attr: {} for attr in self.INDEXED}
+
+        # distinct deadlines in order, so "due by" walks buckets instead of packages
+        self._deadlines = []
+
+    # ---- keeping the indexes current ----
+
+    def _add(self, attr, value, package_id):
+        bucket = self.indexes[attr].get(value)
+        if bucket is None:
+            bucket = self.indexes[attr][value] = set()
+            if attr == "deadline" and value is not None:
+                insort(self._deadlines, value)
+        bucket.add(package_id)
+
+    def _discard(self, attr, value, package_id):
+        bucket = self.indexes[attr].get(value)
+        if bucket is None:
+            return
+        bucket.discard(package_id)
+        if not bucket:
+            del self.indexes[attr][value]
+            if attr == "deadline" and value is not None:
+                self._deadlines.remove(value)
+
+    def reindex(self, package, attr, old, new):
+        """A package's indexed attribute changed from old to new."""
+        self._discard(attr, old, package.id)
+        self._add(attr, new, package.id)
+
+    def insert(self, key, value):
+        """Add or replace a package, indexing it (and unindexing whatever it replaces)."""
+        old = self.get(key)
+        if old is not None and old is not value:
+            self._unindex(key, old)
+        super().insert(key, value)
+        if old is not value:
+            self._index(key, value)
+
+    def remove(self, key):
+        package = self.get(key)
+        removed = super().remove(key)
+        if removed and package is not None:
+            self._unindex(key, package)
+        return removed
+
+    def _index(self, key, package):
+        for attr in self.INDEXED:
+            self._add(attr, getattr(package, attr, None), key)
+        package._store = self
+
+    def _unindex(self, key, package):
+        for attr in self.INDEXED:
+            self._discard(attr, getattr(package, attr, None), key)
+        if package.__dict__.get("_store") is self:
+            del package._store
+
+    def __setstate__(self, state):
+        # packages drop their _store when pickled / deep-copied (see Package.__getstate__),
+        # so point the copies back at this store and index them over again
+        self.__dict__.update(state)
+        self.indexes = {attr: {} for attr in self.INDEXED}
+        self._deadlines = []
+        for key in self.keys():
+            self._index(key, self.get(key))
+
+    # ---- queries ----
+
+    def ids_where(self, attr, value):
+        """Sorted package IDs whose `attr` equals `value`."""
+        return sorted(self.indexes[attr].get(value, ()))
+
+    def ids_on_truck(self, truck_id):
+        return self.ids_where("truck_id", truck_id)
+
+    def ids_with_status(self, status):
+        return self.ids_where("status", status)
+
+    def ids_in_zip(self, zip_code):
+        return self.ids_where("zip_code", zip_code)
+
+    def ids_in_city(self, city):
+        return self.ids_where("city", city)
+
+    def ids_due_by(self, deadline):
+        """Sorted package IDs with a deadline at or before `deadline` (a time, like Package.deadline)."""
+        result = set()
+        for due in self._deadlines[:bisect_right(self._deadlines, deadline)]:
+            result |= self.indexes["deadline"][due]
+        return sorted(result)
+
+    def delayed_ids(self):
+        """Sorted IDs of packages with a delayed_until, delivered or not."""
+        return sorted(pid for until, ids in self.indexes["delayed_until"].items() if until is not None for pid in ids)
+
+
+# the same store on ConcurrentHashTable buckets, for serving status queries from other
+# threads while the simulation delivers. get() stays lock-free; the indexes are plain
+# dicts of sets, so every change to them and every query over them takes one lock
+class ConcurrentPackageStore(PackageStore, ConcurrentHashTable):
+
+    def __init__(self, size = 40):
+        self._index_lock = threading.Lock()
+        super().__init__(size)
+
+    def reindex(self, package, attr, old, new):
+        with self._index_lock:
+            super().reindex(package, attr, old, new)
+
+    def insert(self, key, value):
+        with self._index_lock:
+            super().insert(key, value)
+
+    def remove(self, key):
+        with self._index_lock:
+            return super().remove(key)
+
+    def ids_where(self, attr, value):
+        with self._index_lock:
+            return super().ids_where(attr, value)
+
+    def ids_due_by(self, deadline):
+        with self._index_lock:
+            return super().ids_due_by(deadline)
+
+    def delayed_ids(self):
+        with self._index_lock:
+            return super().delayed_ids()
@@ -0,0 +1,177 @@
+from datetime import timedelta
+from insertion import leg_miles, stop_window
+from DistanceTable import truck_location
+
+
+# a planned order of stops for one truck that keeps running totals, so editing
+# the route (insert / remove / swap a stop) updates the mileage and every ETA
+# after the edit without driving the truck through the whole thing again.
+# legs[p] is the miles into stop p, miles[p] the running total up to stop p and
+# arrive[p] the seconds after start_time the truck gets there (waits included)
+class Route:
+    def __init__(self, stops, start_index, start_time, speed, hashtable, distance_table, cost_model=None):
+        """
+        Initialize a Route with:
+        - stops: Stop objects in driving order
+        - start_index / start_time: where and when the truck sets off (distance table index, datetime)
+        - speed: truck speed in mph
+        - cost_model: CostModel for time-of-day speeds and service time (None: constant speed)
+        """
+        self.start_index = start_index
+        self.start_time = start_time
+        self.speed = speed
+        self.cost_model = cost_model
+        self._service = cost_model.service_time().total_seconds() if cost_model else 0.0
+        self.hashtable = hashtable
+        self.distance_table = distance_table
+
+        self.stops = []
+        self.legs = []
+        self.miles = []
+        self.arrive = []
+
+        # per stop (earliest, latest) in seconds after start_time, keyed by id(stop)
+        self._windows = {}
+
+        for stop in stops:
+            self._window(stop)
+            self.stops.append(stop)
+            self.legs.append(self._leg_into(len(self.stops) - 1))
+        self.miles = [0.0] * len(self.stops)
+        self.arrive = [0.0] * len(self.stops)
+        self._refresh_from(0)
+
+    @classmethod
+    def for_truck(cls, truck, stops, hashtable, distance_table):
+        """Route starting from wherever the truck is right now."""
+        return cls(stops, truck_location(truck, distance_table), truck.current_time,
+                   truck.speed, hashtable, distance_table, truck.cost_model)
+
+    def _window(self, stop):
+        window = self._windows.get(id(stop))
+        if window is None:
+            earliest, latest = stop_window(stop, self.hashtable, self.start_time.date())
+            opens = max(0.0, (earliest - self.start_time).total_seconds()) if earliest else 0.0
+            window = (opens, (latest - self.start_time).total_seconds())
+            self._windows[id(stop)] = window
+        return window
+
+    def _index_at(self, p):
+        """Distance table index of position p, -1 is the truck's start."""
+        return self.start_index if p < 0 else self.stops[p].location_index
+
+    def _leg_into(self, p):
+        return leg_miles(self.distance_table, self._index_at(p - 1), self.stops[p].location_index)
+
+    def _leg_seconds(self, q, clock):
+        """Driving time into stop q leaving `clock` seconds after the start."""
+        if self.cost_model is None:
+            return self.legs[q] * 3600.0 / self.speed
+        depart = self.start_time + timedelta(seconds=clock)
+        return self.cost_model.travel_time(self._index_at(q - 1), self.stops[q].location_index,
+                                           depart, self.speed, self.legs[q]).total_seconds()
+
+    def _refresh_from(self, p):
+        """Redo the running mileage and arrival times from position p to the end."""
+        miles = self.miles[p - 1] if p > 0 else 0.0
+        clock = self.arrive[p - 1] + self._service if p > 0 else 0.0
+
+        for q in range(p, len(self.stops)):
+            miles += self.legs[q]
+            opens, _ = self._window(self.stops[q])
+            clock = max(clock, opens)
+            clock += self._leg_seconds(q, clock)
+            self.miles[q] = miles
+            self.arrive[q] = clock
+            clock += self._service
+
+    # ---- queries ----
+
+    def __len__(self):
+        return len(self.stops)
+
+    def __iter__(self):
+        return iter(self.stops)
+
+    def __getitem__(self, p):
+        return self.stops[p]
+
+    def total_miles(self):
+        return self.miles[-1] if self.miles else 0.0
+
+    def eta(self, p):
+        """When the truck gets to stop p (datetime)."""
+        return self.start_time + timedelta(seconds=self.arrive[p])
+
+    def finish_time(self):
+        return self.eta(len(self.stops) - 1) if self.stops else self.start_time
+
+    def hours(self):
+        """Hours on the clock from setting off to finishing the last stop (waits and service included)."""
+        return (self.arrive[-1] + self._service) / 3600.0 if self.stops else 0.0
+
+    def cost(self):
+        """Weighted miles and hours from the cost model (plain miles without one)."""
+        if self.cost_model is None:
+            return self.total_miles()
+        return self.cost_model.cost(self.total_miles(), self.hours())
+
+    def late_stops(self):
+        """Positions whose ETA is past the stop's deadline."""
+        return [p for p, stop in enumerate(self.stops) if self.arrive[p] > self._window(stop)[1]]
+
+    def insert_cost(self, stop, pos):
+        """Extra miles from putting `stop` at `pos`, without changing anything."""
+        prev_index = self._index_at(pos - 1)
+        added = leg_miles(self.distance_table, prev_index, stop.location_index)
+        if pos < len(self.stops):
+            next_index = self.stops[pos].location_index
+            added += leg_miles(self.distance_table, stop.location_index, next_index)
+            added -= self.legs[pos]
+        return added
+
+    def remove_cost(self, pos):
+        """Miles saved by dropping the stop at `pos` (negative of the change)."""
+        saved = self.legs[pos]
+        if pos + 1 < len(self.stops):
+            saved += self.legs[pos + 1]
+            saved -= leg_miles(self.distance_table, self._index_at(pos - 1), self.stops[pos + 1].location_index)
+        return saved
+
+    # ---- edits ----
+
+    def insert(self, stop, pos):
+        """Put `stop` at position `pos` and update everything downstream."""
+        self._window(stop)
+        self.stops.insert(pos, stop)
+        self.legs.insert(pos, self._leg_into(pos))
+        self.miles.insert(pos, 0.0)
+        self.arrive.insert(pos, 0.0)
+        if pos + 1 < len(self.stops):
+            self.legs[pos + 1] = self._leg_into(pos + 1)
+        self._refresh_from(pos)
+
+    def remove(self, pos):
+        """Take the stop at `pos` out of the route. Returns it."""
+        stop = self.stops.pop(pos)
+        self.legs.pop(pos)
+        self.miles.pop(pos)
+        self.arrive.pop(pos)
+        if pos < len(self.stops):
+            self.legs[pos] = self._leg_into(pos)
+        self._refresh_from(pos)
+        return stop
+
+    def swap(self, i, j):
+        """Exchange the stops at positions i and j."""
+        if i == j:
+            return
+        i, j = min(i, j), max(i, j)
+        self.stops[i], self.stops[j] = self.stops[j], self.stops[i]
+        for p in {i, i + 1, j, j + 1}:
+            if p < len(self.stops):
+                self.legs[p] = self._leg_into(p)
+        self._refresh_from(i)
+
+    def __str__(self):
+        return f"Route: {len(self.stops)} stops, {self.total_miles():.2f} miles, done at {self.finish_time()}"
@@ -0,0 +1,89 @@
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+
+# plans for routes we've driven before. most of a day's manifest repeats the
+# day before's stops, so a truck leaving at the same time with the same stops
+# and the same windows gets yesterday's stop order back instead of replanning.
+# entries are keyed by a fingerprint of what the planner actually sees (stop
+# locations + time windows, start spot + time, speed, strategy, and the service
+# area + cost model the miles and times come from), not package IDs, so it hits
+# across days. least recently used entries go first once the
+# cache is over max_entries, and it lives in a JSON file between runs
+class RouteCache:
+    def __init__(self, path=None, max_entries=512):
+        """
+        Initialize a RouteCache with:
+        - path: JSON file to load from / save to (None keeps it in memory only)
+        - max_entries: size budget, the least recently used plans get evicted past it
+        """
+        self.path = path
+        self.max_entries = max_entries
+
+        # fingerprint -> {"order": [stop keys], "miles": float, "late": int}, oldest first
+        self.entries = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.rejected = 0
+
+        if path and os.path.exists(path):
+            with open(path) as f:
+                for key, entry in json.load(f):
+                    self.entries[key] = entry
+
+    @staticmethod
+    def fingerprint(strategy, start_key, start_time, speed, stops, area=None, costs=None):
+        """
+        Canonical key for a planning problem. stops is [(stop key, earliest, latest)]
+        with the window as minutes after start_time (None if it's open), any order.
+        area is the distance table's fingerprint (stop keys are its indexes) and costs
+        the cost model's parameters (None: constant speed, no service time).
+        """
+        canonical = json.dumps({
+            "strategy": strategy,
+            "start": start_key,
+            "depart": start_time.strftime("%H:%M:%S"),
+            "speed": speed,
+            "stops": sorted(stops, key=str),
+            "area": area,
+            "costs": costs,
+        }, sort_keys=True, default=str)
+        return hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """The stored entry (and mark it recently used), or None."""
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key, order, miles, late):
+        self.entries[key] = {"order": list(order), "miles": round(miles, 4), "late": late}
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def reject(self, key):
+        """A hit that failed validation: drop it so the fresh plan replaces it."""
+        self.entries.pop(key, None)
+        self.hits -= 1
+        self.misses += 1
+        self.rejected += 1
+
+    def save(self, path=None):
+        """Write the cache out (oldest first, so LRU order survives a reload). Returns the entry count."""
+        path = path or self.path
+        temp = path + ".tmp"
+        with open(temp, "w") as f:
+            json.dump(list(self.entries.items()), f)
+        os.replace(temp, path)
+        return len(self.entries)
+
+    def stats(self):
+        return {"entries": len(self.entries), "hits": self.hits, "misses": self.misses, "rejected": self.rejected}
@@ -0,0 +1,45 @@
+from Package import PackageStatus
+from constraints import available_time
+
+
+# a stop is one physical place the truck drives to. several packages can share
+# an address (e.g. 300 State St, 410 S State St) so we group them up and
+# deliver them all in one go instead of paying a hop per package
+class Stop:
+    def __init__(self, location_index, address):
+        """
+        Initialize a Stop with:
+        - location_index: row/column in the distance table (None if the address never resolved)
+        - address: address string used to drive there
+        - package_ids: packages on the truck going to this address
+        """
+        self.location_index = location_index
+        self.address = address
+        self.package_ids = []
+
+    def add_package(self, package_id):
+        """Attach another package to this stop."""
+        if package_id not in self.package_ids:
+            self.package_ids.append(package_id)
+
+    def pending_ids(self, hashtable):
+        """Package IDs at this stop that are not delivered yet."""
+        return [pid for pid in self.package_ids
+                if hashtable.get(pid).status != PackageStatus.DELIVERED]
+
+    def ready_ids(self, hashtable, current_time):
+        """Pending package IDs that are also past any delay (or address fix) at current_time."""
+        ready = []
+        for pid in self.pending_ids(hashtable):
+            ready_at = available_time(hashtable.get(pid))
+            if ready_at and current_time < ready_at:
+                continue
+            ready.append(pid)
+        return ready
+
+    def is_done(self, hashtable):
+        """True once every package at this stop is delivered."""
+        return not self.pending_ids(hashtable)
+
+    def __str__(self):
+        return f"Stop {self.location_index}: {self.address} ({len(self.package_ids)} packages: {self.package_ids})"
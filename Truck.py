@@ -1,28 +1,57 @@
 
 
-from Package import Package
-from datetime import timedelta, datetime
+from LegLog import LegLog
+from Depot import WGU_HUB_ADDRESS
+from datetime import timedelta
 
 class Truck:
-    def __init__(self, truck_id, capacity=16, start_location="Western Governors University 4001 South 700 East Salt Lake City UT 84107", start_time=0, speed=18):
+    def __init__(self, truck_id, capacity=16, start_location=None, start_time=0, speed=18, depot=None, cost_model=None,
+                 max_weight=None, max_volume=None):
         """
         Initialize a Truck object with:
         - truck_id: unique identifier for the truck
         - capacity: maximum number of packages it can carry (default 16)
+        - max_weight / max_volume: load limits in kilos / cubic feet (None: no limit)
         - current_location (starts at hub)
         - mileage (starts at 0)
         - current_time (track delivery progress)
         - start_time: initial time when the truck starts (default 0)
+        - hub_location: where the truck returns to reload between trips
+        - trip_history: package IDs from each finished trip
+        - depot: Depot the truck is based at (start_location defaults to it, or the WGU hub)
+        - cost_model: CostModel for time-of-day speeds and service time (None: constant speed, no service time)
         """
+        if start_location is None:
+            start_location = depot.address if depot is not None else WGU_HUB_ADDRESS
+
         self.truck_id = truck_id
         self.capacity = capacity
+        self.max_weight = max_weight
+        self.max_volume = max_volume
         self.current_location = start_location
+
+        # distance table index of current_location, resolved on first use
+        self.current_location_id = None
         self.mileage = 0
         self.current_time = start_time
         self.start_time = start_time
         self.speed = speed
+        self.cost_model = cost_model
         # stores packageIDs
         self.packages = []
+
+        # multi-trip bookkeeping: where to reload and what earlier trips carried
+        self.hub_location = start_location
+        self.trip_history = []
+        self.depot_id = None
+        if depot is not None:
+            depot.add_truck(self)
+
+        # package IDs in the order they actually got dropped off (the routing decisions)
+        self.delivery_order = []
+
+        # every leg driven (from, to, miles, depart, arrive, packages dropped)
+        self.leg_log = LegLog()
     
         # need method to load packages onto truck
     def load_package(self, package_id, hashtable):
@@ -35,12 +64,17 @@ class Truck:
         
         if len(self.packages) >= self.capacity:
             raise Exception(f"Truck {self.truck_id} is at full capacity. Cannot load more packages.")
-            
-        self.packages.append(package_id)
-        
+
         # automatically update the package's status to en_route and record the load time
         # after grabbing the package_id from the hash table
         package = hashtable.get(package_id)
+        if not self.can_fit(package, hashtable):
+            _, weight, volume = self.load(hashtable)
+            raise Exception(f"Truck {self.truck_id} can't take package {package_id} ({package.weight:g} kg) "
+                            f"on top of {weight:g} kg / {volume:g} cu ft")
+            
+        self.packages.append(package_id)
+        
         package.truck_id = self.truck_id
         
         # only mark en_route if truck has a start time (driver available)
@@ -63,23 +97,102 @@ class Truck:
         package = hashtable.get(package_id)  # Use the parameter, not self.hashtable
         if package:
             package.mark_delivered(self.current_time)
+            self.delivery_order.append(package_id)
+
+            # a drop-off without any driving yet still gets a (zero mile) leg to hang on
+            if len(self.leg_log) == 0:
+                self.leg_log.append(self.current_location, self.current_location, 0.0, self.current_time, self.current_time)
+            self.leg_log.add_delivery(package_id)
             print(f"Package {package_id} delivered at {self.current_time}")
             return True
         else:
             print(f"Package {package_id} not found!")
             return False
 
-    def update_location(self, new_location, distance, time_taken):
+    def update_location(self, new_location, distance, time_taken, location_id=None):
         """
         Updates the truck's current location, mileage, and time after a delivery.
+        location_id is the new location's distance table index if the caller knows it.
         """
+        previous_location = self.current_location
+        depart = self.current_time
+
         self.current_location = new_location
+        self.current_location_id = location_id
         self.mileage += distance
-        # calculate time taken as timedelta based on speed
-        time_taken = timedelta(hours=distance / self.speed)
+
+        # callers work the leg time out with travel_time, fall back to plain speed if they didn't
+        if time_taken is None:
+            time_taken = timedelta(hours=distance / self.speed)
         self.current_time += time_taken
+
+        self.leg_log.append(previous_location, new_location, distance, depart, self.current_time)
         
             
+    def travel_time(self, distance, from_id=None, to_id=None, when=None):
+        """
+        How long driving `distance` miles between two location IDs takes
+        leaving at `when` (default: now). Constant speed without a cost model.
+        """
+        if self.cost_model is None:
+            return timedelta(hours=distance / self.speed)
+        return self.cost_model.travel_time(from_id, to_id, when or self.current_time, self.speed, distance)
+
+    def seconds_per_mile(self, when=None):
+        """Seconds per mile at the speed the truck drives at `when` (default: now)."""
+        if self.cost_model is None:
+            return 3600.0 / self.speed
+        return 3600.0 / self.cost_model.speed_at(self.speed, when or self.current_time)
+
+    def speed_changes(self, start, end):
+        """(seconds after start, seconds per mile) for each speed the truck drives at between start and end."""
+        if self.cost_model is None:
+            return [(0.0, 3600.0 / self.speed)]
+        return [(offset, 3600.0 / (self.speed * factor)) for offset, factor in self.cost_model.buckets_between(start, end)]
+
+    def service_time(self):
+        """Time spent at each stop handing packages over."""
+        return self.cost_model.service_time() if self.cost_model else timedelta(0)
+
+    def load(self, hashtable):
+        """(packages, kilos, cubic feet) currently on board."""
+        weight = 0.0
+        volume = 0.0
+        for package_id in self.packages:
+            package = hashtable.get(package_id)
+            weight += package.weight
+            volume += package.volume
+        return len(self.packages), weight, volume
+
+    def can_fit(self, package, hashtable, load=None):
+        """True if the package fits on top of `load` (default: what's on board now) on every dimension."""
+        count, weight, volume = load if load is not None else self.load(hashtable)
+        if count + 1 > self.capacity:
+            return False
+        if self.max_weight is not None and weight + package.weight > self.max_weight:
+            return False
+        if self.max_volume is not None and volume + package.volume > self.max_volume:
+            return False
+        return True
+
+    # method to clear the truck out for another run from the hub
+    def start_new_trip(self):
+        """
+        Archive the current load into trip_history and empty the truck
+        so it can be loaded back up to capacity.
+        """
+        if self.packages:
+            self.trip_history.append(self.packages)
+        self.packages = []
+
+    def all_packages(self):
+        """Every package ID this truck carried, across all trips."""
+        result = []
+        for trip in self.trip_history:
+            result.extend(trip)
+        result.extend(self.packages)
+        return result
+
     # method to check to see if a package is loaded onto the truck    
     def has_package(self, package_id):
         """
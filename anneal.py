@@ -0,0 +1,341 @@
+# anneal.py - whole-fleet plan improvement with island-model simulated annealing
+#
+# run with: python anneal.py [seconds] [islands]   (WGUPS day, regret plan vs annealed plan)
+
+import contextlib
+import io
+import math
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from DistanceTable import package_location, truck_location
+from constraints import group_for
+from insertion import plan_route
+from routing import available_time, build_stops
+
+# ---------------------------------------------------
+#  Fleet Annealing
+# ---------------------------------------------------
+#
+# A fleet plan is, per truck, which packages it carries and the order it visits
+# their stops. Moves: reorder a truck's stops (relocate, swap, reverse a segment)
+# or hand a package (with its deliver-together group) to another truck that's
+# allowed to take it. Cost is total miles plus a heavy penalty per late minute
+# (timed at the truck's base speed, the real drive afterwards uses its cost model).
+#
+# Several islands anneal independently in a process pool. Every epoch each island
+# runs a fixed number of moves, then the islands trade bests around a ring (an
+# island adopts its neighbor's best if it beats its own current plan). The distance
+# matrix goes into shared memory once and every worker maps it read-only.
+#
+# Seeding is deterministic: island i, epoch e always uses Random(f"{seed}-{i}-{e}"), so
+# the same seed and the same number of epochs gives the same plan. The wall-clock
+# budget only decides how many epochs get to run.
+
+# miles charged per minute late, big enough that being on time always wins
+LATE_PENALTY = 100.0
+
+# annealing temperature (in miles) at the first and last epoch
+START_TEMPERATURE = 3.0
+END_TEMPERATURE = 0.05
+
+_shared = {}
+
+
+def _attach(name, shape):
+    """Worker initializer: map the shared distance matrix (read-only)."""
+    block = shared_memory.SharedMemory(name=name)
+    matrix = np.ndarray(shape, dtype=np.float64, buffer=block.buf)
+    matrix.flags.writeable = False
+    _shared["block"] = block
+    _shared["miles"] = matrix
+
+
+def build_problem(trucks, hashtable, distance_table):
+    """
+    Flatten loaded trucks into plain data the workers can anneal:
+    - units: packages that must ride together, with location, ready / due seconds, restriction, kilos, cubic feet
+    - trucks: start location, start second, seconds per mile, service seconds, capacity / weight / volume limits
+    - plan: the starting plan, per truck [unit indexes, stop order]
+    Times are seconds after midnight, unresolved addresses share the extra last row.
+    """
+    fallback = len(distance_table.addresses)
+
+    def loc(index):
+        return fallback if index is None else index
+
+    unit_of = {}
+    units = []
+    for truck in trucks:
+        for package_id in truck.packages:
+            if package_id in unit_of:
+                continue
+            group = [pid for pid in group_for(hashtable.get(package_id)) if pid not in unit_of]
+            members = []
+            for pid in group:
+                package = hashtable.get(pid)
+                ready = available_time(package)
+                due = package.deadline
+                members.append((
+                    loc(package_location(package, distance_table)),
+                    _seconds(ready) if ready else 0,
+                    _seconds(due) if due != datetime.max.time() else None,
+                ))
+                unit_of[pid] = len(units)
+            restriction = {getattr(hashtable.get(pid), 'truck_restriction', None) for pid in group} - {None}
+            units.append({"ids": group, "members": members,
+                          "restriction": restriction.pop() if restriction else None,
+                          "weight": sum(hashtable.get(pid).weight for pid in group),
+                          "volume": sum(hashtable.get(pid).volume for pid in group)})
+
+    fleet = []
+    plan = []
+    for truck in trucks:
+        service = truck.service_time().total_seconds()
+        fleet.append({
+            "truck_id": truck.truck_id,
+            "start": loc(truck_location(truck, distance_table)),
+            "depart": _seconds(truck.current_time),
+            "seconds_per_mile": 3600.0 / truck.speed,
+            "service": service,
+            "capacity": truck.capacity,
+            "max_weight": math.inf if truck.max_weight is None else truck.max_weight,
+            "max_volume": math.inf if truck.max_volume is None else truck.max_volume,
+        })
+        truck_units = sorted({unit_of[pid] for pid in truck.packages})
+
+        # regret insertion order as the starting route
+        stops = [stop for stop in build_stops(truck, hashtable, distance_table).values() if not stop.is_done(hashtable)]
+        with contextlib.redirect_stdout(io.StringIO()):
+            route, _ = plan_route(truck, stops, hashtable, distance_table)
+        plan.append([truck_units, [loc(stop.location_index) for stop in route]])
+
+    return {"units": units, "trucks": fleet}, plan
+
+
+def _seconds(when):
+    return when.hour * 3600 + when.minute * 60 + when.second
+
+
+# ---------------------------------------------------
+#  Cost + Moves (run inside the workers)
+# ---------------------------------------------------
+
+def _truck_cost(miles, truck, units, unit_ids, order):
+    """(miles, late minutes) for one truck driving `order` with these units aboard."""
+    ready = {}
+    due = {}
+    for u in unit_ids:
+        for location, ready_at, due_at in units[u]["members"]:
+            ready[location] = max(ready.get(location, 0), ready_at)
+            if due_at is not None:
+                due[location] = min(due.get(location, due_at), due_at)
+
+    total = 0.0
+    late = 0.0
+    here = truck["start"]
+    clock = truck["depart"]
+    for location in order:
+        # hold where we are until the stop's packages can go, then drive
+        clock = max(clock, ready.get(location, 0))
+        leg = miles[here, location]
+        total += leg
+        clock += leg * truck["seconds_per_mile"]
+        if location in due and clock > due[location]:
+            late += (clock - due[location]) / 60
+        clock += truck["service"]
+        here = location
+    return total, late
+
+
+def _cost(miles, problem, plan):
+    total = 0.0
+    for truck, (unit_ids, order) in zip(problem["trucks"], plan):
+        truck_miles, late = _truck_cost(miles, truck, problem["units"], unit_ids, order)
+        total += truck_miles + LATE_PENALTY * late
+    return total
+
+
+def _locations(units, unit_ids):
+    return {member[0] for u in unit_ids for member in units[u]["members"]}
+
+
+def _neighbor(rng, problem, plan):
+    """A random nearby plan (copies only the trucks it touches), or None if the move didn't apply."""
+    trucks = problem["trucks"]
+    units = problem["units"]
+    t = rng.randrange(len(plan))
+    unit_ids, order = plan[t]
+    move = rng.random()
+
+    if move < 0.7 or len(plan) == 1:
+        if len(order) < 2:
+            return None
+        order = list(order)
+        i, j = sorted(rng.sample(range(len(order)), 2))
+        if move < 0.3:
+            order.insert(j, order.pop(i))
+        elif move < 0.5:
+            order[i], order[j] = order[j], order[i]
+        else:
+            order[i:j + 1] = reversed(order[i:j + 1])
+        new = list(plan)
+        new[t] = [unit_ids, order]
+        return new
+
+    # hand one unit to another truck
+    if not unit_ids:
+        return None
+    u = rng.choice(unit_ids)
+    other = rng.randrange(len(plan) - 1)
+    other += other >= t
+    target = trucks[other]
+    to_ids, to_order = plan[other]
+
+    restriction = units[u]["restriction"]
+    if restriction is not None and restriction != target["truck_id"]:
+        return None
+    if any(ready_at > target["depart"] for _, ready_at, _ in units[u]["members"]):
+        return None
+    if sum(len(units[x]["ids"]) for x in to_ids) + len(units[u]["ids"]) > target["capacity"]:
+        return None
+    if sum(units[x]["weight"] for x in to_ids) + units[u]["weight"] > target["max_weight"]:
+        return None
+    if sum(units[x]["volume"] for x in to_ids) + units[u]["volume"] > target["max_volume"]:
+        return None
+
+    from_ids = [x for x in unit_ids if x != u]
+    still_here = _locations(units, from_ids)
+    from_order = [location for location in order if location in still_here]
+
+    to_ids = sorted(to_ids + [u])
+    to_order = list(to_order)
+    for location in sorted(_locations(units, [u]) - set(to_order)):
+        to_order.insert(rng.randrange(len(to_order) + 1), location)
+
+    new = list(plan)
+    new[t] = [from_ids, from_order]
+    new[other] = [to_ids, to_order]
+    return new
+
+
+def _anneal_epoch(job):
+    """Worker: run `moves` annealing steps on one island. Returns (current, cost, best, best cost)."""
+    problem, plan, seed, moves, start_temperature, end_temperature = job
+    miles = _shared["miles"]
+    rng = random.Random(seed)
+
+    cost = _cost(miles, problem, plan)
+    best, best_cost = plan, cost
+    for step in range(moves):
+        temperature = start_temperature * (end_temperature / start_temperature) ** (step / moves)
+        candidate = _neighbor(rng, problem, plan)
+        if candidate is None:
+            continue
+        candidate_cost = _cost(miles, problem, candidate)
+        delta = candidate_cost - cost
+        if delta <= 0 or rng.random() < math.exp(-delta / temperature):
+            plan, cost = candidate, candidate_cost
+            if cost < best_cost - 1e-9:
+                best, best_cost = plan, cost
+    return plan, cost, best, best_cost
+
+
+# ---------------------------------------------------
+#  Driver
+# ---------------------------------------------------
+
+def anneal_fleet(trucks, hashtable, distance_table, budget=2.0, islands=None, seed=0,
+                 moves_per_epoch=4000, max_epochs=50):
+    """
+    Improve the loaded trucks' plan within `budget` wall-clock seconds.
+    Returns (plan, cost, epochs run): plan is per truck [unit indexes, stop order]
+    as produced by build_problem, use apply_plan to load and drive it.
+    """
+    problem, start_plan = build_problem(trucks, hashtable, distance_table)
+    islands = islands or min(4, os.cpu_count() or 1)
+
+    # distance matrix (plus the all-2.0 fallback row) into shared memory once
+    n = len(distance_table.addresses)
+    matrix = np.full((n + 1, n + 1), 2.0)
+    matrix[:n, :n] = distance_table.as_array()
+    block = shared_memory.SharedMemory(create=True, size=matrix.nbytes)
+    try:
+        np.ndarray(matrix.shape, dtype=np.float64, buffer=block.buf)[:] = matrix
+
+        plans = [start_plan] * islands
+        best, best_cost = start_plan, _cost(matrix, problem, start_plan)
+        started = time.perf_counter()
+        epochs = 0
+
+        with ProcessPoolExecutor(max_workers=islands, initializer=_attach,
+                                 initargs=(block.name, matrix.shape)) as pool:
+            while epochs < max_epochs and time.perf_counter() - started < budget:
+                # each island cools over its epoch, and every epoch starts a bit colder
+                progress = epochs / max_epochs
+                hot = START_TEMPERATURE * (END_TEMPERATURE / START_TEMPERATURE) ** progress
+                cold = START_TEMPERATURE * (END_TEMPERATURE / START_TEMPERATURE) ** ((epochs + 1) / max_epochs)
+                jobs = [(problem, plans[i], f"{seed}-{i}-{epochs}", moves_per_epoch, hot, cold)
+                        for i in range(islands)]
+                results = list(pool.map(_anneal_epoch, jobs))
+                epochs += 1
+
+                for _, _, island_best, island_cost in results:
+                    if island_cost < best_cost - 1e-9:
+                        best, best_cost = island_best, island_cost
+
+                # ring migration: take the neighbor's best if it beats where we are
+                plans = []
+                for i, (current, current_cost, _, _) in enumerate(results):
+                    _, _, neighbor_best, neighbor_cost = results[i - 1]
+                    plans.append(neighbor_best if neighbor_cost < current_cost else current)
+    finally:
+        block.close()
+        block.unlink()
+
+    return best, best_cost, epochs
+
+
+def apply_plan(trucks, hashtable, distance_table, plan):
+    """Reload the trucks per the annealed plan. Returns {truck_id: [Stop, ...]} in driving order."""
+    problem, _ = build_problem(trucks, hashtable, distance_table)
+    fallback = len(distance_table.addresses)
+
+    routes = {}
+    for truck, (unit_ids, order) in zip(trucks, plan):
+        truck.packages = [pid for u in unit_ids for pid in problem["units"][u]["ids"]]
+        for package_id in truck.packages:
+            hashtable.get(package_id).truck_id = truck.truck_id
+        stops = build_stops(truck, hashtable, distance_table)
+        by_location = {fallback if stop.location_index is None else stop.location_index: stop
+                       for stop in stops.values()}
+        routes[truck.truck_id] = [by_location[location] for location in order]
+    return routes
+
+
+if __name__ == "__main__":
+    import main
+
+    budget = float(sys.argv[1]) if len(sys.argv) > 1 else 2.0
+    islands = int(sys.argv[2]) if len(sys.argv) > 2 else None
+
+    for label, anneal in (("regret", False), ("annealed", True)):
+        with contextlib.redirect_stdout(io.StringIO()):
+            hashtable = main.load_packages("WGUPS_Package_File.csv")
+            distance_table = main.load_distance_table("WGUPS_Distance_Table.csv")
+            trucks = main.initialize_trucks()
+            started = time.perf_counter()
+            if anneal:
+                main.run_all_deliveries(trucks, hashtable, distance_table, anneal_budget=budget, anneal_islands=islands)
+            else:
+                main.run_all_deliveries(trucks, hashtable, distance_table, engine="regret")
+            elapsed = time.perf_counter() - started
+        late = main.late_packages(hashtable)
+        print(f"{label:<9} {sum(t.mileage for t in trucks):>7.2f} miles {len(late):>3} late {elapsed:>7.2f} s")
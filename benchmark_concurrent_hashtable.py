@@ -0,0 +1,88 @@
+# benchmark_concurrent_hashtable.py - read throughput while a writer thread keeps updating
+#
+# run with: python benchmark_concurrent_hashtable.py
+# compares the plain HashTable behind one global lock against ConcurrentHashTable
+# (lock-free reads, striped copy-on-write writes). readers also check they never
+# miss a key that's always in the table.
+
+import contextlib
+import io
+import random
+import threading
+import time
+
+import main
+from HashTable import HashTable
+from ConcurrentHashTable import ConcurrentHashTable
+
+
+class LockedHashTable(HashTable):
+    """The obvious way to make HashTable thread-safe: one lock around everything."""
+
+    def __init__(self, size=40):
+        super().__init__(size)
+        self._lock = threading.Lock()
+
+    def insert(self, key, value):
+        with self._lock:
+            super().insert(key, value)
+
+    def get(self, key):
+        with self._lock:
+            return super().get(key)
+
+
+def stress(table, package_ids, readers=4, writers=1, seconds=1.0):
+    """Hammer the table, return (reads per second, writes per second, missed reads)."""
+    stop = threading.Event()
+    reads = [0] * readers
+    writes = [0] * writers
+    misses = [0] * readers
+
+    def reader(slot):
+        rng = random.Random(slot)
+        count = missed = 0
+        while not stop.is_set():
+            for _ in range(1000):
+                if table.get(rng.choice(package_ids)) is None:
+                    missed += 1
+            count += 1000
+        reads[slot] = count
+        misses[slot] = missed
+
+    def writer(slot):
+        # stand-in for the simulation thread re-storing packages as they change state
+        rng = random.Random(100 + slot)
+        count = 0
+        while not stop.is_set():
+            package_id = rng.choice(package_ids)
+            table.insert(package_id, table.get(package_id))
+            count += 1
+        writes[slot] = count
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    threads += [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    return sum(reads) / seconds, sum(writes) / seconds, sum(misses)
+
+
+if __name__ == "__main__":
+    with contextlib.redirect_stdout(io.StringIO()):
+        packages = main.load_packages("WGUPS_Package_File.csv")
+    package_ids = packages.keys()
+
+    print(f"{'table':<22} {'writers':>7} {'reads/s':>12} {'writes/s':>10} {'missed':>7}")
+    for name, cls in (("HashTable + lock", LockedHashTable), ("ConcurrentHashTable", ConcurrentHashTable)):
+        table = cls()
+        for package_id in package_ids:
+            table.insert(package_id, packages.get(package_id))
+
+        for writers in (0, 1, 2):
+            reads, writes, missed = stress(table, package_ids, readers=4, writers=writers)
+            print(f"{name:<22} {writers:>7} {reads:>12,.0f} {writes:>10,.0f} {missed:>7}")
@@ -0,0 +1,62 @@
+# benchmark_coordinates.py - onboarding a service area from an address -> lat/lon file
+#
+# run with: python benchmark_coordinates.py
+# writes a synthetic coordinate file around Salt Lake City, times building the
+# distance table from it and resolving every address, and spot-checks a few
+# cells against a plain scalar haversine
+
+import csv
+import math
+import os
+import random
+import tempfile
+import time
+
+import main
+from DistanceTable import EARTH_RADIUS_MILES
+
+
+def write_area(path, count, seed=0):
+    rng = random.Random(seed)
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Address", "Latitude", "Longitude"])
+        for i in range(count):
+            writer.writerow([f"{i + 1} W {rng.randint(100, 9000)} S", round(rng.uniform(40.45, 40.85), 6),
+                             round(rng.uniform(-112.10, -111.70), 6)])
+
+
+def scalar_haversine(lat1, lon1, lat2, lon2, circuity):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * circuity * math.asin(math.sqrt(h))
+
+
+if __name__ == "__main__":
+    circuity = 1.3
+    print(f"{'addresses':>9} {'table s':>8} {'intern s':>9} {'MB':>7} {'max err mi':>11}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for count in (1000, 5000, 10000):
+            path = os.path.join(tmp, f"area_{count}.csv")
+            write_area(path, count)
+            with open(path, newline="") as f:
+                rows = list(csv.reader(f))[1:]
+
+            start = time.perf_counter()
+            table = main.load_coordinate_table(path, circuity)
+            built = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for address, _, _ in rows:
+                table.find_index(address)
+            interned = time.perf_counter() - start
+
+            rng = random.Random(1)
+            error = 0.0
+            for _ in range(200):
+                i, j = rng.randrange(count), rng.randrange(count)
+                expected = scalar_haversine(float(rows[i][1]), float(rows[i][2]), float(rows[j][1]),
+                                            float(rows[j][2]), circuity)
+                error = max(error, abs(table.miles(i, j) - expected))
+
+            print(f"{count:>9} {built:>8.2f} {interned:>9.2f} {table.distance_matrix.nbytes / 1e6:>7.0f} {error:>11.5f}")
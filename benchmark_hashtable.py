@@ -0,0 +1,92 @@
+# benchmark_hashtable.py - direct-address vs hashed HashTable lookups
+#
+# run with: python benchmark_hashtable.py
+# records every hashtable.get the greedy router makes over the WGUPS day, then
+# replays that exact lookup sequence against the table in both modes. also times
+# whole routing days, and a bigger manifest where the 40 buckets get long.
+
+import contextlib
+import io
+import random
+import time
+
+import main
+from HashTable import HashTable
+
+
+class RecordingHashTable(HashTable):
+    """Remembers the key of every get, so the router's lookups can be replayed."""
+
+    def __init__(self, size=40, direct=True):
+        super().__init__(size, direct)
+        self.lookups = []
+
+    def get(self, key):
+        self.lookups.append(key)
+        return super().get(key)
+
+
+def copy_table(source, table):
+    for package_id in source.keys():
+        table.insert(package_id, source.get(package_id))
+    return table
+
+
+def replay(table, lookups, repeats=200):
+    """Best seconds for one pass over the recorded lookups."""
+    get = table.get
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for key in lookups:
+            get(key)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def routing_day(direct, repeats=20):
+    """Best ms for a full fixed-plan greedy day with the package store in the given mode."""
+    best = None
+    for _ in range(repeats):
+        with contextlib.redirect_stdout(io.StringIO()):
+            hashtable = copy_table(main.load_packages("WGUPS_Package_File.csv"), HashTable(direct=direct))
+            distance_table = main.load_distance_table("WGUPS_Distance_Table.csv")
+            trucks = main.initialize_trucks()
+            start = time.perf_counter()
+            main.run_all_deliveries(trucks, hashtable, distance_table)
+            elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+if __name__ == "__main__":
+    with contextlib.redirect_stdout(io.StringIO()):
+        packages = main.load_packages("WGUPS_Package_File.csv")
+        distance_table = main.load_distance_table("WGUPS_Distance_Table.csv")
+        recorder = copy_table(packages, RecordingHashTable())
+        main.run_all_deliveries(main.initialize_trucks(), recorder, distance_table)
+    lookups = recorder.lookups
+
+    print(f"greedy day makes {len(lookups):,} lookups over {len(packages.keys())} packages\n")
+    print(f"{'workload':<28} {'hashed':>10} {'direct':>10} {'speedup':>8}")
+
+    hashed = replay(copy_table(packages, HashTable(direct=False)), lookups) * 1e9 / len(lookups)
+    direct = replay(copy_table(packages, HashTable()), lookups) * 1e9 / len(lookups)
+    print(f"{'router lookups (ns/get)':<28} {hashed:>10.1f} {direct:>10.1f} {hashed / direct:>7.2f}x")
+
+    hashed, direct = routing_day(False), routing_day(True)
+    print(f"{'greedy day (ms)':<28} {hashed:>10.2f} {direct:>10.2f} {hashed / direct:>7.2f}x")
+
+    # bigger manifest, same 40 buckets: hashed chains get ~250 long
+    rng = random.Random(0)
+    big_ids = list(range(1, 10001))
+    big_lookups = [rng.choice(big_ids) for _ in range(20000)]
+    tables = []
+    for direct_mode in (False, True):
+        table = HashTable(direct=direct_mode)
+        for package_id in big_ids:
+            table.insert(package_id, package_id)
+        tables.append(table)
+    hashed, direct = (replay(table, big_lookups, repeats=5) * 1e9 / len(big_lookups) for table in tables)
+    print(f"{'10k packages (ns/get)':<28} {hashed:>10.1f} {direct:>10.1f} {hashed / direct:>7.2f}x")
@@ -0,0 +1,51 @@
+# benchmark_loading.py - first-fit / best-fit decreasing loader on big synthetic manifests
+#
+# run with: python benchmark_loading.py
+# every run checks no truck ends up over its package, weight or volume limit
+
+import random
+import time
+from datetime import datetime
+
+import loading
+from Package import Package
+from PackageStore import PackageStore
+from Truck import Truck
+
+
+def synthetic_day(packages, trucks, seed=0):
+    """Random manifest: weights 1-80 kg, volumes 0.5-12 cu ft, a few deliver-together groups."""
+    rng = random.Random(seed)
+    hashtable = PackageStore()
+    for package_id in range(1, packages + 1):
+        package = Package(package_id, f"{package_id} Main St", rng.randint(1, 80), "Salt Lake City", "84101",
+                          datetime.max.time(), volume=round(rng.uniform(0.5, 12), 1))
+        hashtable.insert(package_id, package)
+    for first in range(1, packages - 2, 50):
+        group = {first, first + 1, first + 2}
+        for package_id in group:
+            hashtable.get(package_id).group_ids = set(group)
+
+    fleet = [Truck(truck_id, capacity=40, max_weight=1200, max_volume=260,
+                   start_time=datetime.strptime("08:00", "%H:%M")) for truck_id in range(1, trucks + 1)]
+    return hashtable, fleet
+
+
+def check_limits(trucks, hashtable):
+    for truck in trucks:
+        count, weight, volume = truck.load(hashtable)
+        assert count <= truck.capacity and weight <= truck.max_weight and volume <= truck.max_volume, truck.truck_id
+
+
+if __name__ == "__main__":
+    print(f"{'packages':>8} {'trucks':>6} {'loader':<10} {'ms':>8} {'placed':>7} {'fill kg':>8}")
+    for packages, trucks in ((1000, 40), (5000, 200), (20000, 800)):
+        for name, best_fit in (("first fit", False), ("best fit", True)):
+            hashtable, fleet = synthetic_day(packages, trucks)
+            start = time.perf_counter()
+            unplaced = loading.load_trucks(fleet, hashtable, best_fit=best_fit)
+            elapsed = (time.perf_counter() - start) * 1000
+            check_limits(fleet, hashtable)
+            used = [truck.load(hashtable)[1] / truck.max_weight for truck in fleet if truck.packages]
+            print(f"{packages:>8} {trucks:>6} {name:<10} {elapsed:>8.2f} {packages - len(unplaced):>7} "
+                  f"{100 * sum(used) / len(used):>7.1f}%")
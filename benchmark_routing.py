@@ -0,0 +1,40 @@
+# benchmark_routing.py - compare the routing engines on the WGUPS day
+#
+# run with: python benchmark_routing.py
+# each engine gets a fresh hashtable + trucks, all the per-delivery printing is muted
+
+import contextlib
+import io
+import time
+
+import main
+
+
+def run_engine(engine, multi_trip=False, drivers=2):
+    """Run one full day with the given engine, return (mileage, late count, minutes late, seconds)."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        hashtable = main.load_packages("WGUPS_Package_File.csv")
+        distance_table = main.load_distance_table("WGUPS_Distance_Table.csv")
+        trucks = main.initialize_trucks()
+
+        started = time.perf_counter()
+        main.run_all_deliveries(trucks, hashtable, distance_table, multi_trip=multi_trip,
+                                drivers=drivers, engine=engine)
+        elapsed = time.perf_counter() - started
+
+    late = main.late_packages(hashtable)
+    minutes_late = sum(m for _, m in late if m is not None)
+    return sum(truck.mileage for truck in trucks), len(late), minutes_late, elapsed
+
+
+if __name__ == "__main__":
+    repeats = 5
+
+    print(f"{'engine':<10} {'mode':<12} {'miles':>8} {'late':>5} {'min late':>9} {'ms/run':>8}")
+    for multi_trip in (False, True):
+        for engine in main.ROUTING_ENGINES:
+            runs = [run_engine(engine, multi_trip=multi_trip) for _ in range(repeats)]
+            miles, late, minutes_late, _ = runs[0]
+            best = min(r[3] for r in runs) * 1000
+            mode = "multi-trip" if multi_trip else "fixed plan"
+            print(f"{engine:<10} {mode:<12} {miles:>8.2f} {late:>5} {minutes_late:>9.1f} {best:>8.2f}")
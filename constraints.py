@@ -0,0 +1,237 @@
+# constraints.py - special-handling rules parsed from the package file's "Special Notes"
+
+import re
+from datetime import datetime
+from Package import PackageStatus
+
+# ---------------------------------------------------
+#  Rules
+# ---------------------------------------------------
+#
+# Every special note turns into one or more typed rules. The rules get compiled
+# once into dict/set indexes (Constraints) and copied onto the Package objects,
+# so the loader, assigner and routers look things up in O(1) instead of
+# checking hard-coded package ID lists.
+
+
+class DelayedUntil:
+    def __init__(self, package_id, time, reason=None):
+        self.package_id = package_id
+        self.time = time
+        self.reason = reason
+
+    def __str__(self):
+        return f"package {self.package_id} delayed until {self.time.strftime('%I:%M %p')}"
+
+
+class TruckOnly:
+    def __init__(self, package_id, truck_id):
+        self.package_id = package_id
+        self.truck_id = truck_id
+
+    def __str__(self):
+        return f"package {self.package_id} can only be on truck {self.truck_id}"
+
+
+class DeliverWith:
+    def __init__(self, package_id, other_ids):
+        self.package_id = package_id
+        self.other_ids = other_ids
+
+    def __str__(self):
+        return f"package {self.package_id} must be delivered with {self.other_ids}"
+
+
+class AddressChangeAt:
+    def __init__(self, package_id, time=None, address=None, city=None, zip_code=None):
+        """
+        The listed address is wrong. time/address are the correction, and stay
+        None until somebody supplies it (the package can't go out before then).
+        """
+        self.package_id = package_id
+        self.time = time
+        self.address = address
+        self.city = city
+        self.zip_code = zip_code
+
+    def __str__(self):
+        if self.time is None:
+            return f"package {self.package_id} has a wrong address (no correction yet)"
+        return f"package {self.package_id} address changes to {self.address} at {self.time.strftime('%I:%M %p')}"
+
+
+# ---------------------------------------------------
+#  Parsing
+# ---------------------------------------------------
+
+_TIME = r"(\d{1,2}:\d{2}\s*[ap]\.?m\.?)"
+_DELAYED = re.compile(r"delayed.*?until\s+" + _TIME, re.IGNORECASE)
+_TRUCK_ONLY = re.compile(r"can only be on truck\s+(\d+)", re.IGNORECASE)
+_DELIVER_WITH = re.compile(r"must be delivered with\s+([\d,\s]+(?:and\s+\d+)?)", re.IGNORECASE)
+_WRONG_ADDRESS = re.compile(r"wrong address", re.IGNORECASE)
+
+# optional details after "Wrong address listed", e.g.
+# "Wrong address listed - corrected to 410 S State St, Salt Lake City, UT 84111 at 10:20 AM"
+_CORRECTION = re.compile(r"corrected to\s+(.+?)\s+at\s+" + _TIME, re.IGNORECASE)
+
+
+def parse_time(text):
+    """ "9:05 am" / "10:20 AM" / "9:05 a.m." -> datetime on the simulation's 1900-01-01 day."""
+    text = text.replace(".", "").upper()
+    text = re.sub(r"\s*(AM|PM)$", r" \1", text.strip())
+    return datetime.strptime(text, "%I:%M %p")
+
+
+def _split_address(text):
+    """ "410 S State St, Salt Lake City, UT 84111" -> (street, city, zip)."""
+    parts = [part.strip() for part in text.split(",")]
+    street = parts[0]
+    city = parts[1] if len(parts) > 1 else None
+    zip_match = re.search(r"\b(\d{5})\b", parts[-1]) if len(parts) > 1 else None
+    return street, city, zip_match.group(1) if zip_match else None
+
+
+def parse_notes(package_id, notes):
+    """Typed rules for one package's special notes (empty list for plain packages)."""
+    rules = []
+    if not notes:
+        return rules
+
+    match = _DELAYED.search(notes)
+    if match:
+        reason = "En Route to Hub" if "flight" in notes.lower() else None
+        rules.append(DelayedUntil(package_id, parse_time(match.group(1)), reason))
+
+    match = _TRUCK_ONLY.search(notes)
+    if match:
+        rules.append(TruckOnly(package_id, int(match.group(1))))
+
+    match = _DELIVER_WITH.search(notes)
+    if match:
+        rules.append(DeliverWith(package_id, [int(n) for n in re.findall(r"\d+", match.group(1))]))
+
+    if _WRONG_ADDRESS.search(notes):
+        rule = AddressChangeAt(package_id)
+        match = _CORRECTION.search(notes)
+        if match:
+            rule.address, rule.city, rule.zip_code = _split_address(match.group(1))
+            rule.time = parse_time(match.group(2))
+        rules.append(rule)
+
+    return rules
+
+
+# ---------------------------------------------------
+#  Compiled Indexes
+# ---------------------------------------------------
+
+class Constraints:
+    def __init__(self, rules):
+        """
+        Compile rules into lookup tables:
+        - delayed_until: package_id -> DelayedUntil
+        - truck_only: package_id -> truck_id, and by_truck: truck_id -> restricted package IDs
+        - group_of: package_id -> frozenset of every package it has to ride with (itself included)
+        - address_changes: package_id -> AddressChangeAt
+        """
+        self.rules = list(rules)
+        self.delayed_until = {}
+        self.truck_only = {}
+        self.by_truck = {}
+        self.address_changes = {}
+
+        # union-find over "must be delivered with", so 13-with-15 and 16-with-13
+        # end up in the same group without caring which note names which
+        parent = {}
+
+        def find(pid):
+            root = parent.setdefault(pid, pid)
+            while root != parent[root]:
+                root = parent[root]
+            while parent[pid] != root:
+                parent[pid], pid = root, parent[pid]
+            return root
+
+        for rule in self.rules:
+            if isinstance(rule, DelayedUntil):
+                self.delayed_until[rule.package_id] = rule
+            elif isinstance(rule, TruckOnly):
+                self.truck_only[rule.package_id] = rule.truck_id
+                self.by_truck.setdefault(rule.truck_id, set()).add(rule.package_id)
+            elif isinstance(rule, DeliverWith):
+                for other in rule.other_ids:
+                    parent[find(other)] = find(rule.package_id)
+            elif isinstance(rule, AddressChangeAt):
+                self.address_changes[rule.package_id] = rule
+
+        members = {}
+        for pid in parent:
+            members.setdefault(find(pid), set()).add(pid)
+        self.group_of = {}
+        for group in members.values():
+            group = frozenset(group)
+            for pid in group:
+                self.group_of[pid] = group
+
+    def groups(self):
+        """Each deliver-together group once, as sorted ID lists."""
+        return sorted({tuple(sorted(group)) for group in self.group_of.values()})
+
+    def correct(self, package_id, time, address, city=None, zip_code=None):
+        """Fill in (or add) the correction for a wrong-address package."""
+        rule = self.address_changes.get(package_id)
+        if rule is None:
+            rule = AddressChangeAt(package_id)
+            self.rules.append(rule)
+            self.address_changes[package_id] = rule
+        rule.time, rule.address, rule.city, rule.zip_code = time, address, city, zip_code
+
+    def apply(self, package):
+        """Copy this package's rules onto it as the attributes the routers read."""
+        pid = package.id
+
+        delay = self.delayed_until.get(pid)
+        if delay is not None:
+            package.delayed_until = delay.time
+            package.delay_reason = delay.reason
+            package.status = PackageStatus.DELAYED
+
+        if pid in self.truck_only:
+            package.truck_restriction = self.truck_only[pid]
+
+        group = self.group_of.get(pid)
+        if group is not None:
+            package.group_ids = set(group)
+            package.group_constrained = True
+
+        change = self.address_changes.get(pid)
+        if change is not None:
+            package.wrong_address = True
+        if change is not None and change.time is not None:
+            package.correct_address = change.address
+            package.correct_city = change.city
+            package.correct_zip = change.zip_code
+            package.address_correction_time = change.time
+
+
+def available_time(package):
+    """Earliest time a package can leave the hub (delays and address corrections), or None."""
+    times = [t for t in (getattr(package, 'delayed_until', None),
+                         getattr(package, 'address_correction_time', None)) if t]
+    return max(times) if times else None
+
+
+def delivery_address(package):
+    """
+    Where a package actually gets dropped off: the corrected address once its fix
+    is known (available_time holds the package until then), the listed one otherwise.
+    """
+    corrected = getattr(package, 'correct_address', None)
+    if corrected and getattr(package, 'address_correction_time', None):
+        return corrected
+    return package.address
+
+
+def group_for(package):
+    """Sorted IDs of everything that must go out with this package (just itself if nothing)."""
+    return sorted(package.group_ids) if package.group_ids else [package.id]
@@ -0,0 +1,516 @@
+# dispatch.py - live re-routing when things change mid-day
+
+import time
+from datetime import datetime
+from Package import PackageStatus
+from Stop import Stop
+from constraints import group_for, delivery_address
+from routing import build_stops, deliver_stop
+from insertion import plan_route, stop_window
+from Route import Route
+from DistanceTable import package_location, truck_location
+
+# ---------------------------------------------------
+#  Live Events
+# ---------------------------------------------------
+#
+# The day used to be simulated truck by truck from start to finish, so anything
+# that changes mid-route (package 9's address fix, the 9:05 flight) had to be
+# worked around by holding trucks at the hub. The Dispatcher instead keeps a
+# planned route per truck, moves the clock forward, and when an event comes in
+# only the stops that haven't been driven yet get repaired.
+
+
+class AddressChange:
+    """A package's delivery address is corrected at `time`."""
+
+    def __init__(self, time, package_id, address, city=None, zip_code=None):
+        self.time = time
+        self.package_id = package_id
+        self.address = address
+        self.city = city
+        self.zip_code = zip_code
+
+    def __str__(self):
+        return f"{self.time.strftime('%I:%M %p')} address change: package {self.package_id} -> {self.address}"
+
+
+class PackageAvailable:
+    """A delayed package shows up at `time` (e.g. the late flight lands)."""
+
+    def __init__(self, time, package_id):
+        self.time = time
+        self.package_id = package_id
+
+    def __str__(self):
+        return f"{self.time.strftime('%I:%M %p')} package {self.package_id} available"
+
+
+class TruckBreakdown:
+    """A truck stops where it is at `time`; working trucks come and collect what's still on it."""
+
+    def __init__(self, time, truck_id):
+        self.time = time
+        self.truck_id = truck_id
+
+    def __str__(self):
+        return f"{self.time.strftime('%I:%M %p')} truck {self.truck_id} broke down"
+
+
+# a stop where a truck collects packages from a broken-down truck instead of dropping
+# any off. its package_ids are what gets handed over, so their deadlines bound
+# when the pickup has to happen (stop_window) like any other stop
+class Pickup(Stop):
+    def __init__(self, location_index, address, package_ids, from_truck):
+        super().__init__(location_index, address)
+        self.package_ids = list(package_ids)
+        self.from_truck = from_truck
+        self.picked_up = False
+
+    def pending_ids(self, hashtable):
+        return [] if self.picked_up else list(self.package_ids)
+
+    def ready_ids(self, hashtable, current_time):
+        return self.pending_ids(hashtable)
+
+    def is_done(self, hashtable):
+        return self.picked_up
+
+    def __str__(self):
+        return f"Pickup at {self.address} from truck {self.from_truck} ({self.package_ids})"
+
+
+class Dispatcher:
+    def __init__(self, trucks, hashtable, distance_table, regret=True, budget_ms=50):
+        """
+        Initialize a Dispatcher with:
+        - trucks: already-loaded trucks
+        - regret: insertion mode used for the initial plan
+        - budget_ms: latency budget per event, slow repairs get reported
+        """
+        self.trucks = {truck.truck_id: truck for truck in trucks}
+        self.hashtable = hashtable
+        self.distance_table = distance_table
+        self.regret = regret
+        self.budget_ms = budget_ms
+
+        # truck_id -> stops keyed like routing.build_stops, and the stops still to drive in order
+        self.stops = {}
+        self.plans = {}
+
+        # broken trucks don't move again
+        self.broken = set()
+
+        # packages nobody could take after an event (back in the pool)
+        self.unassigned = []
+
+        # (event, milliseconds) for every event handled
+        self.latencies = []
+        self.latest_event_time = None
+
+    def plan(self):
+        """Build the initial route for every truck."""
+        for truck_id, truck in self.trucks.items():
+            self.stops[truck_id] = build_stops(truck, self.hashtable, self.distance_table)
+            pending = [stop for stop in self.stops[truck_id].values() if not stop.is_done(self.hashtable)]
+            self.plans[truck_id], _ = plan_route(truck, pending, self.hashtable, self.distance_table, self.regret)
+        return self.plans
+
+    def advance_to(self, when):
+        """Drive every truck through the stops it reaches by `when`."""
+        for truck_id, truck in self.trucks.items():
+            if truck_id in self.broken:
+                continue
+            plan = self.plans.get(truck_id, [])
+
+            while plan:
+                stop = plan[0]
+                if stop.is_done(self.hashtable):
+                    plan.pop(0)
+                    continue
+
+                depart, arrive = self._next_leg(truck, stop)
+                if arrive > when:
+                    break
+                self._drive(truck, stop, depart)
+                plan.pop(0)
+
+    def _next_leg(self, truck, stop):
+        """(depart, arrive) for driving to stop next, same wait-then-drive rule the insertion router schedules with."""
+        earliest, _ = stop_window(stop, self.hashtable, truck.current_time.date())
+        depart = truck.current_time
+        if earliest and depart < earliest:
+            depart = earliest
+        here = truck_location(truck, self.distance_table)
+        miles = self.distance_table.miles(here, stop.location_index)
+        return depart, depart + truck.travel_time(miles, here, stop.location_index, depart)
+
+    def _drive(self, truck, stop, depart):
+        """Leave at depart and handle the stop: a pickup, a drop-off, or just getting there."""
+        truck.current_time = depart
+        if isinstance(stop, Pickup):
+            self._collect(truck, stop)
+        elif stop.ready_ids(self.hashtable, depart):
+            deliver_stop(truck, stop, self.hashtable, self.distance_table)
+        else:
+            # everything for this stop got re-routed while the truck was on its way, it still gets there
+            here = truck_location(truck, self.distance_table)
+            miles = self.distance_table.miles(here, stop.location_index)
+            truck.update_location(stop.address, miles, truck.travel_time(miles, here, stop.location_index),
+                                  stop.location_index)
+
+    def _finish_leg(self, truck_id, when):
+        """
+        If the truck is already driving to its next stop at `when`, finish that leg
+        so repairs plan from where it really ends up (the table only has miles
+        between stops, a truck can't turn around halfway). A truck still parked
+        just starts from `when`.
+        """
+        truck = self.trucks[truck_id]
+        plan = self.plans.get(truck_id, [])
+        if plan:
+            depart, _ = self._next_leg(truck, plan[0])
+            if depart < when:
+                self._drive(truck, plan.pop(0), depart)
+        if truck.current_time < when:
+            truck.current_time = when
+
+    def _collect(self, truck, pickup):
+        """Drive to a broken-down truck (or the hub) and take its packages over."""
+        here = truck_location(truck, self.distance_table)
+        miles = self.distance_table.miles(here, pickup.location_index)
+        truck.update_location(pickup.address, miles, truck.travel_time(miles, here, pickup.location_index),
+                              pickup.location_index)
+        truck.current_time += truck.service_time()
+        pickup.picked_up = True
+        source = f"truck {pickup.from_truck}" if pickup.from_truck is not None else "the hub"
+        print(f"Truck {truck.truck_id} picked up packages {pickup.package_ids} from {source} "
+              f"at {truck.current_time.strftime('%I:%M %p')}")
+
+    def projection(self, truck_id):
+        """
+        Route over what a truck still has to drive, from where it is now. Its
+        total_miles()/eta() are the projected extra mileage and arrival times.
+        """
+        truck = self.trucks[truck_id]
+        pending = [stop for stop in self.plans.get(truck_id, []) if not stop.is_done(self.hashtable)]
+        return Route.for_truck(truck, pending, self.hashtable, self.distance_table)
+
+    def finish(self):
+        """
+        Run every remaining plan to the end of the day. Trucks that are done go
+        back for whatever nobody had room for earlier (a second trip), and anything
+        that still can't go anywhere is reported.
+        """
+        self.advance_to(datetime.max)
+        while self.unassigned and self._retry(self.latest_event_time or datetime.min):
+            self.advance_to(datetime.max)
+        for pid in sorted(self.unassigned):
+            print(f"WARNING: package {pid} stranded, {self._stranded_reason(pid)}")
+
+    def apply(self, event):
+        """
+        Move the clock to the event, then repair only the routes it touches.
+        Returns the time the repair took in milliseconds.
+        """
+        self.advance_to(event.time)
+        self.latest_event_time = event.time
+        started = time.perf_counter()
+
+        if isinstance(event, AddressChange):
+            self._address_change(event)
+        elif isinstance(event, PackageAvailable):
+            self._package_available(event)
+        elif isinstance(event, TruckBreakdown):
+            self._breakdown(event)
+        else:
+            raise ValueError(f"Unknown event type: {event}")
+
+        # trucks may have room (or the package a new address) now
+        if self.unassigned:
+            self._retry(event.time)
+
+        elapsed = (time.perf_counter() - started) * 1000
+        self.latencies.append((event, elapsed))
+        if elapsed > self.budget_ms:
+            print(f"WARNING: repair for '{event}' took {elapsed:.1f} ms (budget {self.budget_ms} ms)")
+        return elapsed
+
+    # ---- event handlers ----
+
+    def _truck_for_package(self, package_id):
+        """Working truck carrying the package (None if it's on a broken truck or on none)."""
+        for truck_id, truck in self.trucks.items():
+            if truck_id not in self.broken and package_id in truck.packages:
+                return truck_id
+        return None
+
+    def _stop_of(self, truck_id, package_id):
+        for stop in self.plans.get(truck_id, []):
+            if package_id in stop.package_ids and not isinstance(stop, Pickup):
+                return stop
+        return None
+
+    def _insert(self, truck_id, stops):
+        """Repair one truck's remaining route by inserting stops into it."""
+        truck = self.trucks[truck_id]
+
+        # re-planning starts from now (or the end of the leg it's on), the truck can't divert in the past
+        if self.latest_event_time:
+            self._finish_leg(truck_id, self.latest_event_time)
+        self.plans[truck_id], _ = plan_route(truck, stops, self.hashtable, self.distance_table,
+                                             self.regret, route=self.plans.get(truck_id, []))
+
+    def _address_change(self, event):
+        package = self.hashtable.get(event.package_id)
+
+        # keep the old address around so status lookups before the change still show it
+        package.previous_address = package.address
+        package.address_changed_at = event.time
+        package.address = event.address
+        package.location_id = self.distance_table.find_index(event.address)
+        if event.city:
+            package.city = event.city
+        if event.zip_code:
+            package.zip_code = event.zip_code
+
+        # the correction was the only thing holding this package back
+        package.address_correction_time = None
+
+        if package.status == PackageStatus.DELIVERED:
+            return
+        truck_id = self._truck_for_package(event.package_id)
+        if truck_id is None:
+            # stuck on a broken truck (or never loaded), apply()'s retry finds it a truck
+            if event.package_id not in self.unassigned:
+                self.unassigned.append(event.package_id)
+            return
+
+        # pull the package off its old stop. if the truck is already on its way there it
+        # still arrives, an emptied stop only gets dropped if it hasn't left for it yet
+        old_stop = self._stop_of(truck_id, event.package_id)
+        if old_stop is not None:
+            old_stop.package_ids.remove(event.package_id)
+        self._finish_leg(truck_id, event.time)
+        if old_stop is not None and old_stop in self.plans[truck_id] and old_stop.is_done(self.hashtable):
+            self.plans[truck_id].remove(old_stop)
+
+        # join a drop-off already planned at the new address, or insert a new one
+        index = package.location_id
+        for stop in self.plans[truck_id]:
+            if not isinstance(stop, Pickup) and stop.location_index is not None and stop.location_index == index:
+                stop.add_package(event.package_id)
+                return
+
+        new_stop = Stop(index, event.address)
+        new_stop.add_package(event.package_id)
+        self.stops[truck_id][index if index is not None else event.address] = new_stop
+        self._insert(truck_id, [new_stop])
+
+    def _package_available(self, event):
+        package = self.hashtable.get(event.package_id)
+        package.delayed_until = event.time
+        if package.status == PackageStatus.DELAYED:
+            package.status = PackageStatus.AT_HUB
+
+        truck_id = self._truck_for_package(event.package_id)
+        if truck_id is None:
+            if event.package_id not in self.unassigned:
+                self.unassigned.append(event.package_id)
+            return
+
+        # its window moved, so re-place just that stop in the remaining route
+        self._finish_leg(truck_id, event.time)
+        stop = self._stop_of(truck_id, event.package_id)
+        if stop is not None and not stop.is_done(self.hashtable):
+            self.plans[truck_id].remove(stop)
+            self._insert(truck_id, [stop])
+
+    def _breakdown(self, event):
+        """
+        Hand what's left on a broken truck to working trucks. It's collected at the
+        last stop it reached, and packages it was still on its way to pick up stay on
+        the truck they're sitting in. Everything goes into unassigned, and apply()'s
+        retry (see _rescue) hands it to whichever trucks can take it.
+        """
+        self.broken.add(event.truck_id)
+        broken_truck = self.trucks[event.truck_id]
+        leftover = self.plans.pop(event.truck_id, [])
+
+        stranded = []
+        for stop in leftover:
+            if isinstance(stop, Pickup) and not stop.picked_up:
+                self._move(stop.package_ids, self.trucks[stop.from_truck])
+                stranded.extend(stop.package_ids)
+        stranded.extend(broken_truck.packages)
+
+        for pid in stranded:
+            if self.hashtable.get(pid).status != PackageStatus.DELIVERED and pid not in self.unassigned:
+                self.unassigned.append(pid)
+
+    def _retry(self, when):
+        """
+        Try every unassigned package again from wherever it's sitting (a broken
+        truck, or the hub if it was never loaded). True if any got a truck.
+        """
+        for truck_id in self.trucks:
+            if truck_id not in self.broken:
+                self._finish_leg(truck_id, when)
+
+        spots = {}
+        for pid in self.unassigned:
+            spots.setdefault(self._where(pid), []).append(pid)
+        before = len(self.unassigned)
+        self.unassigned = []
+        for (site, address, from_truck), stranded in spots.items():
+            self._rescue(when, site, address, from_truck, stranded)
+        return len(self.unassigned) < before
+
+    def _where(self, package_id):
+        """(location ID, address, truck ID) a package can be collected from."""
+        for truck_id, truck in self.trucks.items():
+            if package_id in truck.packages:
+                return truck_location(truck, self.distance_table), truck.current_location, truck_id
+        hub = next(iter(self.trucks.values())).hub_location
+        return self.distance_table.find_index(hub), hub, None
+
+    def _stranded_reason(self, package_id):
+        """Why no truck could take a package, for the end-of-day report."""
+        restriction = getattr(self.hashtable.get(package_id), 'truck_restriction', None)
+        if restriction in self.broken:
+            return f"it can only go on truck {restriction}, which broke down"
+        if restriction is not None and restriction not in self.trucks:
+            return f"it can only go on truck {restriction}, which isn't running"
+        return "no working truck has room for it (or for its deliver-together group)"
+
+    def _rescue(self, when, site, address, from_truck, stranded):
+        """
+        Get the stranded packages at one spot onto working trucks. Each receiving
+        truck drives there first (a Pickup stop), then delivers the packages along
+        with its own. Packages only go to a truck they're allowed on and that has
+        room for them (deliver-together groups move as one), and the truck whose
+        route comes out with the fewest late stops, then the most packages taken,
+        then the fewest extra miles, goes first. Whatever no truck can take goes
+        back into unassigned.
+        """
+        # deliver-together groups stay together, tightest deadline first gets the room
+        units = []
+        seen = set()
+        for pid in stranded:
+            if pid in seen:
+                continue
+            unit = [member for member in group_for(self.hashtable.get(pid)) if member in stranded]
+            seen.update(unit)
+            units.append(unit)
+        units.sort(key=lambda unit: (min(self.hashtable.get(pid).deadline for pid in unit), unit[0]))
+
+        candidates = [tid for tid in self.trucks if tid not in self.broken]
+        while units and candidates:
+            best = None
+            for tid in candidates:
+                option = self._pickup_option(tid, units, site, address, from_truck, when)
+                if option is None:
+                    continue
+                late, taken, added, _ = option
+                key = (late, -len(taken), added)
+                if best is None or key < best[0]:
+                    best = (key, tid, option)
+            if best is None:
+                break
+
+            _, tid, (_, taken, _, plan) = best
+            self._hand_over(tid, taken, plan)
+            units = [unit for unit in units if unit[0] not in taken]
+            candidates.remove(tid)
+
+        for unit in units:
+            self.unassigned.extend(pid for pid in unit if pid not in self.unassigned)
+
+    def _on_board(self, truck):
+        """(packages, kilos, cubic feet) a truck still carries, what it already dropped off frees up room."""
+        count, weight, volume = 0, 0.0, 0.0
+        for pid in truck.packages:
+            package = self.hashtable.get(pid)
+            if package.status != PackageStatus.DELIVERED:
+                count, weight, volume = count + 1, weight + package.weight, volume + package.volume
+        return count, weight, volume
+
+    def _pickup_option(self, truck_id, units, site, address, from_truck, when):
+        """
+        (late stops, package IDs taken, extra miles, new plan) if truck_id came for
+        every unit it can carry, or None if it can't take any of them.
+        """
+        truck = self.trucks[truck_id]
+        count, weight, volume = self._on_board(truck)
+        taken = []
+        for unit in units:
+            packages = [self.hashtable.get(pid) for pid in unit]
+            if any(getattr(p, 'truck_restriction', None) not in (None, truck_id) for p in packages):
+                continue
+            load = (count, weight, volume)
+            fits = True
+            for package in packages:
+                if not truck.can_fit(package, self.hashtable, load):
+                    fits = False
+                    break
+                load = (load[0] + 1, load[1] + package.weight, load[2] + package.volume)
+            if fits:
+                count, weight, volume = load
+                taken.extend(unit)
+        if not taken:
+            return None
+
+        # drive to the pickup spot from wherever this one is (no earlier than `when`)
+        here = truck_location(truck, self.distance_table)
+        depart = max(truck.current_time, when)
+        to_site = self.distance_table.miles(here, site)
+        picked_up = depart + truck.travel_time(to_site, here, site, depart) + truck.service_time()
+        pickup = Pickup(site, address, taken, from_truck)
+
+        # then plan its own remaining stops plus the handed-over ones from the pickup spot
+        stops = self._stops_with(truck_id, taken)
+        saved = (truck.current_location, truck.current_location_id, truck.current_time)
+        truck.current_location, truck.current_location_id, truck.current_time = pickup.address, site, picked_up
+        try:
+            route, infeasible = plan_route(truck, stops, self.hashtable, self.distance_table, self.regret)
+            after = Route.for_truck(truck, route, self.hashtable, self.distance_table).total_miles()
+        finally:
+            truck.current_location, truck.current_location_id, truck.current_time = saved
+
+        added = to_site + after - self.projection(truck_id).total_miles()
+        return len(infeasible), taken, added, [pickup] + route
+
+    def _stops_with(self, truck_id, package_ids):
+        """Fresh stops for the truck's pending packages plus package_ids (its current stops aren't touched)."""
+        stops = {}
+        pending = [pid for stop in self.plans.get(truck_id, []) if not isinstance(stop, Pickup)
+                   for pid in stop.pending_ids(self.hashtable)]
+        for pid in pending + list(package_ids):
+            package = self.hashtable.get(pid)
+            index = package_location(package, self.distance_table)
+            address = delivery_address(package)
+            key = index if index is not None else address
+            if key not in stops:
+                stops[key] = Stop(index, address)
+            stops[key].add_package(pid)
+        return list(stops.values())
+
+    def _move(self, package_ids, truck):
+        """Put packages on a truck, taking them off whichever truck had them."""
+        for pid in package_ids:
+            for other in self.trucks.values():
+                if pid in other.packages:
+                    other.packages.remove(pid)
+            truck.packages.append(pid)
+            self.hashtable.get(pid).truck_id = truck.truck_id
+
+    def _hand_over(self, truck_id, package_ids, plan):
+        """Move packages onto a working truck and give it the plan with the pickup in front."""
+        truck = self.trucks[truck_id]
+        self._move(package_ids, truck)
+
+        # earlier pickups it hasn't made yet stay ahead of everything else
+        pickups = [stop for stop in self.plans.get(truck_id, []) if isinstance(stop, Pickup) and not stop.picked_up]
+        self.plans[truck_id] = pickups + plan
+        self.stops[truck_id] = {stop.location_index if stop.location_index is not None else stop.address: stop
+                                for stop in plan[1:]}
@@ -0,0 +1,267 @@
+# exact.py - provably shortest routes for small trucks (Held-Karp bitmask DP)
+
+from bisect import bisect_right
+from datetime import datetime
+
+import numpy as np
+import routing
+from routing import build_stops
+from insertion import leg_miles, stop_window, drive_route
+from DistanceTable import truck_location, shortest_path_closure
+
+# ---------------------------------------------------
+#  Exact Solver (Held-Karp with deadlines)
+# ---------------------------------------------------
+#
+# With a dozen or so unique stops every visiting order can be covered by a DP over
+# (set of stops visited, last stop). When no stop has to wait, miles and clock time
+# go together and the memo table is one numpy array filled a layer at a time.
+# Otherwise it keeps, per state, the partial routes that aren't beaten on both
+# miles and clock time (waiting for a late package means fewest miles isn't
+# always earliest, and neither is it once the speed changes partway through,
+# e.g. a rush-hour bucket in the cost model, so legs there are timed from the
+# clock they leave at). Anything that already can't make some deadline gets pruned.
+# The pruning bound is the shortest path between two stops through the other
+# stops, not the direct cell: the WGUPS table isn't a metric, so the direct
+# leg can be miles longer than a detour and would prune routes that work.
+# Bigger routes fall back to the greedy router.
+
+# routes with more unique stops than this go to the heuristic
+DEFAULT_MAX_STOPS = 16
+
+# the label version (someone has to wait on a late package) is pure python, so it gets a lower cap
+DEFAULT_MAX_WAIT_STOPS = 12
+
+# the real drive keeps time in datetimes (microseconds), so float seconds within
+# a microsecond of a deadline count as on time instead of losing to rounding
+_ROUNDING = 1e-6
+
+
+def _add_label(labels, miles, clock, parent, bucket=0):
+    """
+    Keep (miles, clock, parent, bucket) unless an existing label in the same speed
+    bucket is at least as good on both.
+    """
+    for other_miles, other_clock, _, other_bucket in labels:
+        if other_bucket == bucket and other_miles <= miles and other_clock <= clock:
+            return
+    labels[:] = [label for label in labels
+                 if not (label[3] == bucket and miles <= label[0] and clock <= label[1])]
+    labels.append((miles, clock, parent, bucket))
+
+
+def solve_route(truck, stops, hashtable, distance_table, max_wait_stops=DEFAULT_MAX_WAIT_STOPS):
+    """
+    Shortest on-time order for the stops starting from the truck's current
+    location and time, or None if no order makes every deadline (or the route
+    needs the label version and has more than max_wait_stops stops).
+    """
+    n = len(stops)
+    if n == 0:
+        return []
+
+    start_index = truck_location(truck, distance_table)
+    start_time = truck.current_time
+    day = start_time.date()
+
+    # everything in seconds after the truck's current time so the inner loop is plain floats
+    earliest = []
+    latest = []
+    last_deadline = start_time
+    for stop in stops:
+        opens, closes = stop_window(stop, hashtable, day)
+        earliest.append(max(0.0, (opens - start_time).total_seconds()) if opens else 0.0)
+        latest.append((closes - start_time).total_seconds() + _ROUNDING)
+        if closes.time() != datetime.max.time():
+            last_deadline = max(last_deadline, closes)
+
+    service = truck.service_time().total_seconds()
+    miles = [[leg_miles(distance_table, a.location_index, b.location_index) for b in stops] for a in stops]
+    from_start = [leg_miles(distance_table, start_index, stop.location_index) for stop in stops]
+
+    # fewest miles from stop to stop going through any of the others (lower bound for pruning)
+    bound = shortest_path_closure(miles)
+
+    # every speed the truck can drive at before the last deadline passes (time-of-day
+    # buckets in the cost model), as (seconds after start, seconds per mile)
+    speeds = truck.speed_changes(start_time, last_deadline)
+    slowest = max(per_mile for _, per_mile in speeds)
+    fastest = min(per_mile for _, per_mile in speeds)
+
+    # nothing to wait for and one speed means the clock is just miles / speed, so
+    # fewest miles is also earliest and one number per state is enough
+    if not any(earliest) and slowest == fastest:
+        return _solve_no_wait(stops, miles, from_start, [l / slowest for l in latest], service / slowest)
+
+    if n > max_wait_stops:
+        # too big for labels: a route that's on time at the slowest speed is on time at any
+        if not any(earliest):
+            return _solve_no_wait(stops, miles, from_start, [l / slowest for l in latest], service / slowest)
+        return None
+
+    # legs are timed from the clock they actually leave at, at the speed of the bucket
+    # that starts in (like CostModel.travel_time)
+    offsets = [offset for offset, _ in speeds]
+    per_mile = [rate for _, rate in speeds]
+
+    def arrive_at(leave, leg):
+        return leave + leg * per_mile[bisect_right(offsets, leave) - 1]
+
+    # leaving later can mean driving in a faster bucket, so an earlier clock only
+    # beats a later one when both leave in the same bucket
+    def bucket_of(clock):
+        return bisect_right(offsets, clock + service) - 1
+
+    # the truck holds wherever it is until a stop's packages are ready and then drives
+    # there, and it can visit other stops meanwhile, so the leg after the wait is at
+    # least the closest any other stop gets
+    closest = [min([bound[k][j] for k in range(n) if k != j], default=0.0) for j in range(n)]
+
+    # memo[(mask, last)] -> non-dominated (miles, clock, parent, bucket) labels
+    memo = {}
+    for j in range(n):
+        clock = arrive_at(earliest[j], from_start[j])
+        if clock <= latest[j]:
+            memo[(1 << j, j)] = [(from_start[j], clock, None, bucket_of(clock))]
+
+    full = (1 << n) - 1
+
+    # adding a stop only ever sets a bit, so plain numeric order visits every
+    # state after all the states it can be reached from
+    for mask in range(1, full + 1):
+        for last in range(n):
+            labels = memo.get((mask, last))
+            if not labels:
+                continue
+
+            for label_index, (so_far, clock, _, _) in enumerate(labels):
+
+                # deadline pruning: if some unvisited stop can't be reached in time even by
+                # the shortest way from here (or after its wait), no completion of this route works
+                dead = False
+                leave = clock + service
+                for j in range(n):
+                    if not mask & (1 << j):
+                        soonest = max(leave + bound[last][j] * fastest, earliest[j] + closest[j] * fastest)
+                        if soonest > latest[j]:
+                            dead = True
+                            break
+                if dead:
+                    continue
+
+                for j in range(n):
+                    if mask & (1 << j):
+                        continue
+                    arrive = arrive_at(max(leave, earliest[j]), miles[last][j])
+                    if arrive > latest[j]:
+                        continue
+                    key = (mask | (1 << j), j)
+                    _add_label(memo.setdefault(key, []), so_far + miles[last][j], arrive,
+                               (mask, last, label_index), bucket_of(arrive))
+
+    # cheapest complete route, then walk the parent pointers back
+    best = None
+    for last in range(n):
+        for label_index, label in enumerate(memo.get((full, last), [])):
+            if best is None or label[0] < best[0]:
+                best = (label[0], full, last, label_index)
+    if best is None:
+        return None
+
+    _, mask, last, label_index = best
+    order = []
+    while True:
+        order.append(stops[last])
+        parent = memo[(mask, last)][label_index][2]
+        if parent is None:
+            break
+        mask, last, label_index = parent
+    order.reverse()
+    return order
+
+
+def _solve_no_wait(stops, miles, from_start, budget, service_miles=0.0):
+    """
+    Held-Karp over numpy arrays for routes where nobody waits. budget[j] is how
+    many miles can be driven before reaching stop j without missing its deadline.
+    service_miles is each stop's service time as miles of driving, so the k-th
+    stop's budget shrinks by k-1 of them. States are filled in one layer
+    (number of stops visited) at a time.
+    """
+    n = len(stops)
+    full = (1 << n) - 1
+    dist = np.array(miles, dtype=float)
+    bound = shortest_path_closure(dist)
+    budget = np.array(budget, dtype=float)
+
+    # memo[mask, last] = fewest miles visiting mask and ending at last, parent[mask, last] = stop before it
+    memo = np.full((1 << n, n), np.inf)
+    parent = np.full((1 << n, n), -1, dtype=np.int8)
+    for j in range(n):
+        if from_start[j] <= budget[j]:
+            memo[1 << j, j] = from_start[j]
+
+    masks = np.arange(1 << n)
+    popcount = np.zeros(1 << n, dtype=np.int8)
+    for bit in range(n):
+        popcount += (masks >> bit) & 1
+    bits = 1 << np.arange(n)
+
+    for size in range(1, n):
+        layer = masks[popcount == size]
+        visited = (layer[:, None] & bits[None, :]) != 0
+        current = memo[layer]
+
+        # the next stop comes after `size` hand-offs
+        layer_budget = budget - size * service_miles
+
+        # deadline pruning: drop states where some unvisited stop is already out of reach
+        reach = current[:, :, None] + bound[None, :, :]
+        hopeless = ((reach > layer_budget[None, None, :]) & ~visited[:, None, :]).any(axis=2)
+        current = np.where(hopeless, np.inf, current)
+
+        # best way to step from each state to every next stop j
+        step = current[:, :, None] + dist[None, :, :]
+        best_last = step.argmin(axis=1)
+        best = np.take_along_axis(step, best_last[:, None, :], axis=1)[:, 0, :]
+        best[visited | (best > layer_budget[None, :])] = np.inf
+
+        rows, cols = np.nonzero(np.isfinite(best))
+        targets = layer[rows] | bits[cols]
+        memo[targets, cols] = best[rows, cols]
+        parent[targets, cols] = best_last[rows, cols]
+
+    last = int(memo[full].argmin())
+    if not np.isfinite(memo[full, last]):
+        return None
+
+    order = []
+    mask = full
+    while last != -1:
+        order.append(stops[last])
+        previous = int(parent[mask, last])
+        mask ^= 1 << last
+        last = previous
+    order.reverse()
+    return order
+
+
+def run_delivery(truck, hashtable, distance_table, max_stops=DEFAULT_MAX_STOPS, max_wait_stops=DEFAULT_MAX_WAIT_STOPS):
+    """
+    Exact route when the truck has at most max_stops unique stops left,
+    otherwise (or if no order makes every deadline) the greedy router.
+    """
+    stops = [stop for stop in build_stops(truck, hashtable, distance_table).values()
+             if not stop.is_done(hashtable)]
+
+    route = None
+    if len(stops) <= max_stops:
+        route = solve_route(truck, stops, hashtable, distance_table, max_wait_stops)
+    if route is None:
+        print(f"Truck {truck.truck_id}: {len(stops)} stops, using heuristic route")
+        routing.run_delivery(truck, hashtable, distance_table)
+        return None
+
+    print(f"Truck {truck.truck_id}: exact route over {len(stops)} stops")
+    drive_route(truck, route, hashtable, distance_table)
+    return route
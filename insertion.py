@@ -0,0 +1,222 @@
+# insertion.py - time-window aware insertion routing (alternative to routing.run_delivery)
+
+from datetime import datetime, timedelta
+from routing import build_stops, deliver_stop, available_time
+from DistanceTable import truck_location
+
+# ---------------------------------------------------
+#  Insertion Heuristic with Time Windows (VRPTW)
+# ---------------------------------------------------
+#
+# Instead of always driving to the most urgent / nearest package, build the whole
+# route up front by inserting one stop at a time wherever it adds the fewest miles
+# without making any stop miss its window. A stop's window opens when its last
+# package is available (delayed flights) and closes at its earliest deadline.
+# Regret mode inserts the stop that would lose the most by waiting first.
+
+
+def leg_miles(distance_table, i, j):
+    """Miles between two address indexes (2.0 default for unresolved addresses, like get_distance)."""
+    return distance_table.miles(i, j)
+
+
+def stop_window(stop, hashtable, day):
+    """
+    (earliest, latest) datetimes for a stop.
+    earliest: when every package there is available, latest: tightest deadline.
+    """
+    earliest = None
+    latest = None
+    for pid in stop.package_ids:
+        package = hashtable.get(pid)
+
+        ready_at = available_time(package)
+        if ready_at and (earliest is None or ready_at > earliest):
+            earliest = ready_at
+
+        # deadlines come out of load_packages as times (EOD is time.max)
+        deadline = package.deadline
+        if hasattr(deadline, 'hour') and not isinstance(deadline, datetime):
+            deadline = datetime.combine(day, deadline)
+        elif not isinstance(deadline, datetime):
+            deadline = None
+        if deadline and (latest is None or deadline < latest):
+            latest = deadline
+
+    if latest is None:
+        latest = datetime.combine(day, datetime.max.time())
+    return earliest, latest
+
+
+class _Schedule:
+    """
+    Service times and forward slack for a route. slack[p] is how much the stop
+    at position p (and everything after it) can be pushed back before some
+    stop misses its deadline.
+    """
+
+    def __init__(self, route, start_index, start_time, windows, distance_table, truck):
+        self.starts = []
+        current = start_index
+        clock = start_time
+        for p, stop in enumerate(route):
+            if p > 0:
+                clock = clock + truck.service_time()
+            earliest, _ = windows[id(stop)]
+            if earliest and clock < earliest:
+                clock = earliest
+            clock = clock + _travel(truck, distance_table, current, stop.location_index, clock)
+            self.starts.append(clock)
+            current = stop.location_index
+
+        # backward pass so each slack is the min over the rest of the route
+        self.slack = [None] * len(route)
+        running = None
+        for p in range(len(route) - 1, -1, -1):
+            _, latest = windows[id(route[p])]
+            room = latest - self.starts[p]
+            running = room if running is None or room < running else running
+            self.slack[p] = running
+
+
+def _travel(truck, distance_table, i, j, depart):
+    """Driving time between two location IDs leaving at `depart` (the truck's cost model or plain speed)."""
+    return truck.travel_time(leg_miles(distance_table, i, j), i, j, depart)
+
+
+def _insertion_options(stop, route, schedule, start_index, start_time, windows, distance_table, truck):
+    """All feasible (added miles, position) pairs for putting `stop` into `route`."""
+    earliest, latest = windows[id(stop)]
+    options = []
+
+    for pos in range(len(route) + 1):
+        prev_index = route[pos - 1].location_index if pos > 0 else start_index
+        depart = schedule.starts[pos - 1] + truck.service_time() if pos > 0 else start_time
+
+        if earliest and depart < earliest:
+            depart = earliest
+        arrive = depart + _travel(truck, distance_table, prev_index, stop.location_index, depart)
+        if arrive > latest:
+            continue
+
+        added = leg_miles(distance_table, prev_index, stop.location_index)
+
+        if pos < len(route):
+            nxt = route[pos]
+            next_earliest, _ = windows[id(nxt)]
+            leave = arrive + truck.service_time()
+            if next_earliest and leave < next_earliest:
+                leave = next_earliest
+            new_start = leave + _travel(truck, distance_table, stop.location_index, nxt.location_index, leave)
+            push = new_start - schedule.starts[pos]
+            if push > timedelta(0) and push > schedule.slack[pos]:
+                continue
+            added += leg_miles(distance_table, stop.location_index, nxt.location_index)
+            added -= leg_miles(distance_table, prev_index, nxt.location_index)
+
+        options.append((added, pos))
+
+    return options
+
+
+def plan_route(truck, stops, hashtable, distance_table, regret=True, route=None):
+    """
+    Order the given stops for a truck leaving from its current location/time.
+    If route is given the stops are inserted into it (its order is kept), which
+    is how live re-routing repairs just the part of a route not driven yet.
+    Returns (route, infeasible) where infeasible are stops that had to be placed
+    without a feasible window (they get appended at their cheapest spot).
+    """
+    start_index = truck_location(truck, distance_table)
+    start_time = truck.current_time
+    day = start_time.date()
+
+    route = list(route) if route else []
+    windows = {id(stop): stop_window(stop, hashtable, day) for stop in list(stops) + route}
+
+    unrouted = list(stops)
+    infeasible = []
+
+    while unrouted:
+        schedule = _Schedule(route, start_index, start_time, windows, distance_table, truck)
+
+        best = None  # (score, cost, stop, position)
+        for stop in unrouted:
+            options = _insertion_options(stop, route, schedule, start_index, start_time,
+                                         windows, distance_table, truck)
+            if not options:
+                continue
+            options.sort()
+            cost, pos = options[0]
+
+            if regret:
+                # a stop with only one feasible slot left is as urgent as it gets
+                second = options[1][0] if len(options) > 1 else float('inf')
+                score = second - cost
+            else:
+                score = -cost
+
+            if best is None or score > best[0] or (score == best[0] and cost < best[1]):
+                best = (score, cost, stop, pos)
+
+        if best is None:
+            # nothing fits any window anymore, drop in the tightest-deadline stop where it's cheapest
+            stop = min(unrouted, key=lambda st: windows[id(st)][1])
+            cheapest = None
+            for pos in range(len(route) + 1):
+                prev_index = route[pos - 1].location_index if pos > 0 else start_index
+                added = leg_miles(distance_table, prev_index, stop.location_index)
+                if pos < len(route):
+                    added += leg_miles(distance_table, stop.location_index, route[pos].location_index)
+                    added -= leg_miles(distance_table, prev_index, route[pos].location_index)
+                if cheapest is None or added < cheapest[0]:
+                    cheapest = (added, pos)
+            best = (None, cheapest[0], stop, cheapest[1])
+            infeasible.append(stop)
+
+        _, _, stop, pos = best
+        route.insert(pos, stop)
+        unrouted.remove(stop)
+
+    return route, infeasible
+
+
+def cheapest_insertion(truck, stop, route, hashtable, distance_table):
+    """
+    Best feasible (added miles, position) for one stop in a truck's route,
+    or None if it can't go anywhere without breaking a window.
+    """
+    start_index = truck_location(truck, distance_table)
+    day = truck.current_time.date()
+    windows = {id(st): stop_window(st, hashtable, day) for st in list(route) + [stop]}
+    schedule = _Schedule(route, start_index, truck.current_time, windows, distance_table, truck)
+    options = _insertion_options(stop, route, schedule, start_index, truck.current_time,
+                                 windows, distance_table, truck)
+    return min(options) if options else None
+
+
+def run_delivery(truck, hashtable, distance_table, regret=True):
+    """
+    Drop-in replacement for routing.run_delivery that plans the whole route with
+    time-window insertion first, then drives it stop by stop.
+    """
+    stops = [stop for stop in build_stops(truck, hashtable, distance_table).values()
+             if not stop.is_done(hashtable)]
+
+    route, infeasible = plan_route(truck, stops, hashtable, distance_table, regret)
+    for stop in infeasible:
+        print(f"Truck {truck.truck_id}: no on-time slot for {stop.address}, inserted at cheapest position")
+
+    drive_route(truck, route, hashtable, distance_table)
+    return route
+
+
+def drive_route(truck, route, hashtable, distance_table):
+    """Drive a planned list of stops in order, waiting for late packages where needed."""
+    day = truck.current_time.date()
+    for stop in route:
+        # hold at the current spot until the stop's packages are available
+        earliest, _ = stop_window(stop, hashtable, day)
+        if earliest and truck.current_time < earliest:
+            truck.current_time = earliest
+        deliver_stop(truck, stop, hashtable, distance_table)
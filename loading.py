@@ -0,0 +1,271 @@
+# loading.py - pack packages onto trucks by count, weight and volume (first-fit / best-fit decreasing)
+
+import math
+from bisect import bisect_left, insort
+from datetime import datetime
+
+from constraints import group_for
+from routing import available_time
+from DistanceTable import package_location
+from validate import earliest_arrival
+
+# ---------------------------------------------------
+#  Bin Packing Loader
+# ---------------------------------------------------
+#
+# Packages go out heaviest first, a deliver-together group as one unit, with
+# units that have a deadline ahead of the rest so the early trucks still have
+# room for them. Trucks are bins with three limits (package count, kilos, cubic feet).
+#   first fit: the lowest-numbered truck with room. A max-tree over the trucks'
+#              free kilos, cubic feet, package slots and departure skips every
+#              subtree where no truck has enough of one of them.
+#   best fit:  the truck that's left with the least free weight. A sorted list of
+#              (free kilos, truck) finds the tightest one with enough room by bisect.
+# A candidate still has to pass the truck-restriction and deadline checks (can
+# it reach every stop in the unit in time leaving when it does, see
+# validate.earliest_arrival), and the search moves on to the next candidate if it
+# doesn't. Restricted units only ever try their truck.
+
+
+# restriction for a unit nothing is allowed to carry
+_NO_TRUCK = object()
+
+# the indexes compare free room (limit - load), fits() adds up (load + unit <= limit),
+# and the two can round differently, so the indexes let anything this close through to fits()
+_SLACK = 1e-9
+
+# Package.deadline for "end of day", i.e. no deadline
+_EOD = datetime.max.time()
+
+
+class _Unit:
+    def __init__(self, package_ids, weight, volume, restriction, ready_at, deadlines):
+        self.package_ids = package_ids
+        self.count = len(package_ids)
+        self.weight = weight
+        self.volume = volume
+        self.restriction = restriction
+        self.ready_at = ready_at
+
+        # (location ID, deadline) for every member that has one
+        self.deadlines = deadlines
+
+
+class _Bin:
+    def __init__(self, truck, hashtable, distance_table=None):
+        self.truck = truck
+        self.capacity = truck.capacity
+        self.count, self.weight, self.volume = truck.load(hashtable)
+        self.max_weight = math.inf if truck.max_weight is None else truck.max_weight
+        self.max_volume = math.inf if truck.max_volume is None else truck.max_volume
+        self.package_ids = []
+
+        # shortest-path miles from the truck's hub for the deadline check (None: no table, just the clock)
+        self.closure = distance_table.shortest_paths() if distance_table is not None else None
+        self.hub = distance_table.find_index(truck.hub_location) if distance_table is not None else None
+
+    def free_weight(self):
+        return self.max_weight - self.weight
+
+    def room(self):
+        """(free kilos, free cubic feet, free slots, departure) for the first fit tree."""
+        depart = self.truck.start_time
+        return (self.max_weight - self.weight, self.max_volume - self.volume, self.capacity - self.count,
+                depart if hasattr(depart, 'hour') else datetime.max)
+
+    def fits(self, unit):
+        if self.count + unit.count > self.capacity:
+            return False
+        if self.weight + unit.weight > self.max_weight or self.volume + unit.volume > self.max_volume:
+            return False
+        if unit.restriction is not None and unit.restriction != self.truck.truck_id:
+            return False
+        # a load leaves the hub once, so the unit has to be there by then
+        depart = self.truck.start_time
+        if not hasattr(depart, 'hour'):
+            return True
+        if unit.ready_at is not None and depart < unit.ready_at:
+            return False
+        return self.makes_deadlines(unit, max(depart, unit.ready_at or depart))
+
+    def makes_deadlines(self, unit, leave):
+        """True if the truck could reach every deadline stop in the unit in time leaving at `leave`."""
+        for stop, deadline in unit.deadlines:
+            due = datetime.combine(leave.date(), deadline)
+            arrive = earliest_arrival(self.truck, self.closure, self.hub, stop, leave, due) \
+                if self.closure is not None else leave
+            if arrive > due:
+                return False
+        return True
+
+    def add(self, unit):
+        self.count += unit.count
+        self.weight += unit.weight
+        self.volume += unit.volume
+        self.package_ids.extend(unit.package_ids)
+
+
+class _MaxTree:
+    """
+    Max segment tree over each bin's room (see _Bin.room), one array per dimension,
+    for "first bin that could take this unit" queries. A subtree is skipped as soon
+    as its best on any one dimension falls short.
+    """
+
+    def __init__(self, rooms):
+        self.size = 1
+        while self.size < len(rooms):
+            self.size *= 2
+        self.weight = [-math.inf] * (2 * self.size)
+        self.volume = [-math.inf] * (2 * self.size)
+        self.slots = [-math.inf] * (2 * self.size)
+        self.depart = [datetime.min] * (2 * self.size)
+        for i, room in enumerate(rooms):
+            self._set(self.size + i, room)
+        for node in range(self.size - 1, 0, -1):
+            self._pull(node)
+
+    def _set(self, node, room):
+        self.weight[node], self.volume[node], self.slots[node], self.depart[node] = room
+
+    def _pull(self, node):
+        left, right = 2 * node, 2 * node + 1
+        self.weight[node] = max(self.weight[left], self.weight[right])
+        self.volume[node] = max(self.volume[left], self.volume[right])
+        self.slots[node] = max(self.slots[left], self.slots[right])
+        self.depart[node] = max(self.depart[left], self.depart[right])
+
+    def update(self, i, room):
+        """New room for bin i (None: it's full, never hand it out again)."""
+        node = self.size + i
+        self._set(node, room or (-math.inf, -math.inf, -math.inf, datetime.min))
+        node //= 2
+        while node:
+            before = (self.weight[node], self.volume[node], self.slots[node], self.depart[node])
+            self._pull(node)
+            # ancestors only change if this node did
+            if before == (self.weight[node], self.volume[node], self.slots[node], self.depart[node]):
+                break
+            node //= 2
+
+    def first_fit(self, unit, start=0):
+        """Lowest index >= start with enough of everything for unit, or None."""
+        weight, volume, slots, depart = self.weight, self.volume, self.slots, self.depart
+        need_weight, need_volume, need_slots = unit.weight - _SLACK, unit.volume - _SLACK, unit.count
+        ready = unit.ready_at or datetime.min
+        if start >= self.size:
+            return None
+        node = self.size + start if start else 1
+        while True:
+            if weight[node] >= need_weight and volume[node] >= need_volume and slots[node] >= need_slots \
+                    and depart[node] >= ready:
+                if node >= self.size:
+                    return node - self.size
+                # some bin down here might do, try its left half first
+                node = 2 * node
+                continue
+            # nothing in this subtree: hop right (climbing past right children) to the next one
+            while node & 1:
+                node >>= 1
+            if node == 0:
+                return None
+            node += 1
+
+
+def _units(hashtable, package_ids, distance_table=None):
+    """Deliver-together groups as single units, the ones with deadlines first, heaviest first within that."""
+    pending = set(package_ids)
+    units = []
+    seen = set()
+    for package_id in package_ids:
+        if package_id in seen:
+            continue
+        group = [pid for pid in group_for(hashtable.get(package_id)) if pid in pending]
+        seen.update(group)
+        packages = [hashtable.get(pid) for pid in group]
+        restrictions = {getattr(p, 'truck_restriction', None) for p in packages} - {None}
+        restriction = restrictions.pop() if restrictions else None
+        if restrictions:
+            # members pinned to different trucks, no truck can take the group
+            restriction = _NO_TRUCK
+        ready = [t for t in (available_time(p) for p in packages) if t]
+        deadlines = [(package_location(p, distance_table) if distance_table is not None else None, p.deadline)
+                     for p in packages if p.deadline is not None and p.deadline != _EOD]
+        units.append(_Unit(group, sum(p.weight for p in packages), sum(p.volume for p in packages),
+                           restriction, max(ready) if ready else None, deadlines))
+    units.sort(key=lambda unit: (not unit.deadlines, -unit.weight, -unit.volume, unit.package_ids[0]))
+    return units
+
+
+def pack(trucks, hashtable, package_ids, best_fit=True, distance_table=None):
+    """
+    Decide which truck each package goes on. Returns ({truck_id: [package_ids]}, unplaced IDs).
+    Nothing is loaded yet (see load_trucks). Whatever is already on a truck counts against it.
+    With a distance_table a deadline only goes on a truck that could get there in time.
+    """
+    bins = [_Bin(truck, hashtable, distance_table) for truck in trucks]
+    by_id = {b.truck.truck_id: i for i, b in enumerate(bins)}
+    unplaced = []
+
+    if best_fit:
+        index = sorted((b.free_weight(), i) for i, b in enumerate(bins))
+    else:
+        tree = _MaxTree([b.room() for b in bins])
+
+    for unit in _units(hashtable, package_ids, distance_table):
+        chosen = None
+        if unit.restriction is not None:
+            i = by_id.get(unit.restriction)
+            if i is not None and bins[i].fits(unit):
+                chosen = i
+        elif best_fit:
+            # tightest truck with enough free weight, then looser ones until the other checks pass
+            for position in range(bisect_left(index, (unit.weight - _SLACK, -1)), len(index)):
+                i = index[position][1]
+                if bins[i].fits(unit):
+                    chosen = i
+                    break
+        else:
+            i = tree.first_fit(unit)
+            while i is not None:
+                if bins[i].fits(unit):
+                    chosen = i
+                    break
+                i = tree.first_fit(unit, i + 1)
+
+        if chosen is None:
+            unplaced.extend(unit.package_ids)
+            continue
+
+        # a truck that's out of package slots drops out of the index altogether
+        full = bins[chosen].count + unit.count >= bins[chosen].capacity
+        if best_fit:
+            index.pop(bisect_left(index, (bins[chosen].free_weight(), chosen)))
+            bins[chosen].add(unit)
+            if not full:
+                insort(index, (bins[chosen].free_weight(), chosen))
+        else:
+            bins[chosen].add(unit)
+            tree.update(chosen, None if full else bins[chosen].room())
+
+    return {b.truck.truck_id: b.package_ids for b in bins}, unplaced
+
+
+def load_trucks(trucks, hashtable, package_ids=None, best_fit=True, distance_table=None):
+    """
+    Pack every not-yet-delivered, not-yet-loaded package (or package_ids) and load
+    the trucks with the result. Returns the IDs that fit nowhere (or that no truck can get there in time).
+    """
+    if package_ids is None:
+        on_board = {pid for truck in trucks for pid in truck.packages}
+        package_ids = [pid for pid in hashtable.keys()
+                       if pid not in on_board and hashtable.get(pid).delivery_time is None]
+    assignment, unplaced = pack(trucks, hashtable, package_ids, best_fit, distance_table)
+    for truck in trucks:
+        # pack already held every limit, so skip load_package's per-package re-count
+        truck.packages.extend(assignment[truck.truck_id])
+        for package_id in assignment[truck.truck_id]:
+            package = hashtable.get(package_id)
+            package.truck_id = truck.truck_id
+            package.assigned_truck = truck.truck_id
+    return unplaced
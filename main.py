@@ -1,17 +1,48 @@
 ﻿from datetime import datetime
 from Package import Package, PackageStatus
 from Truck import Truck
-from HashTable import HashTable
-from DistanceTable import DistanceTable
+from Depot import WGU_HUB_ADDRESS
+from PackageStore import PackageStore, ConcurrentPackageStore
+from RouteCache import RouteCache
+from CostModel import CostModel
+from DistanceTable import DistanceTable, intern_locations, package_location
 import routing
+import strategies
+import insertion
+import anneal
+import loading
+import dispatch
+import snapshot
+import LegLog
+import status
+import constraints
+import validate
 import csv
-import pandas as pd # type: ignore
+import sys
+import time
 
 
+# routing strategies that can be picked per run or per truck (see strategies.py)
+ROUTING_ENGINES = strategies.STRATEGIES
+
+# the package file only says "Wrong address listed" for these, the fix comes in later
+# (package_id, time, address, city, zip)
+WGUPS_ADDRESS_CORRECTIONS = [
+    (9, "10:20 AM", "410 S State St", "Salt Lake City", "84111"),
+]
+
 # initialize data structures
-def load_packages(csv_file):
-    """Load packages from WGUPS_Package_File.csv into a hash table (robust to messy headers)."""
-    hashtable = HashTable()
+def load_packages(csv_file, corrections=WGUPS_ADDRESS_CORRECTIONS, concurrent=False):
+    """
+    Load packages from WGUPS_Package_File.csv into a hash table (robust to messy headers).
+    corrections: (package_id, "HH:MM AM", address, city, zip) fixes for notes that only
+    say "Wrong address listed" (a note can also carry its own, see constraints._CORRECTION).
+    Routers deliver to the corrected address and hold the package until the fix comes in.
+    concurrent=True stores them in a ConcurrentPackageStore, for reading from other
+    threads while the simulation runs (see status_server.py --live).
+    """
+    hashtable = ConcurrentPackageStore() if concurrent else PackageStore()
+    rules = []
     with open(csv_file, newline='') as f:
         rows = list(csv.reader(f))
     # Find header row by looking for 'Package' and 'Address'
@@ -36,6 +67,7 @@ def load_packages(csv_file):
     idx_zip =       find_col("zip")
     idx_deadline =  find_col("deadline")
     idx_weight =    find_col("weight")
+    idx_volume =    find_col("volume")
     idx_notes =     find_col("special") or find_col("notes")
     # Process each row after header
     for row in rows[header_idx + 1:]:
@@ -49,6 +81,7 @@ def load_packages(csv_file):
         city = row[idx_city].strip() if idx_city is not None else ""
         zip_code = row[idx_zip].strip() if idx_zip is not None else ""
         weight = row[idx_weight].strip() if idx_weight is not None else ""
+        volume = row[idx_volume].strip() if idx_volume is not None else ""
         notes = row[idx_notes].strip() if idx_notes is not None else ""
         # Parse deadline
         raw_deadline = row[idx_deadline].strip() if idx_deadline is not None else ""
@@ -65,213 +98,362 @@ def load_packages(csv_file):
             city = city,
             zip_code = zip_code,
             weight = weight,
+            volume = volume,
             deadline = deadline,
             status = PackageStatus.AT_HUB,
             notes = notes
         )
-        # process special notes to set constraints
-        if notes:
-            notes_lower = notes.lower()
-            
-            # Delayed packages (6, 25, 28, 32) + any with "delayed" or "9:05" text
-            if ("delayed" in notes_lower and "9:05" in notes_lower) or pkg_id in [6, 25, 28, 32]:
-                pkg.delayed_until = datetime.strptime("09:05 AM", "%I:%M %p")
-            
-            # Package 9 address correction - goes on Truck 3 at 10:21 AM
-            if pkg_id == 9:
-                pkg.correct_address = "410 S State St"  # Store the correct address
-                pkg.address_correction_time = datetime.strptime("10:20 AM", "%I:%M %p")
-            
-            # Packages that can only be on truck 2 (3, 18, 36, 38)
-            if "can only be on truck 2" in notes_lower or "truck 2" in notes_lower:
-                pkg.truck_restriction = 2
-                
+        # special notes become typed rules, applied once every row is in
+        rules.extend(constraints.parse_notes(pkg_id, notes))
         hashtable.insert(pkg.id, pkg)
+
+    # compile the rules (groups need every row) and copy them onto the packages
+    compiled = constraints.Constraints(rules)
+    for package_id, at, address, city, zip_code in corrections:
+        compiled.correct(package_id, datetime.strptime(at, "%I:%M %p"), address, city, zip_code)
+    for package_id in hashtable.keys():
+        compiled.apply(hashtable.get(package_id))
     return hashtable
 
 
 
-def assign_packages_to_trucks(trucks, hashtable):
+def assign_packages_to_trucks(trucks, hashtable, distance_table=None):
     """
-    Load packages into trucks with corrected assignments for grouped deliveries
-    and proper constraint handling.
+    Load every package onto a truck from its parsed constraints (see constraints.py).
+    A deliver-together group rides as one unit. A truck-only package goes on its
+    truck, one that isn't at the hub yet (delayed, or waiting on an address fix) on
+    the first truck leaving after it is, and a deadline on the earliest truck that can
+    make it (with a distance_table, one that could get there in time, see
+    validate.earliest_arrival). Everything else goes on the last truck out that
+    already stops at its address, or just the last truck out with room.
     """
     print("=== Loading All Trucks (8:00 AM) ===")
     print("Loading trucks sequentially at 08:00 AM...")
-    
-    # Manual truck assignments to ensure grouped packages stay together
-    # and all constraints are met
-    
-    truck1_packages = [
-        15,  # 9:00 AM deadline - HIGHEST PRIORITY
-        1, 13, 14, 16, 19, 20,  # Grouped packages (must be delivered together)
-        29, 30, 31, 34, 37, 40,  # Other 10:30 AM deadlines
-        2, 4, 5  # Fill remaining slots
-    ]
-    
-    truck2_packages = [
-        3, 18, 36, 38,  # Required on truck 2 (CSV notes)
-        6, 25, 28, 32,  # Delayed packages (available after 9:05 AM)
-        21, 22, 23, 24, 26, 27  # Fill remaining slots
-    ]
-    
-    truck3_packages = [
-        9,  # Wrong address - corrected at 10:20 AM
-        7, 8, 10, 11, 12, 17, 33, 35, 39  # Remaining packages
-    ]
-    
-    # Load Truck 1
-    print(f"\nLoading Truck 1:")
-    for package_id in truck1_packages:
-        package = hashtable.get(package_id)
-        if package:
-            trucks[0].load_package(package_id, hashtable)
-            package.assigned_truck = 1
-            if package_id == 15:
-                print(f"Package {package_id} → Truck 1 (9:00 AM deadline - PRIORITY)")
-            elif package_id in [1, 13, 14, 16, 19, 20]:
-                print(f"Package {package_id} → Truck 1 (grouped delivery)")
-            elif package_id in [29, 30, 31, 34, 37, 40]:
-                print(f"Package {package_id} → Truck 1 (10:30 AM deadline)")
-            else:
-                print(f"Package {package_id} → Truck 1")
-    
-    # Load Truck 2
-    print(f"\nLoading Truck 2:")
-    for package_id in truck2_packages:
-        package = hashtable.get(package_id)
-        if package:
-            trucks[1].load_package(package_id, hashtable)
-            package.assigned_truck = 2
-            if package_id in [3, 18, 36, 38]:
-                print(f"Package {package_id} → Truck 2 (required)")
-            elif package_id in [6, 25, 28, 32]:
-                print(f"Package {package_id} → Truck 2 (delayed until 9:05 AM)")
-            else:
-                print(f"Package {package_id} → Truck 2")
-    
-    # Load Truck 3
-    print(f"\nLoading Truck 3:")
-    for package_id in truck3_packages:
-        package = hashtable.get(package_id)
-        if package:
-            trucks[2].load_package(package_id, hashtable)
-            package.assigned_truck = 3
-            if package_id == 9:
-                print(f"Package {package_id} → Truck 3 (wrong address - corrected at 10:20 AM)")
-            else:
-                print(f"Package {package_id} → Truck 3")
-    
-    # Verify all packages assigned
-    total_assigned = len(trucks[0].packages) + len(trucks[1].packages) + len(trucks[2].packages)
-    
-    print(f"\nFinal truck assignments:")
-    print(f"Truck 1: {len(trucks[0].packages)} packages {sorted(trucks[0].packages)}")
-    print(f"Truck 2: {len(trucks[1].packages)} packages {sorted(trucks[1].packages)}")
-    print(f"Truck 3: {len(trucks[2].packages)} packages {sorted(trucks[2].packages)}")
-    print(f"Total packages assigned: {total_assigned}/40")
-    
-    if total_assigned != 40:
-        print("WARNING: Not all packages were assigned!")
-    else:
-        print("SUCCESS: All 40 packages assigned correctly!")
 
+    closure = distance_table.shortest_paths() if distance_table is not None else None
+    hubs = {truck.truck_id: distance_table.find_index(truck.hub_location) if distance_table is not None else None
+            for truck in trucks}
+    by_departure = sorted(trucks, key=lambda truck: (truck.start_time if hasattr(truck.start_time, 'hour')
+                                                     else datetime.min, truck.truck_id))
+
+    # one unit per group, the tightest constraints pick their trucks first
+    units = []
+    seen = set()
+    for package_id in sorted(hashtable.keys()):
+        if package_id in seen or hashtable.get(package_id).delivery_time is not None:
+            continue
+        group = constraints.group_for(hashtable.get(package_id))
+        seen.update(group)
+        packages = [hashtable.get(pid) for pid in group if hashtable.get(pid) is not None]
+        restriction = next((p.truck_restriction for p in packages if getattr(p, 'truck_restriction', None)), None)
+        ready = [t for t in (constraints.available_time(p) for p in packages) if t]
+        due = min(p.deadline for p in packages)
+        units.append((restriction is None, not ready, due, [p.id for p in packages], restriction,
+                      max(ready) if ready else None))
+    units.sort(key=lambda unit: unit[:4])
+
+    stops = {truck.truck_id: set() for truck in trucks}
+    unplaced = []
+    for _, _, due, package_ids, restriction, ready_at in units:
+        packages = [hashtable.get(pid) for pid in package_ids]
+        candidates = [truck for truck in by_departure
+                      if (restriction is None or truck.truck_id == restriction)
+                      and _can_take(truck, packages, hashtable, ready_at, closure, hubs[truck.truck_id], distance_table)]
+        if not candidates:
+            unplaced.extend(package_ids)
+            continue
 
-def initialize_trucks():
+        # anything with a time limit takes the first truck that works. the rest goes out as late
+        # as it can, on the last truck that already stops there if any (later days have more slack)
+        if restriction is not None or ready_at is not None or due != datetime.max.time():
+            truck = candidates[0]
+        else:
+            where = {_stop_of(p, distance_table) for p in packages}
+            truck = next((t for t in reversed(candidates) if where & stops[t.truck_id]), candidates[-1])
+
+        for package in packages:
+            truck.load_package(package.id, hashtable)
+            package.assigned_truck = truck.truck_id
+            stops[truck.truck_id].add(_stop_of(package, distance_table))
+
+    for truck in trucks:
+        print(f"\nLoading Truck {truck.truck_id}:")
+        for package_id in truck.packages:
+            print(f"Package {package_id} → Truck {truck.truck_id}{_load_reason(hashtable.get(package_id))}")
+
+    total_assigned = sum(len(truck.packages) for truck in trucks)
+    print(f"\nFinal truck assignments:")
+    for truck in trucks:
+        print(f"Truck {truck.truck_id}: {len(truck.packages)} packages {sorted(truck.packages)}")
+    print(f"Total packages assigned: {total_assigned}/{total_assigned + len(unplaced)}")
+
+    if unplaced:
+        print(f"WARNING: Not all packages were assigned! No truck can take {sorted(unplaced)}")
+    else:
+        print(f"SUCCESS: All {total_assigned} packages assigned correctly!")
+
+
+def _stop_of(package, distance_table):
+    """Where a package gets dropped off: its location ID, or the raw address without a table."""
+    location = package_location(package, distance_table) if distance_table is not None else None
+    return location if location is not None else package.address
+
+
+def _can_take(truck, packages, hashtable, ready_at, closure, hub, distance_table):
+    """True if the truck has room for every package and leaves in time to have them and make their deadlines."""
+    load = truck.load(hashtable)
+    for package in packages:
+        if not truck.can_fit(package, hashtable, load):
+            return False
+        load = (load[0] + 1, load[1] + package.weight, load[2] + package.volume)
+
+    depart = truck.start_time
+    if not hasattr(depart, 'hour'):
+        return True
+    if ready_at is not None and depart < ready_at:
+        return False
+    leave = max(depart, ready_at or depart)
+    for package in packages:
+        if package.deadline == datetime.max.time():
+            continue
+        due = datetime.combine(depart.date(), package.deadline)
+        stop = package_location(package, distance_table) if distance_table is not None else None
+        arrive = validate.earliest_arrival(truck, closure, hub, stop, leave, due) if closure is not None else leave
+        if arrive > due:
+            return False
+    return True
+
+
+def _load_reason(package):
+    """Why a package went where it did, from its parsed constraints (empty if nothing special)."""
+    if getattr(package, 'truck_restriction', None) is not None:
+        return " (required)"
+    if getattr(package, 'delayed_until', None):
+        return f" (delayed until {package.delayed_until.strftime('%I:%M %p')})"
+    if getattr(package, 'address_correction_time', None):
+        return f" (wrong address - corrected at {package.address_correction_time.strftime('%I:%M %p')})"
+    if package.group_constrained:
+        return " (grouped delivery)"
+    if package.deadline != datetime.max.time():
+        return f" ({package.deadline.strftime('%I:%M %p')} deadline)"
+    return ""
+
+
+def initialize_trucks(start_times=("08:00", "09:30", "10:21"), speed=18, capacity=16, cost_model=None,
+                      max_weight=None, max_volume=None):
     """
-    Initialize trucks with proper start times and constraints
+    Initialize trucks with proper start times and constraints.
+    One truck per start time ("HH:MM"), numbered from 1. The defaults are the
+    WGUPS plan: truck 2 waits for the 9:05 flight, truck 3 for package 9's fix.
+    speed can be one number or one per truck, cost_model is shared by every truck.
+    max_weight / max_volume limit every truck's load (kilos / cubic feet, None: no limit).
     """
     trucks = []
     
     # Use keyword arguments to avoid parameter order confusion
-    truck1 = Truck(truck_id=1, start_time=datetime.strptime("08:00", "%H:%M"))
-    trucks.append(truck1)
-    
-    truck2 = Truck(truck_id=2, start_time=datetime.strptime("09:30", "%H:%M"))
-    trucks.append(truck2)
-    
-    truck3 = Truck(truck_id=3, start_time=datetime.strptime("10:21", "%H:%M"))
-    trucks.append(truck3)
+    for truck_id, start in enumerate(start_times, start=1):
+        truck_speed = speed[truck_id - 1] if isinstance(speed, (list, tuple)) else speed
+        truck = Truck(truck_id=truck_id, capacity=capacity, speed=truck_speed, cost_model=cost_model,
+                      start_time=datetime.strptime(start, "%H:%M"), max_weight=max_weight, max_volume=max_volume)
+        trucks.append(truck)
     
     return trucks
 
-def run_all_deliveries(trucks, hashtable, distance_table):
+
+def live_events(hashtable):
+    """The mid-day address fixes from the package notes, as dispatcher events."""
+    events = []
+    for package_id in hashtable.keys():
+        package = hashtable.get(package_id)
+        if getattr(package, 'address_correction_time', None):
+            events.append(dispatch.AddressChange(package.address_correction_time, package_id, package.correct_address,
+                                                 package.correct_city, package.correct_zip))
+    return events
+
+
+def check_plan(trucks, hashtable, distance_table):
+    """Validate the loaded trucks before routing, raises ValueError if the plan can't work."""
+    started = time.perf_counter()
+    problems = validate.validate_plan(trucks, hashtable, distance_table)
+    elapsed = (time.perf_counter() - started) * 1000
+
+    if not problems:
+        print(f"\nPlan check passed ({elapsed:.2f} ms)")
+        return
+    print(f"\nPlan check found {len(problems)} problems ({elapsed:.2f} ms):")
+    for problem in problems:
+        print(f"  {problem}")
+    raise ValueError(f"Infeasible truck plan: {problems[0]}" + (f" (+{len(problems) - 1} more)" if len(problems) > 1 else ""))
+
+
+def print_strategy_stats(router):
+    """One line per routing strategy used: runs, planning / driving time, miles."""
+    for stats in router.stats():
+        if not stats["runs"]:
+            continue
+        print(f"Routing [{stats['strategy']}]: {stats['runs']} runs, {stats['plan_ms']:.2f} ms planning, "
+              f"{stats['simulate_ms']:.2f} ms driving, {stats['miles']:.2f} miles")
+        if "hits" in stats:
+            print(f"  route cache: {stats['hits']} hits, {stats['misses']} misses ({stats['rejected']} rejected), "
+                  f"{stats['entries']} plans stored")
+
+
+def run_all_deliveries(trucks, hashtable, distance_table, multi_trip=False, drivers=2, engine="greedy", events=None,
+                       route_cache=None, anneal_budget=None, anneal_islands=None, pack=False):
     """
-    Run deliveries with sequential truck loading and departure times.
+    Run one full day in whichever mode the flags pick, then report anything left undelivered.
+    - events (see live_events): drive the loaded trucks with a dispatch.Dispatcher (run_live_deliveries)
+    - multi_trip=True: `drivers` trucks keep reloading at the hub (run_multi_trip_deliveries)
+    - anneal_budget (seconds): re-plan the fixed loads and routes with anneal.py first (run_annealed_deliveries)
+    - otherwise the fixed plan, one truck after another (run_fixed_deliveries)
+    engine picks the router: a name from ROUTING_ENGINES for every truck, or
+    {truck_id: name, "default": name} to use different strategies per truck.
+    route_cache (a RouteCache) reuses stored plans for routes seen on earlier runs.
+    pack=True loads the fixed plan with loading.py's best-fit-decreasing packer
+    (weight / volume aware) instead of assign_packages_to_trucks.
+    Returns the IDs of undelivered packages.
     """
-    
-    truck1, truck2, truck3 = trucks
-    
-    # SINGLE ASSIGNMENT PHASE: Load all trucks at start but they leave at different times
-    initial_time = datetime.strptime("08:00 AM", "%I:%M %p")
-    
-    # Load all trucks according to strategy
-    assign_packages_to_trucks([truck1, truck2, truck3], hashtable)
-    
-    # Phase 1: Truck 1 leaves at 8:00 AM
-    print("\n=== Phase 1: Truck 1 Deliveries (8:00 AM) ===")
-    if truck1.packages:
-        valid_packages = [pid for pid in truck1.packages if pid is not None]
-        truck1.packages = valid_packages
-        print(f"Truck 1 starting deliveries at 8:00 AM...")
-        routing.run_delivery(truck1, hashtable, distance_table)
-    
-    # Phase 2: Truck 2 leaves at 9:30 AM
-    print("\n=== Phase 2: Truck 2 Deliveries (9:30 AM) ===")
-    if truck2.packages:
-        valid_packages = [pid for pid in truck2.packages if pid is not None]
-        truck2.packages = valid_packages
-        print(f"Truck 2 starting deliveries at 9:30 AM...")
-        routing.run_delivery(truck2, hashtable, distance_table)
-    
-    # Phase 3: Truck 3 leaves at 10:21 AM
-    print("\n=== Phase 3: Truck 3 Deliveries (10:21 AM) ===")
-    if truck3.packages:
-        valid_packages = [pid for pid in truck3.packages if pid is not None]
-        truck3.packages = valid_packages
-        print(f"Truck 3 starting deliveries at 10:21 AM...")
-        routing.run_delivery(truck3, hashtable, distance_table)
-    
+    # resolve every address to its distance table row once, routing works on the IDs
+    intern_locations(hashtable, distance_table)
+    run_delivery = strategies.TruckRouter(engine, route_cache)
+
+    if events is not None:
+        run_live_deliveries(trucks, hashtable, distance_table, events)
+    elif multi_trip:
+        run_multi_trip_deliveries(trucks, hashtable, distance_table, drivers, run_delivery)
+    else:
+        load_fixed_plan(trucks, hashtable, distance_table, pack)
+        if anneal_budget:
+            run_annealed_deliveries(trucks, hashtable, distance_table, anneal_budget, anneal_islands)
+        else:
+            run_fixed_deliveries(trucks, hashtable, distance_table, run_delivery)
+
     print("\n=== All deliveries completed ===")
-    
-    # Verify all packages were delivered
-    undelivered = []
-    for package_id in hashtable.keys():
-        package = hashtable.get(package_id)
-        if not hasattr(package, 'delivery_time') or package.delivery_time is None:
-            undelivered.append(package_id)
-    
+    print_strategy_stats(run_delivery)
+    return report_undelivered(hashtable)
+
+
+def run_live_deliveries(trucks, hashtable, distance_table, events):
+    """Load the fixed plan and drive it with the live dispatcher, repairing routes as each event comes in."""
+    assign_packages_to_trucks(trucks, hashtable, distance_table)
+    check_plan(trucks, hashtable, distance_table)
+    print("\n=== Live Dispatch ===")
+    dispatcher = dispatch.Dispatcher(trucks, hashtable, distance_table)
+    dispatcher.plan()
+    for event in sorted(events, key=lambda e: e.time):
+        elapsed = dispatcher.apply(event)
+        print(f"Event: {event} (re-routed in {elapsed:.2f} ms)")
+        for truck in trucks:
+            if truck.truck_id not in dispatcher.broken:
+                remaining = dispatcher.projection(truck.truck_id)
+                print(f"  Truck {truck.truck_id}: {truck.mileage:.2f} mi driven, "
+                      f"{remaining.total_miles():.2f} mi left, done by {remaining.finish_time().strftime('%I:%M %p')}")
+    dispatcher.finish()
+
+
+def run_multi_trip_deliveries(trucks, hashtable, distance_table, drivers, run_delivery):
+    """Skip the fixed plan: `drivers` trucks keep returning to the hub and reloading from the pending pool."""
+    print(f"\n=== Multi-Trip Deliveries ({drivers} drivers) ===")
+    routing.run_multi_trip(trucks, hashtable, distance_table, drivers=drivers, deliver=run_delivery)
+
+
+def load_fixed_plan(trucks, hashtable, distance_table, pack=False):
+    """Load every truck up front (the packer with pack=True), raises ValueError if the plan can't work."""
+    if pack:
+        unplaced = loading.load_trucks(trucks, hashtable, distance_table=distance_table)
+        for truck in trucks:
+            count, weight, volume = truck.load(hashtable)
+            print(f"Truck {truck.truck_id}: {count} packages, {weight:g} kg {sorted(truck.packages)}")
+        if unplaced:
+            print(f"WARNING: {len(unplaced)} packages fit on no truck (or no truck makes their deadline): "
+                  f"{sorted(unplaced)}")
+    else:
+        assign_packages_to_trucks(trucks, hashtable, distance_table)
+    check_plan(trucks, hashtable, distance_table)
+
+
+def run_annealed_deliveries(trucks, hashtable, distance_table, budget, islands=None):
+    """Re-plan the loaded trucks with parallel simulated annealing, then drive the routes it found."""
+    print(f"\n=== Annealing Fleet Plan ({budget:.1f} s budget) ===")
+    plan, cost, epochs = anneal.anneal_fleet(trucks, hashtable, distance_table, budget, islands)
+    print(f"Best plan costs {cost:.2f} after {epochs} epochs")
+    routes = anneal.apply_plan(trucks, hashtable, distance_table, plan)
+    check_plan(trucks, hashtable, distance_table)
+    for truck in trucks:
+        print(f"\nTruck {truck.truck_id} starting deliveries at {truck.current_time.strftime('%I:%M %p')}...")
+        insertion.drive_route(truck, routes[truck.truck_id], hashtable, distance_table)
+
+
+def run_fixed_deliveries(trucks, hashtable, distance_table, run_delivery):
+    """Drive the loaded trucks one after another in departure order (truck 2 waits for the 9:05 flight etc)."""
+    by_departure = sorted(trucks, key=lambda truck: (truck.start_time if hasattr(truck.start_time, 'hour')
+                                                     else datetime.min, truck.truck_id))
+    for phase, truck in enumerate(by_departure, start=1):
+        leaves = truck.start_time.strftime('%I:%M %p') if hasattr(truck.start_time, 'hour') else "the start"
+        print(f"\n=== Phase {phase}: Truck {truck.truck_id} Deliveries ({leaves}) ===")
+        truck.packages = [pid for pid in truck.packages if pid is not None]
+        if truck.packages:
+            print(f"Truck {truck.truck_id} starting deliveries at {leaves}...")
+            run_delivery(truck, hashtable, distance_table)
+
+
+def report_undelivered(hashtable):
+    """Print whether every package got delivered, returns the IDs of the ones that didn't."""
+    undelivered = sorted(package_id for package_id in hashtable.keys()
+                         if getattr(hashtable.get(package_id), 'delivery_time', None) is None)
     if undelivered:
-        print(f"WARNING: {len(undelivered)} packages not delivered: {sorted(undelivered)}")
+        print(f"WARNING: {len(undelivered)} packages not delivered: {undelivered}")
     else:
-        print("SUCCESS: All 40 packages were delivered")
+        print(f"SUCCESS: All {len(hashtable.keys())} packages were delivered")
+    return undelivered
+
+
+def late_packages(hashtable):
+    """
+    Returns (package_id, minutes_late) for every package delivered after its deadline.
+    Undelivered packages with a real deadline count as late too (minutes_late None).
+    """
+    late = []
+    for package_id in hashtable.keys():
+        package = hashtable.get(package_id)
+        deadline = package.deadline
+        if deadline is None or not hasattr(deadline, 'hour') or deadline == datetime.max.time():
+            continue
+        if not package.delivery_time:
+            late.append((package_id, None))
+            continue
+        delivered = datetime.strptime(package.delivery_time, "%I:%M %p")
+        due = datetime.combine(delivered.date(), deadline)
+        if delivered > due:
+            late.append((package_id, (delivered - due).total_seconds() / 60))
+    return late
 
 
 def get_unassignable_packages(hashtable, current_time):
     """Returns packages that cannot be assigned to trucks yet due to delays."""
     unassignable_packages = []
     
-    for package_id in hashtable.keys():
+    # only the packages that have a delay at all, straight from the store's index
+    for package_id in hashtable.delayed_ids():
         package = hashtable.get(package_id)
         
         # If package is delayed and hasn't arrived yet, don't assign it
-        if hasattr(package, 'delayed_until') and package.delayed_until:
-            if package.delayed_until > current_time:
-                unassignable_packages.append(package_id)
+        if package.delayed_until > current_time:
+            unassignable_packages.append(package_id)
     
     return unassignable_packages
 
 
 def scan_for_available_delayed_packages(hashtable, current_time):
     """
-    Scan the entire hash table for ALL undelivered delayed packages that are now available
+    Find ALL undelivered delayed packages that are now available (via the store's delay index)
     """
     available_delayed_packages = []
     
     print(f"Scanning hash table for delayed packages available at {current_time.strftime('%I:%M %p')}...")
     
-    # Use the hashtable.keys() method to get all package IDs, then check each package
-    for package_id in hashtable.keys():
+    # the store indexes packages by delayed_until, so only the delayed ones get checked
+    for package_id in hashtable.delayed_ids():
         package = hashtable.get(package_id)
         if package:
             # Debug: Print package status for delayed packages
@@ -345,85 +527,73 @@ def load_distance_table(csv_file):
     distance_table.load(addresses, matrix)
     return distance_table
 
-def print_delivery_statuses(trucks, hashtable):
+def load_coordinate_table(csv_file, circuity=1.0):
+    """
+    Distance table for an area with no hand-built distance CSV: reads an
+    address, latitude, longitude file (header row names the columns) and
+    computes haversine miles x circuity between every pair.
+    """
+    addresses = []
+    lats = []
+    lons = []
+
+    with open(csv_file, newline='') as f:
+        rows = list(csv.reader(f))
+    header = [cell.strip().lower() for cell in rows[0]]
+
+    # first column whose header starts with any of the names
+    def find_col(*names):
+        for j, h in enumerate(header):
+            if h.startswith(names):
+                return j
+        raise ValueError(f"{csv_file}: no {names[0]} column in header {rows[0]}")
+
+    idx_address = find_col("address")
+    idx_lat = find_col("lat")
+    idx_lon = find_col("lon", "lng")
+
+    for row in rows[1:]:
+        if not any(cell.strip() for cell in row):
+            continue
+        addresses.append(row[idx_address].strip())
+        lats.append(float(row[idx_lat]))
+        lons.append(float(row[idx_lon]))
+
+    return DistanceTable.from_coordinates(addresses, lats, lons, circuity)
+
+
+def print_delivery_statuses(trucks, hashtable, snapshot_times=("08:50 AM", "09:50 AM", "12:30 PM")):
     """ prints final delivery statuses for all packages at the hard-coded snapshots."""
 
-    # predefined snapshot times for package status checks (keeps hard-coded approach)
-    snapshot_times = ["08:50 AM", "09:50 AM", "12:30 PM"]
+    # the whole packages x snapshots status grid is worked out in one pass up front
+    snap_datetimes = [datetime.strptime(snap, "%I:%M %p") for snap in snapshot_times]
+    package_ids, codes = status.status_matrix(trucks, hashtable, snap_datetimes)
 
     # iterate through each snapshot time
-    for snap in snapshot_times:
-
-        # convert snapshot time string into a time object for comparison
-        snap_time = datetime.strptime(snap, "%I:%M %p").time()
-        snap_datetime = datetime.strptime(snap, "%I:%M %p")
+    for col, snap in enumerate(snapshot_times):
 
         # print header for current snapshot
         print(f"\n--- Package Statuses at {snap} ---")
 
+        row = 0
+
         # iterate through each truck
         for truck in trucks:
 
             # print truck identifier
             print(f"\nTruck {truck.truck_id}:")
 
-            # iterate through each package id on the truck (assignment requires IDs)
-            for package_id in truck.packages:
-
-                # get the package object from the hashtable
+            # rows come out in the same truck / package order we print in
+            for package_id in truck.all_packages():
                 loaded_package = hashtable.get(package_id)
-
-                # FIXED: Check if package is delayed and snapshot is before delay time
-                if hasattr(loaded_package, 'delayed_until') and loaded_package.delayed_until:
-                    if snap_datetime < loaded_package.delayed_until:
-                        # Show appropriate delayed status instead of "At Hub"
-                        if package_id in [6, 25, 28, 32]:
-                            status = "Delayed - En Route to Hub"  # These are on a plane
-                        elif package_id == 9:
-                            status = "At Hub - Awaiting Address Correction"  # Different delay reason
-                        else:
-                            status = "DELAYED"
-                        pkg_id_display = getattr(loaded_package, "id", getattr(loaded_package, "package_id", package_id))
-                        print(f"Package {pkg_id_display}: {status}")
-                        continue
-
-                # convert load_time string to a time if it exists, else max time
-                if getattr(loaded_package, "load_time", None):
-                    try:
-                        load_time = datetime.strptime(loaded_package.load_time, "%I:%M %p").time()
-                    except Exception:
-                        # if it's already a datetime, pull the time portion
-                        load_time = loaded_package.load_time.time() if hasattr(loaded_package.load_time, "time") else datetime.max.time()
-                else:
-                    # FIXED: Use truck start time as load time if no specific load_time
-                    if truck.start_time and hasattr(truck.start_time, 'time'):
-                        load_time = truck.start_time.time()
-                    else:
-                        load_time = datetime.max.time()
-
-                # convert delivery_time string to a time if it exists, else max time
-                if getattr(loaded_package, "delivery_time", None):
-                    try:
-                        delivery_time = datetime.strptime(loaded_package.delivery_time, "%I:%M %p").time()
-                    except Exception:
-                        delivery_time = loaded_package.delivery_time.time() if hasattr(loaded_package.delivery_time, "time") else datetime.max.time()
-                else:
-                    delivery_time = datetime.max.time()
-
-                # determine package status based on snapshot time
-                if snap_time < load_time:
-                    status = "At Hub"
-                elif load_time <= snap_time < delivery_time:
-                    status = "En Route"
-                else:
-                    # show original formatted string if available
-                    status = f"Delivered at {getattr(loaded_package, 'delivery_time', 'N/A')}"
+                label = status.status_label(codes[row, col], loaded_package)
+                row += 1
 
                 # defensive id lookup (works whether Package uses .id or .package_id)
                 pkg_id_display = getattr(loaded_package, "id", getattr(loaded_package, "package_id", package_id))
 
                 # print package ID and current status
-                print(f"Package {pkg_id_display}: {status}")
+                print(f"Package {pkg_id_display}: {label}")
 
     # calculate total mileage across all trucks
     total_mileage = sum(truck.mileage for truck in trucks)
@@ -469,12 +639,7 @@ def delivery_interface(trucks, hashtable):
                 print(f"\nTruck {truck.truck_id}:")
                 
                 # get unique packages assigned to this truck
-                truck_packages = set()  # Use set to avoid duplicates
-                
-                for package_id in hashtable.keys():
-                    package = hashtable.get(package_id)
-                    if hasattr(package, 'truck_id') and package.truck_id == truck.truck_id:
-                        truck_packages.add(package_id)
+                truck_packages = hashtable.ids_on_truck(truck.truck_id)
                 
                 # processes each package once
                 for package_id in sorted(truck_packages):
@@ -547,13 +712,14 @@ def delivery_interface(trucks, hashtable):
                     
                     # FIXED: Handle Package 9 address change
                     display_address = package.address
-                    if package_id == 9:
-                        # Package 9 address changes at 10:20 AM
-                        address_change_time = datetime.strptime("10:20 AM", "%I:%M %p").time()
-                        if snap_time < address_change_time:
-                            display_address = "300 State St, Salt Lake City, UT 84103"
-                        else:
-                            display_address = "410 S State St, Salt Lake City, UT 84111"
+                    if getattr(package, 'address_changed_at', None):
+                        # live dispatch recorded the change, show whichever address was current
+                        if snap_datetime < package.address_changed_at:
+                            display_address = package.previous_address
+                    elif getattr(package, 'address_correction_time', None):
+                        # a wrong-address note with a known fix, the listed address stands until then
+                        if snap_datetime >= package.address_correction_time:
+                            display_address = package.correct_address
                     
                     pkg_id = getattr(package, 'id', getattr(package, 'package_id', package_id))
                     print(f"Package {pkg_id} | {display_address} | {status} | {package.deadline} | Truck {truck.truck_id}")
@@ -570,12 +736,13 @@ def delivery_interface(trucks, hashtable):
                 print(f"No package found with ID {package_id}.")
                 continue
             
-            # Handle Package 9 address display in single package view
+            # wrong-address packages show both addresses and when the fix came in
             display_address = package.address
-            if package_id == 9:
-                print("Package 9 address updated at 10:20 AM")
-                print("Before 10:20 AM: 300 State St, Salt Lake City, UT 84103")
-                print("After 10:20 AM: 410 S State St, Salt Lake City, UT 84111")
+            if getattr(package, 'address_correction_time', None):
+                fixed_at = package.address_correction_time.strftime('%I:%M %p')
+                print(f"Package {package_id} address updated at {fixed_at}")
+                print(f"Before {fixed_at}: {package.address}, {package.city}, UT {package.zip_code}")
+                print(f"After {fixed_at}: {package.correct_address}")
             
             print(f"\nPackage {getattr(package, 'id', getattr(package, 'package_id', package_id))} info:")
             print(f"Address: {display_address}, City: {package.city}, Zip: {package.zip_code}")
@@ -612,7 +779,8 @@ def debug_mileage(trucks, hashtable, distance_table):
     for truck in trucks:
         print(f"\nTruck {truck.truck_id}:")
         print(f"  Reported mileage: {truck.mileage:.2f}")
-        print(f"  Number of packages: {len(truck.packages)}")
+        print(f"  Number of packages: {len(truck.all_packages())}")
+        print(f"  Trips: {len(truck.trip_history) + (1 if truck.packages else 0)}")
         print(f"  Start location: {truck.current_location}")
         
         # Check if truck has a route history or delivery order
@@ -620,34 +788,19 @@ def debug_mileage(trucks, hashtable, distance_table):
             route = getattr(truck, 'route', getattr(truck, 'delivery_order', []))
             print(f"  Route taken: {route}")
         
-        # Manual distance calculation check
-        hub_address = "Western Governors University 4001 South 700 East"
-        current_location = hub_address
+        # Manual distance calculation check: replay the legs the truck actually drove
+        # and look every one of them up again in the distance table
         manual_distance = 0
         
-        print(f"  Package delivery addresses:")
-        for package_id in truck.packages:
-            package = hashtable.get(package_id)
-            if package:
-                address = package.address
-                print(f"    Package {package_id}: {address}")
-                
-                # Get distance from current location to this package
-                try:
-                    distance = distance_table.get_distance(current_location, address)
-                    manual_distance += distance
-                    print(f"      Distance from {current_location[:20]}... to {address[:20]}...: {distance}")
-                    current_location = address
-                except Exception as e:
-                    print(f"      ERROR getting distance: {e}")
-        
-        # Add return to hub distance
-        try:
-            return_distance = distance_table.get_distance(current_location, hub_address)
-            manual_distance += return_distance
-            print(f"    Return to hub: {return_distance}")
-        except Exception as e:
-            print(f"    ERROR getting return distance: {e}")
+        print(f"  Legs driven: {len(truck.leg_log)}")
+        for start, end, logged, depart, arrive, package_ids in truck.leg_log.legs():
+            try:
+                distance = distance_table.get_distance(start, end)
+                manual_distance += distance
+                print(f"    {depart.strftime('%I:%M %p')}-{arrive.strftime('%I:%M %p')} {start[:20]}... to {end[:20]}...: "
+                      f"logged {logged}, table {distance}, packages {package_ids}")
+            except Exception as e:
+                print(f"      ERROR getting distance: {e}")
         
         print(f"  Manual calculation: {manual_distance:.2f}")
         print(f"  Difference: {abs(truck.mileage - manual_distance):.2f}")
@@ -660,8 +813,8 @@ def debug_mileage(trucks, hashtable, distance_table):
     print(f"\n=== DISTANCE TABLE DEBUG ===")
     print(f"Number of addresses in distance table: {len(distance_table.addresses) if hasattr(distance_table, 'addresses') else 'Unknown'}")
     
-    # Test a few known distances
-    hub = "Western Governors University 4001 South 700 East"
+    # Test a few known distances from the first truck's hub
+    hub = trucks[0].hub_location if trucks else WGU_HUB_ADDRESS
     test_addresses = []
     
     # Get first few package addresses for testing
@@ -695,23 +848,105 @@ if __name__ == "__main__":
     # quick starting message so we can see the script ran
     # print("scripting running")
 
-    # parse the "packages" data from the xlsx into the hash table
-    hashtable = load_packages("WGUPS_Package_File.csv")
-
-    # use excel data to create the distance table map matrix
-    distance_table = load_distance_table("WGUPS_Distance_Table.csv")
-
+    # optional flags:
+    #   --snapshot PATH       skip the simulation and load a saved run instead
+    #   --save-snapshot PATH  save this run so later sessions can start from it
+    args = sys.argv[1:]
+    load_path = args[args.index("--snapshot") + 1] if "--snapshot" in args else None
+    save_path = args[args.index("--save-snapshot") + 1] if "--save-snapshot" in args else None
+
+    #   --export-legs PATH    write every leg driven to PATH (.csv, otherwise JSON Lines)
+    legs_path = args[args.index("--export-legs") + 1] if "--export-legs" in args else None
+
+    #   --engine CONFIG       routing strategy, e.g. "regret" or "1=exact,3=local,default=greedy"
+    #                         (local-time / local-cost minimize hours or the cost model's weights instead of miles)
+    engine = strategies.parse_config(args[args.index("--engine") + 1]) if "--engine" in args else "greedy"
+
+    #   --route-cache PATH    reuse route plans from earlier runs (and save this run's)
+    cache_path = args[args.index("--route-cache") + 1] if "--route-cache" in args else None
+    route_cache = RouteCache(cache_path) if cache_path else None
+
+    #   --anneal SECONDS      re-plan the loads and routes with parallel simulated annealing
+    anneal_budget = float(args[args.index("--anneal") + 1]) if "--anneal" in args else None
+
+    #   --max-weight KG       weight limit per truck
+    #   --pack                load trucks with the weight-aware bin packer instead of the WGUPS assignment
+    max_weight = float(args[args.index("--max-weight") + 1]) if "--max-weight" in args else None
+    pack = "--pack" in args
+
+    #   --live                drive the day with the live dispatcher (mid-day events from the package notes)
+    #   --breakdown T@HH:MM   also break truck T down at HH:MM (implies --live, can repeat)
+    live = "--live" in args or "--breakdown" in args
+    breakdowns = []
+    for i, arg in enumerate(args):
+        if arg == "--breakdown":
+            truck_id, at = args[i + 1].split("@")
+            breakdowns.append(dispatch.TruckBreakdown(datetime.strptime(at, "%H:%M"), int(truck_id)))
+
+    if load_path:
+        trucks, hashtable = snapshot.load_snapshot(load_path)
+        print(f"Loaded saved run from {load_path}")
+    else:
+        # parse the "packages" data from the xlsx into the hash table
+        hashtable = load_packages("WGUPS_Package_File.csv")
+        events = live_events(hashtable) + breakdowns if live else None
+
+        # use excel data to create the distance table map matrix
+        #   --coordinates PATH   build it from an address,lat,lon file instead (--circuity FACTOR, default 1.3)
+        if "--coordinates" in args:
+            circuity = float(args[args.index("--circuity") + 1]) if "--circuity" in args else 1.3
+            distance_table = load_coordinate_table(args[args.index("--coordinates") + 1], circuity)
+        else:
+            distance_table = load_distance_table("WGUPS_Distance_Table.csv")
+
+
+        # optional cost model, every truck shares it:
+        #   --speed-profile "HH:MM=F,..."   time-of-day speed factors, e.g. "07:30=0.7,09:00=1.0" (1.0 before the first)
+        #   --service-minutes N             time spent handing packages over at every stop
+        #   --cost-per-mile X               weights for --engine local-cost (default 1.0 / 0.0)
+        #   --cost-per-hour Y
+        cost_model = None
+        cost_flags = ("--speed-profile", "--service-minutes", "--cost-per-mile", "--cost-per-hour")
+        if any(flag in args for flag in cost_flags):
+            profile = None
+            if "--speed-profile" in args:
+                profile = [tuple(part.split("=")) for part in args[args.index("--speed-profile") + 1].split(",")]
+                profile = [(start.strip(), float(factor)) for start, factor in profile]
+                if not any(start == "00:00" for start, _ in profile):
+                    profile.append(("00:00", 1.0))
+            cost_model = CostModel(
+                distance_table, profile,
+                service_minutes=float(args[args.index("--service-minutes") + 1]) if "--service-minutes" in args else 0.0,
+                cost_per_mile=float(args[args.index("--cost-per-mile") + 1]) if "--cost-per-mile" in args else 1.0,
+                cost_per_hour=float(args[args.index("--cost-per-hour") + 1]) if "--cost-per-hour" in args else 0.0)
+
+        # create our trucks
+        trucks = initialize_trucks(max_weight=max_weight, cost_model=cost_model)
+
+        # literally runs the entire truck delivery service (with proper delayed package handling)
+        # a plan that fails check_plan (e.g. --pack with more than the trucks can take) stops here
+        try:
+            run_all_deliveries(trucks, hashtable, distance_table, engine=engine, events=events,
+                               route_cache=route_cache, anneal_budget=anneal_budget, pack=pack)
+        except ValueError as e:
+            print(f"\n{e}")
+            sys.exit(1)
+        if route_cache:
+            route_cache.save()
 
-    # create our trucks
-    trucks = initialize_trucks()
+        debug_mileage(trucks, hashtable, distance_table)
 
-    # literally runs the entire truck delivery service (with proper delayed package handling)
-    run_all_deliveries(trucks, hashtable, distance_table)
+        if save_path:
+            size = snapshot.save_snapshot(save_path, trucks, hashtable)
+            print(f"Saved run to {save_path} ({size} bytes)")
 
-    debug_mileage(trucks, hashtable, distance_table)
+        if legs_path:
+            export = LegLog.export_csv if legs_path.endswith(".csv") else LegLog.export_jsonl
+            count = export(trucks, legs_path)
+            print(f"Exported {count} legs to {legs_path}")
 
     # start command-line interface for any adhoc checks
     delivery_interface(trucks, hashtable)
 
     # prints required snapshots and total mileage
-    print_delivery_statuses(trucks, hashtable)
\ No newline at end of file
+    print_delivery_statuses(trucks, hashtable)
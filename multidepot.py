@@ -0,0 +1,164 @@
+# multidepot.py - split the day across several depots and route each one on its own
+#
+# run with: python multidepot.py [engine]   (demo: WGU hub + a West Valley depot)
+
+import contextlib
+import io
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import main
+import routing
+import strategies
+from Depot import Depot, WGU_HUB_ADDRESS
+from PackageStore import PackageStore
+from Truck import Truck
+from constraints import group_for
+from insertion import leg_miles
+from DistanceTable import intern_locations, package_location
+
+# ---------------------------------------------------
+#  Depot Assignment
+# ---------------------------------------------------
+#
+# Every package goes to the closest depot that could actually send it out: a
+# truck-restricted package needs its truck based there, and a deliver-together
+# group is placed as one unit at the depot with the fewest total miles to it.
+
+
+def _feasible(depot, packages):
+    """True if some truck at this depot is allowed to carry every one of the packages."""
+    if not depot.trucks:
+        return False
+    truck_ids = depot.truck_ids()
+    for package in packages:
+        restriction = getattr(package, 'truck_restriction', None)
+        if restriction is not None and restriction not in truck_ids:
+            return False
+    return True
+
+
+def assign_to_depots(depots, hashtable, distance_table, package_ids=None):
+    """
+    Returns ({depot_id: [package_ids]}, unassigned) where each package went to
+    its nearest feasible depot by the distance table.
+    """
+    if package_ids is None:
+        package_ids = [pid for pid in hashtable.keys() if hashtable.get(pid).delivery_time is None]
+    pending = set(package_ids)
+
+    depot_index = {depot.depot_id: distance_table.find_index(depot.address) for depot in depots}
+    for depot in depots:
+        # every distance would silently fall back to the 2.0 default
+        if depot_index[depot.depot_id] is None:
+            raise ValueError(f"Depot {depot.depot_id} address is not in the distance table: {depot.address}")
+    assignment = {depot.depot_id: [] for depot in depots}
+    unassigned = []
+    placed = set()
+
+    for package_id in sorted(pending):
+        if package_id in placed:
+            continue
+        unit = [pid for pid in group_for(hashtable.get(package_id)) if pid in pending]
+        packages = [hashtable.get(pid) for pid in unit]
+        indexes = [package_location(package, distance_table) for package in packages]
+
+        best = None
+        for depot in depots:
+            if not _feasible(depot, packages):
+                continue
+            miles = sum(leg_miles(distance_table, depot_index[depot.depot_id], index) for index in indexes)
+            if best is None or miles < best[0]:
+                best = (miles, depot.depot_id)
+
+        if best is None:
+            unassigned.extend(unit)
+        else:
+            assignment[best[1]].extend(unit)
+        placed.update(unit)
+
+    return assignment, unassigned
+
+
+# ---------------------------------------------------
+#  Per-Depot Planning
+# ---------------------------------------------------
+
+def _plan_depot(job):
+    """
+    Worker: run one depot's multi-trip day on its own copy of its trucks and
+    packages. Returns (depot_id, trucks, packages, leftover, printed output).
+    """
+    depot_id, trucks, packages, distance_table, engine, drivers = job
+
+    hashtable = PackageStore()
+    for package in packages:
+        hashtable.insert(package.id, package)
+
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        leftover = routing.run_multi_trip(trucks, hashtable, distance_table, drivers=drivers,
+                                          deliver=strategies.TruckRouter(engine))
+    return depot_id, trucks, packages, leftover, output.getvalue()
+
+
+def run_depots(depots, hashtable, distance_table, engine="greedy", drivers=None, workers=None):
+    """
+    Assign packages to depots, then plan every depot in its own process.
+    The finished trucks and packages are copied back into `depots` and
+    `hashtable`. drivers is per depot (default: one per truck).
+    Returns the package IDs nobody delivered.
+    """
+    intern_locations(hashtable, distance_table)
+    assignment, leftover = assign_to_depots(depots, hashtable, distance_table)
+
+    jobs = []
+    for depot in depots:
+        packages = [hashtable.get(pid) for pid in assignment[depot.depot_id]]
+        print(f"{depot}: {len(packages)} packages")
+        jobs.append((depot.depot_id, depot.trucks, packages, distance_table, engine,
+                     drivers or len(depot.trucks)))
+
+    # depots share nothing (own trucks, own packages), so they can be planned side by side
+    workers = workers or min(len(jobs), os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(_plan_depot, jobs))
+
+    by_id = {depot.depot_id: depot for depot in depots}
+    for depot_id, trucks, packages, depot_leftover, output in results:
+        print(f"\n=== {by_id[depot_id].name} ===")
+        print(output, end="")
+        by_id[depot_id].trucks = trucks
+        for package in packages:
+            hashtable.insert(package.id, package)
+        leftover.extend(depot_leftover)
+
+    return leftover
+
+
+if __name__ == "__main__":
+    engine = sys.argv[1] if len(sys.argv) > 1 else "greedy"
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        hashtable = main.load_packages("WGUPS_Package_File.csv")
+        distance_table = main.load_distance_table("WGUPS_Distance_Table.csv")
+
+    # the WGU hub keeps trucks 1 and 2 (truck 2 has to be here for its restricted packages),
+    # a second depot out west gets truck 3
+    hub = Depot("SLC", WGU_HUB_ADDRESS, "WGU Hub")
+    west = Depot("WV", "5100 South 2700 West", "West Valley")
+    for truck_id, depot, start in [(1, hub, "08:00"), (2, hub, "09:05"), (3, west, "08:00")]:
+        Truck(truck_id, start_time=datetime.strptime(start, "%H:%M"), depot=depot)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        leftover = run_depots([hub, west], hashtable, distance_table, engine=engine)
+        late = main.late_packages(hashtable)
+
+    for depot in (hub, west):
+        miles = sum(truck.mileage for truck in depot.trucks)
+        packages = sum(len(truck.all_packages()) for truck in depot.trucks)
+        print(f"{depot.name:<12} {len(depot.trucks)} trucks {packages:>3} packages {miles:>7.2f} miles")
+    print(f"total {sum(t.mileage for d in (hub, west) for t in d.trucks):.2f} miles, "
+          f"{len(late)} late, {len(leftover)} not delivered")
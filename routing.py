@@ -1,12 +1,11 @@
 # routing.py - FIXED VERSION
 
-import Package
 from Package import PackageStatus
-from datetime import timedelta, datetime
-from Truck import Truck
-from HashTable import HashTable
-from DistanceTable import get_distance
-import csv
+from datetime import datetime
+from DistanceTable import package_location, truck_location
+import heapq
+from Stop import Stop
+from constraints import group_for, available_time, delivery_address
 
 # ---------------------------------------------------
 #  Core Routing Algorithm (Deadline-First Greedy + Nearest Neighbor)
@@ -16,44 +15,33 @@ def select_deadline_package(truck, hashtable, distance_table):
     """
     Check truck's remaining packages for any urgent deadlines.
     Handles grouped packages that must be delivered together.
-    Prioritizes: 9:00 AM -> 10:30 AM -> EOD
+    Prioritizes: 9:00 AM -> 10:30 AM, nearest first within a deadline.
+    Returns None when nothing left has a deadline (EOD goes to nearest neighbor).
     """
     
-    def deadline_to_time(deadline_str):
-        """Convert deadline string to comparable time value"""
-        if deadline_str == "EOD":
-            return 999  # EOD has lowest priority
+    def deadline_to_time(deadline):
+        """Convert a deadline (time from load_packages, or an "HH:MM AM" string) to comparable hours"""
+        if hasattr(deadline, 'hour'):
+            if deadline == datetime.max.time():
+                return 999  # EOD has lowest priority
+            return deadline.hour + (deadline.minute / 60.0)
+        if deadline == "EOD":
+            return 999
         try:
-            time_obj = datetime.strptime(deadline_str, "%I:%M %p")
+            time_obj = datetime.strptime(deadline, "%I:%M %p")
             return time_obj.hour + (time_obj.minute / 60.0)
-        except:
+        except (TypeError, ValueError):
             return 999
     
-    def get_package_groups():
-        """Define which packages must be delivered together"""
-        return [
-            [13, 14, 15, 16, 19, 20]  # All must be delivered together
-        ]
-    
-    def find_group_for_package(package_id):
-        """Find which group a package belongs to"""
-        groups = get_package_groups()
-        for group in groups:
-            if package_id in group:
-                return group
-        return [package_id]  # Single package group
-    
     def get_eligible_packages():
         """Get all packages that can be delivered now"""
         eligible = []
         for package_id in truck.packages:
             package = hashtable.get(package_id)
             
-            if package.status == PackageStatus.DELIVERED:
-                continue
-            if package.status == PackageStatus.DELAYED:
-                continue
-            if hasattr(package, 'delayed_until') and package.delayed_until and truck.current_time < package.delayed_until:
+            # delivered or still waiting on its delay (DELAYED status alone doesn't mean
+            # it's still delayed, nothing flips it back once the flight is in)
+            if not _is_ready(package, truck):
                 continue
                 
             eligible.append(package_id)
@@ -63,17 +51,16 @@ def select_deadline_package(truck, hashtable, distance_table):
     if not eligible_packages:
         return None
     
-    # Find the package with earliest deadline (considering groups)
+    # Find the package with earliest deadline (considering groups), EOD never counts as one
     best_package = None
-    best_deadline_time = float('inf')
+    best_deadline_time = 999
     best_distance = float('inf')
     
     for package_id in eligible_packages:
         package = hashtable.get(package_id)
-        deadline_time = deadline_to_time(package.deadline)
         
         # For grouped packages, use the earliest deadline in the group
-        group = find_group_for_package(package_id)
+        group = group_for(package)
         group_earliest_deadline = float('inf')
         
         for group_pkg_id in group:
@@ -81,8 +68,11 @@ def select_deadline_package(truck, hashtable, distance_table):
                 group_pkg = hashtable.get(group_pkg_id)
                 group_deadline_time = deadline_to_time(group_pkg.deadline)
                 group_earliest_deadline = min(group_earliest_deadline, group_deadline_time)
-        
-        distance = get_distance(truck.current_location, package.address, distance_table)
+
+        # only measure the distance for packages that could still win
+        if group_earliest_deadline > best_deadline_time or group_earliest_deadline >= 999:
+            continue
+        distance = distance_table.miles(truck_location(truck, distance_table), package_location(package, distance_table))
         
         # Select based on earliest group deadline, then distance
         if (group_earliest_deadline < best_deadline_time or 
@@ -93,12 +83,136 @@ def select_deadline_package(truck, hashtable, distance_table):
     
     return best_package
 
-def select_nearest_neighbor(truck, hashtable, distance_table):
+class NeighborIndex:
+    """
+    Pending packages bucketed by address index, walked using the distance
+    table's precomputed neighbor lists. Each stop keeps a lazy cursor that
+    only moves past addresses with nothing left to deliver, so a nearest
+    neighbor step is amortized O(k) instead of measuring every package.
+    """
+
+    def __init__(self, truck, hashtable, distance_table):
+        self.distance_table = distance_table
+        self.hashtable = hashtable
+
+        # address index -> package ids still waiting to be delivered there
+        self.pending = {}
+
+        # packages whose address never resolved (they use the 2.0 default)
+        self.unmatched = []
+
+        # address index -> position in that address's neighbor list
+        self.cursors = {}
+
+        for package_id in truck.packages:
+            package = hashtable.get(package_id)
+            if package.status == PackageStatus.DELIVERED:
+                continue
+            self.add(package_id)
+
+    def add(self, package_id):
+        package = self.hashtable.get(package_id)
+        index = package_location(package, self.distance_table)
+        if index is None:
+            self.unmatched.append(package_id)
+        else:
+            self.pending.setdefault(index, []).append(package_id)
+
+    def remove(self, package_id):
+        package = self.hashtable.get(package_id)
+        index = package_location(package, self.distance_table)
+        bucket = self.unmatched if index is None else self.pending.get(index, [])
+        if package_id in bucket:
+            bucket.remove(package_id)
+
+    def nearest(self, truck):
+        """Closest ready package from the truck's current location, or None."""
+        current = truck_location(truck, self.distance_table)
+        if current is None:
+            return None
+
+        neighbors = self.distance_table.nearest_neighbors(current)
+
+        # skip stops that are already emptied out, they never come back
+        pos = self.cursors.get(current, 0)
+        while pos < len(neighbors) and not self.pending.get(neighbors[pos]):
+            pos += 1
+        self.cursors[current] = pos
+
+        best_package = None
+        best_distance = float('inf')
+        for index in neighbors[pos:]:
+            ready = [pid for pid in self.pending.get(index, []) if _is_ready(self.hashtable.get(pid), truck)]
+            if ready:
+                best_package = ready[0]
+                best_distance = self.distance_table.distance_by_index(current, index)
+                break
+
+        # a top-k list can run out before reaching a ready package, so scan whatever's left
+        if best_package is None and self.distance_table.neighbor_k is not None:
+            for index, bucket in self.pending.items():
+                for pid in bucket:
+                    if not _is_ready(self.hashtable.get(pid), truck):
+                        continue
+                    distance = self.distance_table.distance_by_index(current, index)
+                    if distance is not None and distance < best_distance:
+                        best_distance = distance
+                        best_package = pid
+
+        # unresolved addresses are treated as 2.0 miles away like get_distance does
+        for pid in self.unmatched:
+            if _is_ready(self.hashtable.get(pid), truck) and 2.0 < best_distance:
+                best_distance = 2.0
+                best_package = pid
+                break
+
+        return best_package
+
+
+def _is_ready(package, truck):
+    """True if the package is undelivered and not still waiting on a delay or an address fix."""
+    if package.status == PackageStatus.DELIVERED:
+        return False
+    ready_at = available_time(package)
+    return ready_at is None or truck.current_time >= ready_at
+
+
+def _can_detour(truck, package_id, hashtable, distance_table):
+    """
+    True if the truck can deliver package_id next and still drive straight on to
+    every ready deadline package on board in time for its deadline.
+    """
+    here = truck_location(truck, distance_table)
+    via = package_location(hashtable.get(package_id), distance_table)
+    miles = distance_table.miles(here, via)
+    leave = truck.current_time + truck.travel_time(miles, here, via) + truck.service_time()
+
+    for pid in truck.packages:
+        package = hashtable.get(pid)
+        deadline = package.deadline
+        if pid == package_id or not hasattr(deadline, 'hour') or deadline == datetime.max.time():
+            continue
+        if not _is_ready(package, truck):
+            continue
+        there = package_location(package, distance_table)
+        arrive = leave + truck.travel_time(distance_table.miles(via, there), via, there, leave)
+        if arrive > datetime.combine(truck.current_time.date(), deadline):
+            return False
+    return True
+
+
+def select_nearest_neighbor(truck, hashtable, distance_table, neighbor_index=None):
     """
     If no urgent deadline package exists,
     find the package whose address is closest to truck's current location.
     Return that package.
     """
+    # fast path: walk the precomputed neighbor lists
+    if neighbor_index is not None:
+        package_id = neighbor_index.nearest(truck)
+        if package_id is not None:
+            return package_id
+
     nearest_package = None
     shortest_distance = float('inf')
 
@@ -110,12 +224,13 @@ def select_nearest_neighbor(truck, hashtable, distance_table):
         if package.status == PackageStatus.DELIVERED:
             continue
 
-        # FIXED: Safe check for delayed_until
-        if hasattr(package, 'delayed_until') and package.delayed_until and truck.current_time < package.delayed_until:
+        # still waiting on a delay or an address fix
+        if not _is_ready(package, truck):
             continue
 
         # the heart of the greedy algorithm- pick the closest package
-        distance_to_package = get_distance(truck.current_location, package.address, distance_table)
+        distance_to_package = distance_table.miles(truck_location(truck, distance_table),
+                                                   package_location(package, distance_table))
 
         # if there's a new shorter distance, reset location direction to this
         if distance_to_package < shortest_distance:
@@ -128,113 +243,252 @@ def select_nearest_neighbor(truck, hashtable, distance_table):
     else:
         for package_id in truck.packages:
             package = hashtable.get(package_id)
-            if package.status != PackageStatus.DELIVERED:
-                # FIXED: Safe check for delayed_until
-                if hasattr(package, 'delayed_until') and package.delayed_until:
-                    if truck.current_time >= package.delayed_until:
-                        return package.package_id
-                else:
-                    return package.package_id
+            if _is_ready(package, truck):
+                return package.package_id
         return None
 
-def deliver_package_group(truck, package_id, hashtable, distance_table):
+def build_stops(truck, hashtable, distance_table):
+    """
+    Collapse the truck's packages into Stop objects keyed by resolved address
+    index, so packages sharing an address become a single stop. Addresses that
+    never resolve are keyed by their raw string instead.
+    """
+    stops = {}
+    for package_id in truck.packages:
+        package = hashtable.get(package_id)
+        index = package_location(package, distance_table)
+        address = delivery_address(package)
+        key = index if index is not None else address
+        if key not in stops:
+            stops[key] = Stop(index, address)
+        stops[key].add_package(package_id)
+    return stops
+
+
+def stop_for_package(stops, package_id):
+    """Find the stop a package belongs to."""
+    for stop in stops.values():
+        if package_id in stop.package_ids:
+            return stop
+    return None
+
+
+def deliver_stop(truck, stop, hashtable, distance_table, note=""):
+    """
+    Drive to a stop once and hand off every ready package there in one event.
+    Returns the package IDs that were delivered.
+    """
+    ready = stop.ready_ids(hashtable, truck.current_time)
+    if not ready:
+        return []
+
+    # one distance lookup per stop, no per-package minimum hop
+    here = truck_location(truck, distance_table)
+    distance = distance_table.miles(here, stop.location_index)
+    time_taken = truck.travel_time(distance, here, stop.location_index)
+    truck.update_location(stop.address, distance, time_taken, stop.location_index)
+
+    for pid in ready:
+        truck.deliver_package(pid, hashtable)
+        print(f"Truck {truck.truck_id} delivered package {pid} at {truck.current_time.strftime('%I:%M %p')}{note}")
+
+    # handing the packages over takes time too (zero without a cost model)
+    truck.current_time += truck.service_time()
+
+    return ready
+
+
+def deliver_package_group(truck, package_id, hashtable, distance_table, stops=None):
     """
     Deliver a package and any grouped packages that must be delivered together
     """
-    def get_package_groups():
-        return [[13, 14, 15, 16, 19, 20]]
-    
-    def find_group_for_package(pkg_id):
-        groups = get_package_groups()
-        for group in groups:
-            if pkg_id in group:
-                return group
-        return [pkg_id]
-    
-    group = find_group_for_package(package_id)
+    if stops is None:
+        stops = build_stops(truck, hashtable, distance_table)
+
+    group = group_for(hashtable.get(package_id))
     
-    # Filter to only packages that are on this truck and not delivered
-    deliverable_group = []
+    # Collect the stops holding group members that are on this truck and ready
+    group_stops = []
     for group_pkg_id in group:
         if group_pkg_id in truck.packages:
-            package = hashtable.get(group_pkg_id)
-            if package.status != PackageStatus.DELIVERED:
-                # Check if delayed packages are ready
-                if hasattr(package, 'delayed_until') and package.delayed_until:
-                    if truck.current_time >= package.delayed_until:
-                        deliverable_group.append(group_pkg_id)
-                else:
-                    deliverable_group.append(group_pkg_id)
-    
-    if not deliverable_group:
-        return
+            stop = stop_for_package(stops, group_pkg_id)
+            if stop and group_pkg_id in stop.ready_ids(hashtable, truck.current_time) and stop not in group_stops:
+                group_stops.append(stop)
     
-    # Sort by distance to deliver efficiently within the group
-    deliverable_group.sort(key=lambda pid: get_distance(truck.current_location, 
-                                                       hashtable.get(pid).address, 
-                                                       distance_table))
-    
-    # Deliver all packages in the group
-    for group_pkg_id in deliverable_group:
-        package = hashtable.get(group_pkg_id)
-        
-        distance = get_distance(truck.current_location, package.address, distance_table)
-        if distance < 0.1:
-            distance = 0.1
-            
-        time_taken = timedelta(hours=distance / truck.speed)
-        truck.update_location(package.address, distance, time_taken)
-        truck.deliver_package(group_pkg_id, hashtable)
-        
-        print(f"Truck {truck.truck_id} delivered package {package.package_id} at {truck.current_time.strftime('%I:%M %p')} (group delivery)")
+    # visit the group's stops nearest-first from wherever the truck is now
+    delivered = []
+    while group_stops:
+        here = truck_location(truck, distance_table)
+        group_stops.sort(key=lambda st: distance_table.miles(here, st.location_index))
+        stop = group_stops.pop(0)
+        delivered.extend(deliver_stop(truck, stop, hashtable, distance_table, " (group delivery)"))
+
+    return delivered
 
 def run_delivery(truck, hashtable, distance_table):
     """
-    Modified delivery run that handles grouped packages
+    Modified delivery run that handles grouped packages.
+    Packages are collapsed into stops first so each address is visited once.
     """
-    undelivered_packages = [pid for pid in truck.packages 
-                           if hashtable.get(pid).status != PackageStatus.DELIVERED]
+    stops = build_stops(truck, hashtable, distance_table)
+
+    pending_stops = [stop for stop in stops.values() if not stop.is_done(hashtable)]
+
+    # bucket the truck's packages by address once so nearest neighbor is a list walk
+    neighbor_index = NeighborIndex(truck, hashtable, distance_table)
     
-    while len(undelivered_packages) > 0:
-        # Select next package considering deadlines and groups
-        package_id = select_deadline_package(truck, hashtable, distance_table)
+    while len(pending_stops) > 0:
+        # nearest neighbor (off the precomputed neighbor lists) unless a deadline is pressing:
+        # going to the nearest package first would leave some deadline package late
+        package_id = select_nearest_neighbor(truck, hashtable, distance_table, neighbor_index)
+        if package_id is not None and not _can_detour(truck, package_id, hashtable, distance_table):
+            package_id = select_deadline_package(truck, hashtable, distance_table)
         
         if package_id is None:
-            package_id = select_nearest_neighbor(truck, hashtable, distance_table)
+            package_id = select_deadline_package(truck, hashtable, distance_table)
         
         if package_id is None:
             break
         
         # Check if this package is part of a group that needs to be delivered together
-        def get_package_groups():
-            return [[13, 14, 15, 16, 19, 20]]
-        
-        def find_group_for_package(pkg_id):
-            groups = get_package_groups()
-            for group in groups:
-                if pkg_id in group:
-                    return group
-            return [pkg_id]
-        
-        group = find_group_for_package(package_id)
+        group = group_for(hashtable.get(package_id))
         
         if len(group) > 1:
             # Deliver the entire group
-            deliver_package_group(truck, package_id, hashtable, distance_table)
+            delivered = deliver_package_group(truck, package_id, hashtable, distance_table, stops)
         else:
-            # Deliver single package normally
-            package = hashtable.get(package_id)
-            distance = get_distance(truck.current_location, package.address, distance_table)
-            
-            if distance < 0.1:
-                distance = 0.1
-                
-            time_taken = timedelta(hours=distance / truck.speed)
-            truck.update_location(package.address, distance, time_taken)
-            truck.deliver_package(package_id, hashtable)
-            
-            print(f"Truck {truck.truck_id} delivered package {package.package_id} at {truck.current_time.strftime('%I:%M %p')}")
+            # Deliver everything ready at the chosen package's stop
+            delivered = deliver_stop(truck, stop_for_package(stops, package_id), hashtable, distance_table)
+
+        for delivered_id in delivered:
+            neighbor_index.remove(delivered_id)
         
-        # Update undelivered packages list
-        undelivered_packages = [pid for pid in truck.packages 
-                               if hashtable.get(pid).status != PackageStatus.DELIVERED]
\ No newline at end of file
+        # Update pending stops list
+        pending_stops = [stop for stop in pending_stops if not stop.is_done(hashtable)]
+
+
+# ---------------------------------------------------
+#  Multi-Trip Planning (return to hub + reload)
+# ---------------------------------------------------
+
+def return_to_hub(truck, distance_table):
+    """Drive the truck back to its hub, counting the miles and the time."""
+    hub = distance_table.find_index(truck.hub_location)
+    here = truck_location(truck, distance_table)
+    distance = distance_table.miles(here, hub)
+    time_taken = truck.travel_time(distance, here, hub)
+    truck.update_location(truck.hub_location, distance, time_taken, hub)
+    print(f"Truck {truck.truck_id} returned to hub at {truck.current_time.strftime('%I:%M %p')} ({distance} miles)")
+    return distance
+
+
+def _can_carry(truck, package, when):
+    """True if this truck is allowed to take the package out at `when`."""
+    restriction = getattr(package, 'truck_restriction', None)
+    if restriction is not None and restriction != truck.truck_id:
+        return False
+    ready_at = available_time(package)
+    return ready_at is None or when >= ready_at
+
+
+def select_trip_load(truck, pending_ids, hashtable, distance_table):
+    """
+    Pick up to truck.capacity package IDs for the truck's next trip out of the
+    hub. Earliest deadline goes first, ties broken by distance from the hub.
+    Grouped packages are only loaded together, and only once all of them are
+    available to this truck. Weight / volume limits count too.
+    """
+    when = truck.current_time
+    candidates = [pid for pid in pending_ids if _can_carry(truck, hashtable.get(pid), when)]
+    hub = distance_table.find_index(truck.hub_location)
+    candidates.sort(key=lambda pid: (hashtable.get(pid).deadline,
+                                     distance_table.miles(hub, package_location(hashtable.get(pid), distance_table))))
+
+    load = []
+    weight = volume = 0.0
+    for package_id in candidates:
+        if package_id in load:
+            continue
+
+        group = [pid for pid in group_for(hashtable.get(package_id)) if pid in pending_ids]
+
+        # hold the whole group back until every member can go on this truck
+        if any(pid not in candidates for pid in group):
+            continue
+
+        packages = [hashtable.get(pid) for pid in group]
+        group_weight = sum(p.weight for p in packages)
+        group_volume = sum(p.volume for p in packages)
+        if len(load) + len(group) > truck.capacity:
+            continue
+        if truck.max_weight is not None and weight + group_weight > truck.max_weight:
+            continue
+        if truck.max_volume is not None and volume + group_volume > truck.max_volume:
+            continue
+        load.extend(group)
+        weight += group_weight
+        volume += group_volume
+
+    return load
+
+
+def run_multi_trip(trucks, hashtable, distance_table, package_ids=None, drivers=None, deliver=None):
+    """
+    Deliver a pool of packages with trucks that come back to the hub and reload.
+    Only the first `drivers` trucks go out (a truck without a driver stays parked).
+    Whichever truck is back at the hub earliest loads next, so trips interleave
+    in time the way they would on the road.
+    deliver is the per-trip router (defaults to run_delivery).
+    Returns the package IDs that could not be delivered by any active truck.
+    """
+    if deliver is None:
+        deliver = run_delivery
+
+    active = trucks[:drivers] if drivers else list(trucks)
+
+    if package_ids is None:
+        package_ids = hashtable.keys()
+    pending = [pid for pid in package_ids
+               if hashtable.get(pid).status != PackageStatus.DELIVERED]
+
+    # (time back at hub, truck position) so the earliest free truck goes first
+    ready_queue = [(truck.current_time, i) for i, truck in enumerate(active)]
+    heapq.heapify(ready_queue)
+
+    while pending and ready_queue:
+        _, i = heapq.heappop(ready_queue)
+        truck = active[i]
+
+        load = select_trip_load(truck, pending, hashtable, distance_table)
+
+        if not load:
+            # nothing this truck can take right now, wait at the hub for the next arrival
+            upcoming = [available_time(hashtable.get(pid)) for pid in pending]
+            upcoming = [t for t in upcoming if t and t > truck.current_time]
+            if not upcoming:
+                # nothing left this truck can ever carry, park it
+                continue
+            truck.current_time = min(upcoming)
+            heapq.heappush(ready_queue, (truck.current_time, i))
+            continue
+
+        truck.start_new_trip()
+        print(f"\nTruck {truck.truck_id} departing hub at {truck.current_time.strftime('%I:%M %p')} with {len(load)} packages (trip {len(truck.trip_history) + 1})")
+        for package_id in load:
+            truck.load_package(package_id, hashtable)
+            hashtable.get(package_id).mark_en_route(truck.current_time)
+            pending.remove(package_id)
+
+        deliver(truck, hashtable, distance_table)
+
+        # anything the route couldn't drop off goes back in the pool
+        for package_id in truck.packages:
+            if hashtable.get(package_id).status != PackageStatus.DELIVERED and package_id not in pending:
+                pending.append(package_id)
+
+        # only head back if there's still work to reload for
+        if pending:
+            return_to_hub(truck, distance_table)
+            heapq.heappush(ready_queue, (truck.current_time, i))
+
+    return pending
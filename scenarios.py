@@ -0,0 +1,150 @@
+# scenarios.py - what-if fleet sweeps (truck count, start times, speed, capacity, engine)
+#
+# run with: python scenarios.py [results.csv]
+# every scenario is a dict of the parameters below, they get farmed out to a
+# process pool that loads the package + distance data once per worker
+
+import contextlib
+import copy
+import csv
+import io
+import itertools
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import main
+
+# what a scenario looks like if a key is left out
+DEFAULT_SCENARIO = {
+    "start_times": ("08:00", "09:30", "10:21"),
+    "speed": 18,
+    "capacity": 16,
+    "engine": "greedy",
+    "multi_trip": False,
+    "drivers": 2,
+}
+
+RESULT_COLUMNS = ["trucks", "start_times", "speed", "capacity", "engine", "multi_trip", "drivers",
+                  "miles", "delivered", "late", "on_time_rate", "runtime_ms", "error"]
+
+# read-only inputs, filled in once per worker process by _init_worker
+_BASE_PACKAGES = None
+_DISTANCE_TABLE = None
+
+
+def grid(**options):
+    """
+    Every combination of the given option lists as scenario dicts, e.g.
+    grid(speed=[18, 25], engine=["greedy", "regret"]) -> 4 scenarios.
+    """
+    keys = list(options)
+    return [dict(zip(keys, values)) for values in itertools.product(*(options[k] for k in keys))]
+
+
+def _init_worker(packages, distance_table):
+    global _BASE_PACKAGES, _DISTANCE_TABLE
+    _BASE_PACKAGES = packages
+    _DISTANCE_TABLE = distance_table
+
+
+def run_scenario(scenario):
+    """Simulate one scenario on a fresh copy of the packages, return a result row."""
+    params = dict(DEFAULT_SCENARIO)
+    params.update(scenario)
+
+    # packages get mutated by the simulation so each run needs its own, the distance table is shared
+    hashtable = copy.deepcopy(_BASE_PACKAGES)
+
+    # the fixed plan drives exactly three full truckloads, anything else has to be multi-trip
+    multi_trip = params["multi_trip"] or len(params["start_times"]) != 3 or params["capacity"] < 16
+
+    # one bad scenario shouldn't take the whole sweep down, it just gets an error column
+    error = ""
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        trucks = main.initialize_trucks(params["start_times"], params["speed"], params["capacity"])
+        try:
+            main.run_all_deliveries(trucks, hashtable, _DISTANCE_TABLE, multi_trip=multi_trip,
+                                    drivers=params["drivers"], engine=params["engine"])
+        except Exception as e:
+            error = str(e)
+    elapsed = (time.perf_counter() - started) * 1000
+
+    total = len(hashtable.keys())
+    delivered = sum(1 for pid in hashtable.keys() if hashtable.get(pid).delivery_time)
+    late = len(main.late_packages(hashtable))
+
+    # trucks that actually left the hub: multi-trip only sends out the first `drivers`
+    # of them, and start_times still shows the whole fleet
+    return {
+        "trucks": sum(1 for truck in trucks if len(truck.leg_log)),
+        "start_times": " ".join(params["start_times"]),
+        "speed": params["speed"],
+        "capacity": params["capacity"],
+        "engine": params["engine"],
+        "multi_trip": multi_trip,
+        "drivers": params["drivers"],
+        "miles": round(sum(truck.mileage for truck in trucks), 2),
+        "delivered": delivered,
+        "late": late,
+        "on_time_rate": round((delivered - late) / total, 3) if total else 1.0,
+        "runtime_ms": round(elapsed, 2),
+        "error": error,
+    }
+
+
+def run_sweep(scenarios, package_file="WGUPS_Package_File.csv", distance_file="WGUPS_Distance_Table.csv", workers=None):
+    """
+    Run every scenario across a process pool and return the result rows in input order.
+    The input files are parsed once here and handed to each worker when it starts.
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        packages = main.load_packages(package_file)
+        distance_table = main.load_distance_table(distance_file)
+
+    # build the neighbor lists once so workers don't each redo it
+    distance_table.build_neighbor_lists()
+
+    workers = workers or os.cpu_count()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(packages, distance_table)) as pool:
+        return list(pool.map(run_scenario, scenarios, chunksize=max(1, len(scenarios) // (workers * 4))))
+
+
+def write_results(rows, path):
+    """Save result rows as a CSV table."""
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=RESULT_COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def print_results(rows):
+    print(f"{'trucks':>6} {'drivers':>7} {'speed':>5} {'cap':>4} {'engine':<9} {'multi':<6} "
+          f"{'miles':>8} {'late':>5} {'on-time':>8} {'ms':>8}  start times")
+    for row in rows:
+        print(f"{row['trucks']:>6} {row['drivers']:>7} {row['speed']:>5} {row['capacity']:>4} {row['engine']:<9} "
+              f"{str(row['multi_trip']):<6} {row['miles']:>8.2f} {row['late']:>5} {row['on_time_rate']:>8.1%} "
+              f"{row['runtime_ms']:>8.2f}  {row['start_times']}  {row['error']}")
+
+
+if __name__ == "__main__":
+    # example fleet sizing sweep
+    scenarios = grid(
+        start_times=[("08:00", "08:00"), ("08:00", "09:05"), ("08:00", "09:30", "10:21"), ("08:00", "08:00", "09:05")],
+        drivers=[1, 2, 3],
+        speed=[18, 25],
+        capacity=[12, 16],
+        engine=list(main.ROUTING_ENGINES),
+    )
+
+    started = time.perf_counter()
+    rows = run_sweep(scenarios)
+    print_results(rows)
+    print(f"\n{len(rows)} scenarios in {time.perf_counter() - started:.2f} s")
+
+    if len(sys.argv) > 1:
+        write_results(rows, sys.argv[1])
+        print(f"results written to {sys.argv[1]}")
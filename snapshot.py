@@ -0,0 +1,187 @@
+# snapshot.py - save a finished simulation to disk and load it back without re-routing
+
+import json
+import struct
+import zlib
+from datetime import datetime, timedelta
+from Package import Package, PackageStatus
+from Truck import Truck
+from LegLog import LegLog
+from PackageStore import PackageStore
+
+# ---------------------------------------------------
+#  Snapshot File Format
+# ---------------------------------------------------
+#
+#   8 bytes   magic b"WGUPSNAP"
+#   2 bytes   format version (unsigned, big endian)
+#   4 bytes   length of the compressed body
+#   n bytes   zlib-compressed JSON body
+#
+# The body is columnar: one list per field ("package_id": [1, 2, ...]) instead
+# of one object per package, which compresses much better and loads straight
+# into the constructors. Times are stored as whole seconds from the start of the
+# simulation day, -1 means None and -2 means end of day (time.max).
+#
+# version 2 added package volumes, truck weight / volume limits, depots, and every
+# truck's leg log (LegLog.columns). version 1 files still load, without those.
+
+SNAPSHOT_MAGIC = b"WGUPSNAP"
+SNAPSHOT_VERSION = 2
+_HEADER = struct.Struct(">8sHI")
+
+_NONE = -1
+_EOD = -2
+
+# dynamic attributes that load_packages / routing / dispatch hang off Package objects
+_PACKAGE_DATETIME_ATTRS = ["delayed_until", "address_correction_time", "address_changed_at"]
+_PACKAGE_PLAIN_ATTRS = ["truck_id", "assigned_truck", "truck_restriction", "correct_address", "correct_city",
+                        "correct_zip", "previous_address", "delay_reason", "wrong_address"]
+
+
+def _encode_datetime(value, day):
+    if value is None:
+        return _NONE
+    return int((value - day).total_seconds())
+
+
+def _decode_datetime(value, day):
+    if value == _NONE:
+        return None
+    return day + timedelta(seconds=value)
+
+
+def _encode_time(value):
+    if value is None or not hasattr(value, 'hour'):
+        return _NONE
+    if value == datetime.max.time():
+        return _EOD
+    return value.hour * 3600 + value.minute * 60 + value.second
+
+
+def _decode_time(value):
+    if value == _NONE:
+        return None
+    if value == _EOD:
+        return datetime.max.time()
+    return (datetime.min + timedelta(seconds=value)).time()
+
+
+def save_snapshot(path, trucks, hashtable):
+    """Write packages, truck timelines, mileage and delivery order to `path`."""
+    # every simulated time lives on the same (strptime default) day
+    day = datetime.combine(trucks[0].start_time.date(), datetime.min.time())
+
+    package_ids = sorted(hashtable.keys())
+    packages = [hashtable.get(pid) for pid in package_ids]
+
+    body = {
+        "day": day.strftime("%Y-%m-%d"),
+        "packages": {
+            "package_id": package_ids,
+            "address": [p.address for p in packages],
+            "city": [p.city for p in packages],
+            "zip_code": [p.zip_code for p in packages],
+            "weight": [p.weight for p in packages],
+            "volume": [p.volume for p in packages],
+            "deadline": [_encode_time(p.deadline) for p in packages],
+            "notes": [p.notes for p in packages],
+            "status": [p.status.name for p in packages],
+            "load_time": [p.load_time for p in packages],
+            "delivery_time": [p.delivery_time for p in packages],
+            "group_ids": [sorted(p.group_ids) for p in packages],
+        },
+        "trucks": {
+            "truck_id": [t.truck_id for t in trucks],
+            "capacity": [t.capacity for t in trucks],
+            "max_weight": [t.max_weight for t in trucks],
+            "max_volume": [t.max_volume for t in trucks],
+            "speed": [t.speed for t in trucks],
+            "start_time": [_encode_datetime(t.start_time, day) for t in trucks],
+            "current_time": [_encode_datetime(t.current_time, day) for t in trucks],
+            "current_location": [t.current_location for t in trucks],
+            "hub_location": [t.hub_location for t in trucks],
+            "mileage": [t.mileage for t in trucks],
+            "packages": [t.packages for t in trucks],
+            "trip_history": [t.trip_history for t in trucks],
+            "delivery_order": [t.delivery_order for t in trucks],
+            "depot_id": [t.depot_id for t in trucks],
+            "leg_log": [t.leg_log.columns() for t in trucks],
+        },
+    }
+
+    for attr in _PACKAGE_DATETIME_ATTRS:
+        body["packages"][attr] = [_encode_datetime(getattr(p, attr, None), day) for p in packages]
+    for attr in _PACKAGE_PLAIN_ATTRS:
+        body["packages"][attr] = [getattr(p, attr, None) for p in packages]
+
+    payload = zlib.compress(json.dumps(body, separators=(",", ":")).encode("utf-8"), 9)
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(payload)))
+        f.write(payload)
+    return len(payload) + _HEADER.size
+
+
+def load_snapshot(path):
+    """
+    Rebuild (trucks, hashtable) from a snapshot file, no routing involved.
+    Raises ValueError for files that aren't snapshots or come from a newer version.
+    """
+    with open(path, "rb") as f:
+        header = f.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            raise ValueError(f"{path} is too short to be a snapshot")
+        magic, version, length = _HEADER.unpack(header)
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError(f"{path} is not a WGUPS snapshot")
+        if version > SNAPSHOT_VERSION:
+            raise ValueError(f"{path} is snapshot version {version}, this build reads up to {SNAPSHOT_VERSION}")
+        body = json.loads(zlib.decompress(f.read(length)).decode("utf-8"))
+
+    day = datetime.strptime(body["day"], "%Y-%m-%d")
+
+    cols = body["packages"]
+    hashtable = PackageStore()
+    for i, package_id in enumerate(cols["package_id"]):
+        package = Package(package_id, cols["address"][i], cols["weight"][i], cols["city"][i],
+                          cols["zip_code"][i], _decode_time(cols["deadline"][i]), notes=cols["notes"][i],
+                          volume=cols["volume"][i] if version >= 2 else 0.0)
+
+        package.status = PackageStatus[cols["status"][i]]
+        package.load_time = cols["load_time"][i]
+        package.delivery_time = cols["delivery_time"][i]
+        package.group_ids = set(cols["group_ids"][i])
+        package.group_constrained = bool(package.group_ids)
+
+        # only put back dynamic attributes that were actually set
+        for attr in _PACKAGE_DATETIME_ATTRS:
+            value = _decode_datetime(cols[attr][i], day)
+            if value is not None:
+                setattr(package, attr, value)
+        for attr in _PACKAGE_PLAIN_ATTRS:
+            # older snapshots may not have every column
+            if attr in cols and cols[attr][i] is not None:
+                setattr(package, attr, cols[attr][i])
+
+        hashtable.insert(package_id, package)
+
+    cols = body["trucks"]
+    trucks = []
+    for i, truck_id in enumerate(cols["truck_id"]):
+        truck = Truck(truck_id=truck_id, capacity=cols["capacity"][i], speed=cols["speed"][i],
+                      start_location=cols["hub_location"][i],
+                      start_time=_decode_datetime(cols["start_time"][i], day),
+                      max_weight=cols["max_weight"][i] if version >= 2 else None,
+                      max_volume=cols["max_volume"][i] if version >= 2 else None)
+        truck.current_time = _decode_datetime(cols["current_time"][i], day)
+        truck.current_location = cols["current_location"][i]
+        truck.mileage = cols["mileage"][i]
+        truck.packages = cols["packages"][i]
+        truck.trip_history = cols["trip_history"][i]
+        truck.delivery_order = cols["delivery_order"][i]
+        if version >= 2:
+            truck.depot_id = cols["depot_id"][i]
+            truck.leg_log = LegLog.from_columns(cols["leg_log"][i])
+        trucks.append(truck)
+
+    return trucks, hashtable
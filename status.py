@@ -0,0 +1,80 @@
+# status.py - package status at many snapshot times in one numpy pass
+
+import numpy as np
+from datetime import datetime
+
+# status codes in the matrix
+AT_HUB = 0
+EN_ROUTE = 1
+DELIVERED = 2
+DELAYED = 3
+
+def _seconds(value):
+    """Seconds after midnight for a time/datetime/"HH:MM AM" string, or None."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        try:
+            value = datetime.strptime(value, "%I:%M %p")
+        except ValueError:
+            return None
+    if not hasattr(value, 'hour'):
+        return None
+    return value.hour * 3600 + value.minute * 60 + value.second
+
+
+def status_matrix(trucks, hashtable, snapshot_times):
+    """
+    Status of every truck's packages at every snapshot time.
+    Returns (package_ids, codes) where codes[i, j] is the status code of
+    package_ids[i] at snapshot_times[j]. Each package's times are parsed once,
+    then the whole packages x times grid is a few array comparisons.
+    """
+    package_ids = []
+    load = []
+    delivered = []
+    delayed = []
+
+    for truck in trucks:
+        start = _seconds(truck.start_time) if hasattr(truck.start_time, 'hour') else None
+        for package_id in truck.all_packages():
+            package = hashtable.get(package_id)
+            package_ids.append(package_id)
+
+            # same fallbacks the report always used: truck start time if it was never marked en route
+            load_at = _seconds(getattr(package, "load_time", None))
+            if load_at is None:
+                load_at = start
+            load.append(np.inf if load_at is None else load_at)
+
+            delivered_at = _seconds(getattr(package, "delivery_time", None))
+            delivered.append(np.inf if delivered_at is None else delivered_at)
+
+            delayed_at = _seconds(getattr(package, "delayed_until", None))
+            delayed.append(-np.inf if delayed_at is None else delayed_at)
+
+    times = np.array([_seconds(t) for t in snapshot_times], dtype=float)[np.newaxis, :]
+    load = np.array(load, dtype=float)[:, np.newaxis]
+    delivered = np.array(delivered, dtype=float)[:, np.newaxis]
+    delayed = np.array(delayed, dtype=float)[:, np.newaxis]
+
+    codes = np.full((len(package_ids), times.shape[1]), DELIVERED, dtype=np.int8)
+    codes[times < delivered] = EN_ROUTE
+    codes[times < load] = AT_HUB
+    codes[times < delayed] = DELAYED
+    return package_ids, codes
+
+
+def status_label(code, package):
+    """Text for one matrix cell, matching what the report prints."""
+    if code == DELAYED:
+        # packages on the late flight get a friendlier label than plain DELAYED
+        reason = getattr(package, "delay_reason", None)
+        if reason:
+            return f"Delayed - {reason}"
+        return "DELAYED"
+    if code == AT_HUB:
+        return "At Hub"
+    if code == EN_ROUTE:
+        return "En Route"
+    return f"Delivered at {getattr(package, 'delivery_time', 'N/A')}"
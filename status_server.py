@@ -0,0 +1,262 @@
+# status_server.py - answer package status queries over localhost from one finished run
+#
+# run with: python status_server.py [--snapshot PATH | --live] [--port 8950] [--demo]
+#
+# protocol: one query per line, one JSON response per line
+#   status at 09:30 AM   -> every package's status at that time
+#   package 9            -> one package's details
+#   mileage              -> total and per-truck mileage
+#
+# --demo starts the server plus a batch of local clients and reports queries/second
+# --live answers from a simulation still driving on another thread (packages in a
+#        ConcurrentPackageStore) instead of a finished run
+
+import asyncio
+import contextlib
+import io
+import json
+import sys
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+import main
+import snapshot
+import status
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8950
+
+
+class StatusService:
+    def __init__(self, trucks, hashtable, cache_size=256, finished=None):
+        """
+        Initialize a StatusService over a run with:
+        - trucks / hashtable: the simulation (never modified here)
+        - cache_size: how many distinct snapshot times to keep rendered responses for
+        - finished: threading.Event set once a live run is done (None: the run is already over)
+        """
+        self.trucks = trucks
+        self.hashtable = hashtable
+        self.cache_size = cache_size
+        self.finished = finished
+
+        # "HH:MM AM" -> encoded response, oldest evicted first
+        self._cache = OrderedDict()
+
+        # which truck carried each package, for the status listing (a live run
+        # hasn't loaded anything yet, those fall back to the package's truck_id)
+        self._truck_of = {}
+        for truck in trucks:
+            for package_id in truck.all_packages():
+                self._truck_of[package_id] = truck.truck_id
+
+    def live(self):
+        """True while the simulation is still driving (nothing gets cached until it's done)."""
+        return self.finished is not None and not self.finished.is_set()
+
+    def _truck(self, package_id, package):
+        return self._truck_of.get(package_id, getattr(package, "truck_id", None))
+
+    def status_at(self, when):
+        """Every package's status at `when` ("HH:MM AM"), cached per time."""
+        snap = datetime.strptime(when.strip().upper(), "%I:%M %p")
+        key = snap.strftime("%I:%M %p")
+
+        live = self.live()
+        cached = None if live else self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            return cached
+
+        package_ids, codes = status.status_matrix(self.trucks, self.hashtable, [snap])
+        rows = []
+        for row, package_id in enumerate(package_ids):
+            package = self.hashtable.get(package_id)
+            rows.append({
+                "package": package_id,
+                "truck": self._truck(package_id, package),
+                "address": self._address_at(package, snap),
+                "status": status.status_label(codes[row, 0], package),
+            })
+        response = self._encode({"time": key, "packages": rows})
+        if live:
+            return response
+
+        self._cache[key] = response
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return response
+
+    def package(self, package_id):
+        package = self.hashtable.get(package_id)
+        if package is None:
+            return self._encode({"error": f"No package found with ID {package_id}."})
+
+        # read together, so a package being delivered right now never shows a half-done state
+        package_status, delivery_time = package.delivery_state()
+        return self._encode({
+            "package": package_id,
+            "address": package.address,
+            "previous_address": getattr(package, "previous_address", None),
+            "city": package.city,
+            "zip": package.zip_code,
+            "deadline": "EOD" if package.deadline == datetime.max.time() else str(package.deadline),
+            "status": package_status.value,
+            "truck": self._truck(package_id, package),
+            "load_time": package.load_time,
+            "delivery_time": delivery_time,
+        })
+
+    def mileage(self):
+        return self._encode({
+            "total": round(sum(truck.mileage for truck in self.trucks), 2),
+            "trucks": {str(truck.truck_id): round(truck.mileage, 2) for truck in self.trucks},
+        })
+
+    def answer(self, line):
+        """Turn one query line into one encoded response line."""
+        words = line.strip().split()
+        try:
+            if len(words) >= 3 and words[0].lower() == "status" and words[1].lower() == "at":
+                return self.status_at(" ".join(words[2:]))
+            if len(words) == 2 and words[0].lower() == "package" and words[1].isdigit():
+                return self.package(int(words[1]))
+            if len(words) == 1 and words[0].lower() == "mileage":
+                return self.mileage()
+        except ValueError as e:
+            return self._encode({"error": str(e)})
+        return self._encode({"error": "Unknown query. Try 'status at 09:30 AM', 'package 9' or 'mileage'."})
+
+    @staticmethod
+    def _address_at(package, snap):
+        changed_at = getattr(package, "address_changed_at", None)
+        if changed_at:
+            return package.previous_address if snap < changed_at else package.address
+
+        # wrong-address note with a known fix (see constraints.py)
+        corrected_at = getattr(package, "address_correction_time", None)
+        if corrected_at and snap >= corrected_at:
+            return package.correct_address
+        return package.address
+
+    @staticmethod
+    def _encode(payload):
+        return (json.dumps(payload) + "\n").encode("utf-8")
+
+
+async def serve(service, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """Start the TCP server, returns the asyncio server object."""
+
+    async def handle(reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                writer.write(service.answer(line.decode("utf-8")))
+                await writer.drain()
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
+
+
+async def query(queries, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """Stand-in client: send queries over one connection, return the decoded responses."""
+    reader, writer = await asyncio.open_connection(host, port)
+    responses = []
+    for q in queries:
+        writer.write((q + "\n").encode("utf-8"))
+        await writer.drain()
+        responses.append(json.loads(await reader.readline()))
+    writer.close()
+    await writer.wait_closed()
+    return responses
+
+
+async def demo(service, host, port, clients=20, queries_per_client=200):
+    """Many dispatchers querying at once against one in-memory run."""
+    server = await serve(service, host, port)
+    mix = ["status at 08:50 AM", "status at 09:50 AM", "status at 12:30 PM", "package 9", "package 15", "mileage"]
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(query([mix[(c + i) % len(mix)] for i in range(queries_per_client)], host, port)
+                                     for c in range(clients)))
+    elapsed = time.perf_counter() - started
+
+    server.close()
+    await server.wait_closed()
+
+    # a live run prints nothing until it's done driving (its own output is muted meanwhile)
+    if service.finished is not None:
+        await asyncio.to_thread(service.finished.wait)
+
+    total = sum(len(r) for r in results)
+    print(f"{clients} clients, {total} queries in {elapsed:.2f} s ({total / elapsed:,.0f} queries/s)")
+    print(f"sample: package 9 -> {results[0][3]}")
+
+
+def load_run(snapshot_path=None):
+    """A finished run from a snapshot, or a fresh simulation with its output muted."""
+    if snapshot_path:
+        return snapshot.load_snapshot(snapshot_path)
+    with contextlib.redirect_stdout(io.StringIO()):
+        hashtable = main.load_packages("WGUPS_Package_File.csv")
+        distance_table = main.load_distance_table("WGUPS_Distance_Table.csv")
+        trucks = main.initialize_trucks()
+        main.run_all_deliveries(trucks, hashtable, distance_table)
+    return trucks, hashtable
+
+
+def live_run():
+    """
+    A fresh simulation over a ConcurrentPackageStore, set up but not started.
+    Returns (trucks, hashtable, thread, finished): start the thread to drive the
+    day, `finished` gets set when it's done.
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        hashtable = main.load_packages("WGUPS_Package_File.csv", concurrent=True)
+        distance_table = main.load_distance_table("WGUPS_Distance_Table.csv")
+        trucks = main.initialize_trucks()
+    finished = threading.Event()
+
+    def drive():
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                main.run_all_deliveries(trucks, hashtable, distance_table)
+        finally:
+            finished.set()
+
+    return trucks, hashtable, threading.Thread(target=drive, daemon=True), finished
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    snapshot_path = args[args.index("--snapshot") + 1] if "--snapshot" in args else None
+    port = int(args[args.index("--port") + 1]) if "--port" in args else DEFAULT_PORT
+
+    simulation = None
+    if "--live" in args:
+        trucks, hashtable, simulation, finished = live_run()
+        service = StatusService(trucks, hashtable, finished=finished)
+    else:
+        trucks, hashtable = load_run(snapshot_path)
+        service = StatusService(trucks, hashtable)
+
+    if "--demo" in args:
+        if simulation:
+            simulation.start()
+        asyncio.run(demo(service, DEFAULT_HOST, port))
+    else:
+        async def run_forever():
+            server = await serve(service, DEFAULT_HOST, port)
+            print(f"Serving package status on {DEFAULT_HOST}:{port}")
+            # start driving only once that line is out, the simulation mutes stdout while it runs
+            if simulation:
+                simulation.start()
+            async with server:
+                await server.serve_forever()
+
+        asyncio.run(run_forever())
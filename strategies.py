@@ -0,0 +1,444 @@
+# strategies.py - routing algorithms behind one interface, picked by name per run or per truck
+
+import time
+from abc import ABC, abstractmethod
+
+import exact
+import routing
+from DistanceTable import truck_location, package_location
+from constraints import delivery_address
+from Route import Route
+from insertion import plan_route, drive_route, stop_window, leg_miles
+from routing import build_stops
+
+# ---------------------------------------------------
+#  Strategy Interface
+# ---------------------------------------------------
+#
+# Every strategy has the same three pieces:
+#   plan(truck, hashtable, distance_table)            -> stops in driving order, or None if it decides while driving
+#   simulate(truck, route, hashtable, distance_table)  -> drive it (deliveries, mileage, clock)
+#   stats()                                            -> runs, time spent planning / driving, miles
+# and calling the strategy does plan + simulate, so an instance drops in anywhere
+# the old run_delivery(truck, hashtable, distance_table) functions went.
+
+
+def _pending_stops(truck, hashtable, distance_table):
+    return [stop for stop in build_stops(truck, hashtable, distance_table).values()
+            if not stop.is_done(hashtable)]
+
+
+class RoutingStrategy(ABC):
+    name = "base"
+
+    def __init__(self):
+        self.runs = 0
+        self.plan_ms = 0.0
+        self.simulate_ms = 0.0
+        self.miles = 0.0
+
+    @abstractmethod
+    def plan(self, truck, hashtable, distance_table):
+        """Stops in driving order, or None if the strategy decides while driving."""
+
+    def simulate(self, truck, route, hashtable, distance_table):
+        """Drive a planned route stop by stop (waiting for late packages where needed)."""
+        drive_route(truck, route, hashtable, distance_table)
+
+    def stats(self):
+        return {
+            "strategy": self.name,
+            "runs": self.runs,
+            "plan_ms": round(self.plan_ms, 2),
+            "simulate_ms": round(self.simulate_ms, 2),
+            "miles": round(self.miles, 2),
+        }
+
+    def __call__(self, truck, hashtable, distance_table):
+        started = time.perf_counter()
+        route = self.plan(truck, hashtable, distance_table)
+        planned = time.perf_counter()
+
+        miles_before = truck.mileage
+        self.simulate(truck, route, hashtable, distance_table)
+        finished = time.perf_counter()
+
+        self.runs += 1
+        self.plan_ms += (planned - started) * 1000
+        self.simulate_ms += (finished - planned) * 1000
+        self.miles += truck.mileage - miles_before
+        return route
+
+
+# ---------------------------------------------------
+#  Strategies
+# ---------------------------------------------------
+
+class GreedyStrategy(RoutingStrategy):
+    """Deadline-first greedy with nearest neighbor (routing.run_delivery), decided while driving."""
+    name = "greedy"
+
+    def plan(self, truck, hashtable, distance_table):
+        return None
+
+    def simulate(self, truck, route, hashtable, distance_table):
+        routing.run_delivery(truck, hashtable, distance_table)
+
+
+class NearestNeighborStrategy(RoutingStrategy):
+    """Always the closest stop that's ready (walked off the distance table's neighbor lists), no deadline priority."""
+    name = "nearest"
+
+    def plan(self, truck, hashtable, distance_table):
+        stops = _pending_stops(truck, hashtable, distance_table)
+        day = truck.current_time.date()
+        windows = {id(stop): stop_window(stop, hashtable, day)[0] for stop in stops}
+
+        # stops are one per resolved address, the unresolved ones sit 2.0 miles from everything.
+        # ties go to whichever stop comes first on the truck, like a plain min() over the stops
+        by_location = {stop.location_index: stop for stop in stops if stop.location_index is not None}
+        unresolved = [stop for stop in stops if stop.location_index is None]
+        order = {id(stop): i for i, stop in enumerate(stops)}
+
+        def is_ready(stop, clock):
+            return not windows[id(stop)] or windows[id(stop)] <= clock
+
+        route = []
+        here = truck_location(truck, distance_table)
+        clock = truck.current_time
+        while stops:
+            best = None  # (miles, position on the truck, stop)
+            if here is not None:
+                for index in distance_table.nearest_neighbors(here):
+                    miles = leg_miles(distance_table, here, index)
+                    if best is not None and miles > best[0]:
+                        break
+                    candidate = by_location.get(index)
+                    if candidate is not None and is_ready(candidate, clock):
+                        option = (miles, order[id(candidate)], candidate)
+                        if best is None or option[:2] < best[:2]:
+                            best = option
+            for candidate in unresolved:
+                if is_ready(candidate, clock):
+                    option = (leg_miles(distance_table, here, None), order[id(candidate)], candidate)
+                    if best is None or option[:2] < best[:2]:
+                        best = option
+
+            if best is None:
+                ready = [st for st in stops if is_ready(st, clock)]
+                if not ready:
+                    # nothing's ready yet, wait for whichever opens first
+                    clock = min(windows[id(st)] for st in stops)
+                    continue
+                # off the end of a top-k neighbor list (or the truck's spot never resolved)
+                stop = min(ready, key=lambda st: leg_miles(distance_table, here, st.location_index))
+            else:
+                stop = best[2]
+
+            miles = leg_miles(distance_table, here, stop.location_index)
+            clock += truck.travel_time(miles, here, stop.location_index, clock) + truck.service_time()
+            here = stop.location_index
+            route.append(stop)
+            stops.remove(stop)
+            if stop.location_index is None:
+                unresolved.remove(stop)
+            else:
+                del by_location[stop.location_index]
+        return route
+
+
+# what local search can minimize over a Route
+OBJECTIVES = {
+    "miles": Route.total_miles,
+    "time": Route.hours,
+    "cost": Route.cost,
+}
+
+
+class InsertionStrategy(RoutingStrategy):
+    """Time-window insertion (regret or cheapest), planned up front."""
+
+    def __init__(self, regret=True):
+        super().__init__()
+        self.regret = regret
+        self.name = "regret" if regret else "cheapest"
+
+    def plan(self, truck, hashtable, distance_table):
+        route, infeasible = plan_route(truck, _pending_stops(truck, hashtable, distance_table),
+                                       hashtable, distance_table, self.regret)
+        for stop in infeasible:
+            print(f"Truck {truck.truck_id}: no on-time slot for {stop.address}, inserted at cheapest position")
+        return route
+
+
+class LocalSearchStrategy(InsertionStrategy):
+    """
+    Regret insertion, then relocate / swap moves on a Route until no move
+    improves the objective without making more stops late (or max_passes runs
+    out). The objective is "miles", "time" (hours until the last stop) or
+    "cost" (the truck's CostModel weighting of miles and hours).
+    """
+    name = "local"
+
+    def __init__(self, max_passes=10, objective="miles"):
+        super().__init__(regret=True)
+        if objective not in OBJECTIVES:
+            raise ValueError(f"Unknown objective '{objective}', pick one of {sorted(OBJECTIVES)}")
+        self.name = "local" if objective == "miles" else f"local-{objective}"
+        self.max_passes = max_passes
+        self.objective = objective
+
+    def plan(self, truck, hashtable, distance_table):
+        route = Route.for_truck(truck, super().plan(truck, hashtable, distance_table), hashtable, distance_table)
+
+        for _ in range(self.max_passes):
+            if not self._improve(route):
+                break
+        return list(route)
+
+    def _score(self, route):
+        return OBJECTIVES[self.objective](route)
+
+    def _better(self, route, score, late):
+        return len(route.late_stops()) <= late and self._score(route) < score - 1e-9
+
+    def _improve(self, route):
+        """One pass of moves, returns True if anything got better."""
+        improved = False
+        n = len(route)
+
+        # relocate: pull a stop out and put it back wherever it's cheapest
+        for i in range(n):
+            score, late = self._score(route), len(route.late_stops())
+            # a stop that costs no miles where it is can't save any elsewhere (time can still move)
+            if self.objective == "miles" and route.remove_cost(i) <= 0:
+                continue
+            stop = route.remove(i)
+            options = sorted((route.insert_cost(stop, pos), pos) for pos in range(len(route) + 1))
+            placed = False
+            for _, pos in options:
+                if pos == i:
+                    continue
+                route.insert(stop, pos)
+                if self._better(route, score, late):
+                    placed = improved = True
+                    break
+                route.remove(pos)
+            if not placed:
+                route.insert(stop, i)
+
+        # swap: exchange two stops
+        for i in range(n):
+            for j in range(i + 1, n):
+                score, late = self._score(route), len(route.late_stops())
+                route.swap(i, j)
+                if self._better(route, score, late):
+                    improved = True
+                else:
+                    route.swap(i, j)
+
+        return improved
+
+
+class ExactStrategy(RoutingStrategy):
+    """Held-Karp for small routes (exact.py), greedy when it's too big or nothing is on time."""
+    name = "exact"
+
+    def __init__(self, max_stops=exact.DEFAULT_MAX_STOPS, max_wait_stops=exact.DEFAULT_MAX_WAIT_STOPS):
+        super().__init__()
+        self.max_stops = max_stops
+        self.max_wait_stops = max_wait_stops
+
+    def plan(self, truck, hashtable, distance_table):
+        stops = _pending_stops(truck, hashtable, distance_table)
+        route = None
+        if len(stops) <= self.max_stops:
+            route = exact.solve_route(truck, stops, hashtable, distance_table, self.max_wait_stops)
+        if route is None:
+            print(f"Truck {truck.truck_id}: {len(stops)} stops, using heuristic route")
+        else:
+            print(f"Truck {truck.truck_id}: exact route over {len(stops)} stops")
+        return route
+
+    def simulate(self, truck, route, hashtable, distance_table):
+        if route is None:
+            routing.run_delivery(truck, hashtable, distance_table)
+        else:
+            drive_route(truck, route, hashtable, distance_table)
+
+
+# ---------------------------------------------------
+#  Cached Plans
+# ---------------------------------------------------
+
+def _stop_key(stop):
+    # same keys build_stops uses: distance table index, raw address if it never resolved
+    return stop.location_index if stop.location_index is not None else stop.address
+
+
+class CachedStrategy(RoutingStrategy):
+    """
+    Wraps another strategy with a RouteCache. On a hit the stored stop order is
+    rebuilt into a Route and checked against today's windows and miles (no more
+    late stops or miles than when it was stored) before it's driven; otherwise the
+    wrapped strategy runs as usual and the order it actually drove gets stored.
+    """
+
+    def __init__(self, inner, cache):
+        super().__init__()
+        self.inner = inner
+        self.cache = cache
+        self.name = inner.name
+
+    def plan(self, truck, hashtable, distance_table):
+        # calling the wrapper goes through the cache, a bare plan is just the wrapped one's
+        return self.inner.plan(truck, hashtable, distance_table)
+
+    def _key(self, truck, stops, hashtable, distance_table):
+        day = truck.current_time.date()
+        windows = []
+        for stop in stops:
+            earliest, latest = stop_window(stop, hashtable, day)
+            opens = round((earliest - truck.current_time).total_seconds() / 60, 2) if earliest else None
+            closes = round((latest - truck.current_time).total_seconds() / 60, 2)
+            windows.append((_stop_key(stop), opens, closes))
+        start = truck_location(truck, distance_table)
+        costs = truck.cost_model.parameters() if truck.cost_model is not None else None
+        return self.cache.fingerprint(self.name, start if start is not None else truck.current_location,
+                                      truck.current_time, truck.speed, windows, distance_table.fingerprint(), costs)
+
+    def __call__(self, truck, hashtable, distance_table):
+        started = time.perf_counter()
+        stops = _pending_stops(truck, hashtable, distance_table)
+        key = self._key(truck, stops, hashtable, distance_table)
+        entry = self.cache.get(key)
+
+        by_key = {_stop_key(stop): stop for stop in stops}
+        if entry is not None:
+            route = Route.for_truck(truck, [by_key[k] for k in entry["order"] if k in by_key], hashtable, distance_table)
+            # same stops, no more late ones and no more miles than when it was stored
+            if len(route) == len(stops) and len(route.late_stops()) <= entry["late"] \
+                    and route.total_miles() <= entry["miles"] + 1e-3:
+                planned = time.perf_counter()
+                miles_before = truck.mileage
+                drive_route(truck, list(route), hashtable, distance_table)
+                self.runs += 1
+                self.plan_ms += (planned - started) * 1000
+                self.simulate_ms += (time.perf_counter() - planned) * 1000
+                self.miles += truck.mileage - miles_before
+                return list(route)
+            self.cache.reject(key)
+
+        # miss: plan it for real, then remember the order the truck actually drove
+        start_index, start_time = truck_location(truck, distance_table), truck.current_time
+        delivered_before = len(truck.delivery_order)
+        miles_before = truck.mileage
+        simulate_before = self.inner.simulate_ms
+        route = self.inner(truck, hashtable, distance_table)
+        simulated = self.inner.simulate_ms - simulate_before
+        self.runs += 1
+        self.plan_ms += (time.perf_counter() - started) * 1000 - simulated
+        self.simulate_ms += simulated
+        self.miles += truck.mileage - miles_before
+
+        order = self._driven_order(truck.delivery_order[delivered_before:], hashtable, distance_table)
+        if order is not None and set(order) == set(by_key):
+            driven = Route([by_key[k] for k in order], start_index, start_time, truck.speed,
+                           hashtable, distance_table, truck.cost_model)
+            self.cache.put(key, order, driven.total_miles(), len(driven.late_stops()))
+        return route
+
+    @staticmethod
+    def _driven_order(package_ids, hashtable, distance_table):
+        """Stop keys in the order they were delivered, None if a stop got visited twice."""
+        order = []
+        for package_id in package_ids:
+            package = hashtable.get(package_id)
+            index = package_location(package, distance_table)
+            key = index if index is not None else delivery_address(package)
+            if order and order[-1] == key:
+                continue
+            if key in order:
+                return None
+            order.append(key)
+        return order
+
+    def stats(self):
+        stats = super().stats()
+        stats.update(self.cache.stats())
+        return stats
+
+
+# ---------------------------------------------------
+#  Registry + Selection
+# ---------------------------------------------------
+
+# name -> factory for a fresh strategy instance
+STRATEGIES = {
+    "greedy": GreedyStrategy,
+    "nearest": NearestNeighborStrategy,
+    "regret": InsertionStrategy,
+    "cheapest": lambda: InsertionStrategy(regret=False),
+    "local": LocalSearchStrategy,
+    "local-time": lambda: LocalSearchStrategy(objective="time"),
+    "local-cost": lambda: LocalSearchStrategy(objective="cost"),
+    "exact": ExactStrategy,
+}
+
+
+def get_strategy(name):
+    """A fresh strategy instance by registered name."""
+    if name not in STRATEGIES:
+        raise ValueError(f"Unknown routing strategy '{name}', pick one of {sorted(STRATEGIES)}")
+    return STRATEGIES[name]()
+
+
+def parse_config(text):
+    """
+    "regret" -> "regret", "1=exact,3=local,default=greedy" -> {1: "exact", 3: "local", "default": "greedy"}
+    (command line form of a TruckRouter config).
+    """
+    if "=" not in text:
+        return text.strip()
+    config = {}
+    for part in text.split(","):
+        key, name = (piece.strip() for piece in part.split("=", 1))
+        config[int(key) if key.isdigit() else key] = name
+    return config
+
+
+class TruckRouter:
+    """
+    Picks the strategy for each truck from a config: a single name for every
+    truck, or {truck_id: name, "default": name} to A/B strategies per truck.
+    Callable like a strategy, so it can be handed to run_multi_trip as `deliver`.
+    With a RouteCache every strategy reuses plans for routes it has seen before.
+    """
+
+    def __init__(self, config="greedy", cache=None):
+        if isinstance(config, str):
+            config = {"default": config}
+        self.config = config
+        self.cache = cache
+
+        # one instance per distinct name so stats pile up per strategy
+        self.strategies = {}
+        for name in set(config.values()):
+            self._add(name)
+
+    def _add(self, name):
+        strategy = get_strategy(name)
+        self.strategies[name] = CachedStrategy(strategy, self.cache) if self.cache is not None else strategy
+        return self.strategies[name]
+
+    def strategy_for(self, truck):
+        name = self.config.get(truck.truck_id, self.config.get("default", "greedy"))
+        if name not in self.strategies:
+            return self._add(name)
+        return self.strategies[name]
+
+    def __call__(self, truck, hashtable, distance_table):
+        return self.strategy_for(truck)(truck, hashtable, distance_table)
+
+    def stats(self):
+        return [strategy.stats() for strategy in self.strategies.values()]
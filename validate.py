@@ -0,0 +1,118 @@
+# validate.py - cheap feasibility checks on a truck load before any routing runs
+
+from datetime import datetime, timedelta
+from routing import available_time
+from DistanceTable import package_location
+
+# ---------------------------------------------------
+#  Plan Validation
+# ---------------------------------------------------
+#
+# Catches loads that can't work (over capacity / weight / volume, restricted package on the wrong
+# truck, a group split across trucks, a package leaving before it's at the hub,
+# a deadline nobody could make even driving straight there) in one pass over the
+# packages, instead of finding out from the "packages not delivered" warning at
+# the end of a simulation.
+
+
+class Problem:
+    def __init__(self, kind, message, package_id=None, truck_id=None):
+        self.kind = kind
+        self.message = message
+        self.package_id = package_id
+        self.truck_id = truck_id
+
+    def __str__(self):
+        return f"[{self.kind}] {self.message}"
+
+
+def earliest_arrival(truck, closure, start, stop, leave, due):
+    """
+    Soonest the truck could get from location ID start to stop leaving at `leave`:
+    shortest-path miles (2.0 if either never resolved) at the fastest speed it drives before due.
+    """
+    miles = float(closure[start, stop]) if start is not None and stop is not None else 2.0
+    fastest = min(seconds for _, seconds in truck.speed_changes(leave, max(leave, due)))
+    return leave + timedelta(seconds=miles * fastest)
+
+
+def validate_plan(trucks, hashtable, distance_table):
+    """
+    Check loaded trucks before they drive. Returns a list of Problems
+    (empty if the plan passes every check).
+    """
+    problems = []
+    truck_of = {}
+
+    for truck in trucks:
+        if len(truck.packages) > truck.capacity:
+            problems.append(Problem("capacity", f"Truck {truck.truck_id} has {len(truck.packages)} packages, "
+                                                f"capacity is {truck.capacity}", truck_id=truck.truck_id))
+        _, weight, volume = truck.load(hashtable)
+        if truck.max_weight is not None and weight > truck.max_weight:
+            problems.append(Problem("capacity", f"Truck {truck.truck_id} carries {weight:g} kg, "
+                                                f"limit is {truck.max_weight:g}", truck_id=truck.truck_id))
+        if truck.max_volume is not None and volume > truck.max_volume:
+            problems.append(Problem("capacity", f"Truck {truck.truck_id} carries {volume:g} cu ft, "
+                                                f"limit is {truck.max_volume:g}", truck_id=truck.truck_id))
+        for package_id in truck.packages:
+            if package_id in truck_of:
+                problems.append(Problem("duplicate", f"Package {package_id} is on trucks {truck_of[package_id]} "
+                                                     f"and {truck.truck_id}", package_id, truck.truck_id))
+            truck_of[package_id] = truck.truck_id
+
+    for package_id in hashtable.keys():
+        if package_id not in truck_of and hashtable.get(package_id).delivery_time is None:
+            problems.append(Problem("unassigned", f"Package {package_id} is not on any truck", package_id))
+
+    trucks_by_id = {truck.truck_id: truck for truck in trucks}
+    hub_index = {truck.truck_id: distance_table.find_index(truck.hub_location) for truck in trucks}
+    checked_groups = set()
+
+    # the table isn't a metric, so the bound goes by the shortest path from the hub, not the direct cell
+    closure = distance_table.shortest_paths()
+
+    for package_id, truck_id in truck_of.items():
+        package = hashtable.get(package_id)
+        truck = trucks_by_id[truck_id]
+
+        restriction = getattr(package, 'truck_restriction', None)
+        if restriction is not None and restriction != truck_id:
+            problems.append(Problem("restriction", f"Package {package_id} can only be on truck {restriction}, "
+                                                   f"loaded on truck {truck_id}", package_id, truck_id))
+
+        # one report per split group, not one per member
+        group = frozenset(package.group_ids)
+        if group and group not in checked_groups:
+            checked_groups.add(group)
+            split = sorted({truck_of[pid] for pid in group if pid in truck_of})
+            if len(split) > 1:
+                problems.append(Problem("group", f"Packages {sorted(group)} must go together, "
+                                                 f"loaded on trucks {split}", package_id))
+
+        # wrong address with no fix yet: it can't go out at all
+        if getattr(package, 'wrong_address', False) and not getattr(package, 'address_correction_time', None) \
+                and not getattr(package, 'address_changed_at', None):
+            problems.append(Problem("address", f"Package {package_id} has a wrong address and no correction",
+                                    package_id, truck_id))
+
+        # a load only leaves the hub once, so everything on it has to be there by then
+        depart = truck.start_time
+        ready_at = available_time(package)
+        if ready_at and hasattr(depart, 'hour') and depart < ready_at:
+            problems.append(Problem("availability", f"Package {package_id} is not at the hub until "
+                                                    f"{ready_at.strftime('%I:%M %p')}, truck {truck_id} leaves at "
+                                                    f"{depart.strftime('%I:%M %p')}", package_id, truck_id))
+
+        # lower bound: even driving the shortest way from the hub the truck can't make it
+        if package.deadline != datetime.max.time() and hasattr(depart, 'hour'):
+            leave = max(depart, ready_at or depart)
+            due = datetime.combine(depart.date(), package.deadline)
+            earliest = earliest_arrival(truck, closure, hub_index[truck_id],
+                                        package_location(package, distance_table), leave, due)
+            if earliest > due:
+                problems.append(Problem("deadline", f"Package {package_id} can't arrive before "
+                                                    f"{earliest.strftime('%I:%M %p')}, deadline is "
+                                                    f"{package.deadline.strftime('%I:%M %p')}", package_id, truck_id))
+
+    return problems